@@ -1,3 +1,17 @@
-from .sbol_factory import SBOLFactory, Document, ValidationReport
-from .uml_factory import UMLFactory
-from .shacl_validator import ShaclValidator
+from .sbol_factory import SBOLFactory, Document, ValidationReport, ValidationResult
+from .query_stats import QueryStats
+
+
+__all__ = ['SBOLFactory', 'Document', 'ValidationReport', 'ValidationResult', 'QueryStats', 'UMLFactory', 'ShaclValidator']
+
+
+def __getattr__(name):
+    # UMLFactory and ShaclValidator pull in pylatex, graphviz and pyshacl,
+    # so they are only imported on first use
+    if name == 'UMLFactory':
+        from .uml_factory import UMLFactory
+        return UMLFactory
+    if name == 'ShaclValidator':
+        from .shacl_validator import ShaclValidator
+        return ShaclValidator
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
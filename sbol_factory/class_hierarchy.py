@@ -0,0 +1,100 @@
+from collections import defaultdict
+
+
+class ClassHierarchy():
+    '''
+    Transitive closure of a class hierarchy, computed once from the direct
+    superclasses of each node. Ancestor, descendant and is-a questions are
+    then answered with set lookups, rather than by walking rdfs:subClassOf
+    chains. The closure is reflexive, and includes every node reachable
+    through the superclasses, such as owl:Restriction nodes, which callers
+    filter by the given set of classes where needed. The classes on a
+    cycle are each other's ancestors, so they all have the same closure.
+    '''
+
+    def __init__(self, superclasses, classes=None):
+        self.superclasses = superclasses
+        self.classes = classes
+        self.ancestor_sets = {}
+        self.descendant_sets = defaultdict(set)
+        self.lineages = {}
+        self._close()
+        for node, ancestors in self.ancestor_sets.items():
+            for ancestor in ancestors:
+                self.descendant_sets[ancestor].add(node)
+
+    def _close(self):
+        # Tarjan's algorithm, iterative so that deep hierarchies do not exhaust
+        # the stack. Each strongly connected component, i.e., each cycle, is
+        # closed as a whole, after the components that its classes inherit from
+        index = {}
+        low = {}
+        component = []
+        on_component = set()
+        for root in list(self.superclasses):
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            component.append(root)
+            on_component.add(root)
+            stack = [(root, iter(self.superclasses.get(root, ())))]
+            while stack:
+                n, successors = stack[-1]
+                for s in successors:
+                    if s not in index:
+                        index[s] = low[s] = len(index)
+                        component.append(s)
+                        on_component.add(s)
+                        stack.append((s, iter(self.superclasses.get(s, ()))))
+                        break
+                    if s in on_component:
+                        low[n] = min(low[n], index[s])
+                else:
+                    stack.pop()
+                    if stack:
+                        parent = stack[-1][0]
+                        low[parent] = min(low[parent], low[n])
+                    if low[n] == index[n]:
+                        self._close_component(component, on_component, n)
+
+    def _close_component(self, component, on_component, root):
+        members = set()
+        while root not in members:
+            member = component.pop()
+            on_component.discard(member)
+            members.add(member)
+        ancestors = set(members)
+        for member in members:
+            for s in self.superclasses.get(member, ()):
+                if s not in members:
+                    ancestors |= self.ancestor_sets[s]
+        ancestors = frozenset(ancestors)
+        for member in members:
+            self.ancestor_sets[member] = ancestors
+
+    def ancestors(self, node):
+        return self.ancestor_sets.get(node, frozenset((node,)))
+
+    def descendants(self, node):
+        return self.descendant_sets.get(node, {node})
+
+    def is_a(self, node, ancestor):
+        return ancestor in self.ancestors(node)
+
+    def lineage(self, node):
+        '''
+        Returns the node and its superclasses, most specific first, for as
+        long as each has exactly one superclass among the classes
+        '''
+        if node not in self.lineages:
+            lineage = [node]
+            seen = {node}
+            while True:
+                superclasses = [s for s in self.superclasses.get(lineage[-1], ())
+                                if self.classes is None or s in self.classes]
+                if len(superclasses) != 1 or superclasses[0] in seen:
+                    break
+                lineage.append(superclasses[0])
+                seen.add(superclasses[0])
+            self.lineages[node] = lineage
+        return self.lineages[node]
@@ -0,0 +1,86 @@
+import sbol3 as sbol
+from sbol3 import SBOL_TOP_LEVEL, SBOL_IDENTIFIED
+
+
+SBOL = 'http://sbols.org/v3#'
+
+# The sbol3 property class used for each datatype
+DATATYPE_PROPERTIES = {
+    'http://www.w3.org/2001/XMLSchema#string': 'TextProperty',
+    'http://www.w3.org/2001/XMLSchema#integer': 'IntProperty',
+    'http://www.w3.org/2001/XMLSchema#boolean': 'BooleanProperty',
+    'http://www.w3.org/2001/XMLSchema#anyURI': 'URIProperty',
+    'http://www.w3.org/2001/XMLSchema#dateTime': 'DateTimeProperty',
+}
+
+
+def class_source(class_schema, Super):
+    '''
+    Returns the source of a class specialized for the given class schema,
+    followed by its builder function. The constructor creates each property
+    in a straight line, with the property type chosen here rather than at
+    instantiation. Super is the expression naming the superclass, and the
+    source expects sbol3 to be imported as sbol and inf from math.
+    '''
+    class_uri = class_schema['class_uri']
+    class_name = sbol.utils.parse_class_name(class_uri)
+    superclass_uri = class_schema['superclass_uri']
+    property_names = class_schema['property_names']
+    cardinalities = class_schema['cardinalities']
+
+    # Keyword arguments for this class's own properties are withheld from the
+    # superclass constructor
+    lines = [f'class {class_name}({Super}):',
+             '',
+             '    def __init__(self, *args, **kwargs):']
+    if property_names:
+        lines += [f'        base_kwargs = {{kw: val for kw, val in kwargs.items() if kw not in {set_literal(property_names.values())}}}',
+                  '        withheld = len(base_kwargs) < len(kwargs)']
+    else:
+        lines.append('        base_kwargs = kwargs')
+    lines += ["        if 'type_uri' not in base_kwargs:",
+              f"            base_kwargs['type_uri'] = {class_uri!r}",
+              f'        {Super}.__init__(self, *args, **base_kwargs)']
+    if SBOL in superclass_uri and superclass_uri not in (SBOL_TOP_LEVEL, SBOL_IDENTIFIED):
+        rdf_type = 'sbol.SBOL_TOP_LEVEL' if class_schema['is_top_level'] else 'sbol.SBOL_IDENTIFIED'
+        lines.append(f'        self._rdf_types.append({rdf_type})')
+
+    properties = []
+    for property_uri in class_schema['associative_properties']:
+        properties.append(('ReferencedObject', property_uri))
+    for property_uri in class_schema['compositional_properties']:
+        properties.append(('OwnedObject', property_uri))
+    for property_uri in class_schema['datatype_properties']:
+        datatypes = class_schema['datatypes'][property_uri]
+        if len(datatypes) == 0:
+            continue
+        if len(datatypes) > 1:  # This might indicate an error in the ontology
+            raise ValueError(f'{property_uri} has more than one datatype: {datatypes}')
+        if datatypes[0] in DATATYPE_PROPERTIES:
+            properties.append((DATATYPE_PROPERTIES[datatypes[0]], property_uri))
+    for property_class, property_uri in properties:
+        lower_bound, upper_bound = cardinalities[property_uri]
+        lines.append(f'        self.__dict__[{property_names[property_uri]!r}] = '
+                     f'sbol.{property_class}(self, {property_uri!r}, {lower_bound!r}, {upper_bound!r})')
+    if properties:
+        names = set_literal(property_names[property_uri] for _, property_uri in properties)
+        lines += ['        if withheld:',
+                  '            for kw, val in kwargs.items():',
+                  f'                if kw in {names}:',
+                  '                    self.__dict__[kw].set(val)']
+
+    lines += ['',
+              '    def accept(self, visitor):',
+              f'        visitor.visit_{class_name.lower()}(self)',
+              '',
+              '',
+              f'def build_{class_name}(identity, type_uri):']
+    kwargs = [f'{arg!r}: sbol.PYSBOL3_MISSING' for arg in class_schema['placeholder_args']]
+    kwargs += ["'identity': identity", "'type_uri': type_uri"]
+    lines.append(f'    return {class_name}(**{{{", ".join(kwargs)}}})')
+    return '\n'.join(lines)
+
+
+def set_literal(names):
+    # A set literal of constants is compiled to a frozenset constant
+    return '{' + ', '.join(repr(name) for name in sorted(set(names))) + '}'
@@ -0,0 +1,206 @@
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+
+import sbol3 as sbol
+from sbol3 import SBOL_TOP_LEVEL, SBOL_IDENTIFIED
+
+from .sbol_factory import SBOLFactory, SBOL, PROVO, OM
+from .class_source import class_source
+
+
+class ModuleWriter():
+    '''
+    Writes the classes that the SBOLFactory generates for an ontology as the
+    source of a static Python package, so that importing the classes is an
+    ordinary import that requires no ontology parsing at runtime
+    '''
+
+    def __init__(self, module_name, ontology_path, ontology_namespace):
+        self.module_name = module_name
+        self.ontology_path = ontology_path
+        self.ontology_namespace = ontology_namespace
+
+        # Ontologies accumulate as they do for SBOLFactory, so modules that
+        # depend on each other must be written in the order they are generated
+        SBOLFactory.add_ontology(module_name, ontology_path)
+        SBOLFactory.load_ontologies()
+        self.schema = SBOLFactory.compile_schema(ontology_namespace)
+        self.imports = set()
+
+    def write(self, output_path):
+        package_path = os.path.join(output_path, self.module_name)
+        os.makedirs(package_path, exist_ok=True)
+        fname = os.path.join(package_path, '__init__.py')
+        with open(fname, 'w') as f:
+            f.write(self.source())
+        return fname
+
+    def source(self):
+        self.imports = set()
+        classes = [self.class_source(class_schema) for class_schema in self.schema['classes'].values()]
+        class_names = [sbol.utils.parse_class_name(uri) for uri in self.schema['classes']]
+        lines = [
+            f'# Generated by sbol_factory from {os.path.basename(self.ontology_path)}',
+            f'# for the namespace {self.ontology_namespace}. Do not edit.',
+            'from math import inf',
+            '',
+            'import sbol3 as sbol',
+        ]
+        lines += [f'import {module}' for module in sorted(self.imports)]
+        lines += ['', '', '__all__ = [']
+        lines += [f'    {name!r},' for name in class_names]
+        lines += [']']
+        return '\n'.join(lines + classes) + '\n'
+
+    def superclass(self, superclass_uri):
+        # Mirrors SBOLFactory.get_constructor
+        if superclass_uri == SBOL_IDENTIFIED:
+            return 'sbol.CustomIdentified'
+        if superclass_uri == SBOL_TOP_LEVEL:
+            return 'sbol.CustomTopLevel'
+        class_name = sbol.utils.parse_class_name(superclass_uri)
+        if self.ontology_namespace in superclass_uri:
+            return class_name
+        namespace = SBOLFactory.parse_namespace(superclass_uri)
+        if namespace == SBOL or namespace == PROVO or namespace == OM:
+            return f'sbol.{class_name}'
+        module_name = self.schema['namespaces'][namespace]
+        self.imports.add(module_name)
+        return f'{module_name}.{class_name}'
+
+    def class_source(self, class_schema):
+        class_uri = class_schema['class_uri']
+        class_name = sbol.utils.parse_class_name(class_uri)
+        Super = self.superclass(class_schema['superclass_uri'])
+        return '\n'.join(['', '',
+                          class_source(class_schema, Super),
+                          '', '',
+                          f'sbol.Document.register_builder({class_uri!r}, build_{class_name})'])
+
+    @staticmethod
+    def describe(module, ontology_namespace):
+        '''
+        Summarizes the observable behaviour of the classes in a generated module
+        '''
+        class Visitor():
+            def __getattr__(self, name):
+                return lambda obj: visits.append(name)
+
+        description = {}
+        class_names = getattr(module, '__all__', None)
+        if class_names is None:
+            class_names = [name for name, obj in module.__dict__.items() if isinstance(obj, type)]
+        for class_name in class_names:
+            Class = getattr(module, class_name)
+            type_uri = ontology_namespace + class_name
+            obj = sbol.Document._uri_type_map[type_uri](identity=f'http://example.org/{class_name}',
+                                                        type_uri=type_uri)
+            visits = []
+            obj.accept(Visitor())
+            description[class_name] = {
+                'mro': [c.__name__ for c in Class.mro()],
+                'builder_type': type(obj) is Class,
+                'type_uri': obj.type_uri,
+                'rdf_types': list(obj._rdf_types),
+                'accept': visits,
+                'properties': {name: (type(p).__name__, str(p.property_uri), p.lower_bound, p.upper_bound)
+                               for name, p in obj.__dict__.items() if isinstance(p, sbol.Property)},
+            }
+        return description
+
+    @staticmethod
+    def verify(modules, output_path=None):
+        '''
+        Compares modules written by the ModuleWriter against the modules that
+        the SBOLFactory generates dynamically from the same ontologies. The
+        modules are given as (module_name, ontology_path, ontology_namespace)
+        in the order they are generated. Returns a list of differences.
+        '''
+        if output_path is None:
+            with tempfile.TemporaryDirectory() as tmp:
+                return ModuleWriter.verify(modules, tmp)
+
+        SBOLFactory.clear()
+        expected = {}
+        for module_name, ontology_path, ontology_namespace in modules:
+            module = SBOLFactory(module_name, ontology_path, ontology_namespace)
+            expected[module_name] = ModuleWriter.describe(module, ontology_namespace)
+
+        SBOLFactory.clear()
+        for module_name, ontology_path, ontology_namespace in modules:
+            ModuleWriter(module_name, ontology_path, ontology_namespace).write(output_path)
+        SBOLFactory.clear()
+
+        actual = {}
+        sys.path.insert(0, output_path)
+        try:
+            for module_name, ontology_path, ontology_namespace in modules:
+                module = importlib.import_module(module_name)
+                actual[module_name] = ModuleWriter.describe(module, ontology_namespace)
+        finally:
+            sys.path.remove(output_path)
+            for module_name, _, _ in modules:
+                sys.modules.pop(module_name, None)
+
+        differences = []
+        for module_name, classes in expected.items():
+            for class_name in sorted(set(classes) | set(actual[module_name])):
+                if class_name not in actual[module_name]:
+                    differences.append(f'{module_name}.{class_name} was not written')
+                elif class_name not in classes:
+                    differences.append(f'{module_name}.{class_name} was not generated by the SBOLFactory')
+                else:
+                    for key, value in classes[class_name].items():
+                        if actual[module_name][class_name][key] != value:
+                            differences.append(f'{module_name}.{class_name} {key}: expected {value}, '
+                                               f'found {actual[module_name][class_name][key]}')
+        return differences
+
+    @staticmethod
+    def main(argv=None):
+        parser = argparse.ArgumentParser(description='Generate static Python modules from ontologies')
+        parser.add_argument(
+            '-m',
+            '--module',
+            dest='modules',
+            nargs=3,
+            action='append',
+            required=True,
+            metavar=('NAME', 'ONTOLOGY', 'NAMESPACE'),
+            help='Module to generate. Repeat for modules that depend on each other, in the order they are generated'
+        )
+        parser.add_argument(
+            '-o',
+            '--output',
+            dest='output',
+            help='Directory in which to write the packages. By default, the current directory, or with '
+                 '--verify, a temporary directory that is removed afterwards'
+        )
+        parser.add_argument(
+            '--verify',
+            dest='verify',
+            action='store_true',
+            help='Check that the written modules behave the same as the dynamically generated ones'
+        )
+        args = parser.parse_args(argv)
+
+        if args.verify:
+            differences = ModuleWriter.verify(args.modules, args.output)
+            for difference in differences:
+                print(difference)
+            if differences:
+                sys.exit(1)
+            print('Written modules match the SBOLFactory')
+            return
+
+        output_path = args.output if args.output is not None else '.'
+        for module_name, ontology_path, ontology_namespace in args.modules:
+            fname = ModuleWriter(module_name, ontology_path, ontology_namespace).write(output_path)
+            print(f'Wrote {fname}')
+
+
+if __name__ == '__main__':
+    ModuleWriter.main()
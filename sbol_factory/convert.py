@@ -0,0 +1,315 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import glob
+import importlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from rdflib import Graph
+from rdflib.util import guess_format
+
+from .json_ld_writer import JsonLdWriter, TripleSink, nt_row, sorted_rows
+
+
+# Output formats, with the extension of the files written in each
+FORMATS = {
+    'turtle': '.ttl',
+    'nt': '.nt',
+    'sorted-nt': '.nt',
+    'xml': '.rdf',
+    'json-ld': '.jsonld',
+}
+
+# The file, in each directory that outputs are written to, that lists the
+# outputs written there, so that a later conversion does not take them for inputs
+MANIFEST = '.sbol-factory-convert'
+
+
+class BatchConverter():
+    '''
+    Converts many RDF files between formats across a pool of worker
+    processes. Each worker imports rdflib, and any modules whose prefixes
+    define the JSON-LD context, once when it starts, rather than once per
+    file. An output that is newer than its input is not converted again.
+    '''
+
+    # The JsonLdWriter of a worker process, which holds its context
+    _writer = None
+
+    def __init__(self, output_format, output_path=None, modules=(), processes=None, buffer_size=1000000,
+                 force=False):
+        if output_format not in FORMATS:
+            raise ValueError(f'Unknown output format {output_format}. Expected one of {", ".join(FORMATS)}')
+        self.output_format = output_format
+        self.output_path = output_path
+        self.modules = list(modules)
+        self.processes = processes
+        self.buffer_size = buffer_size
+        self.force = force
+
+    @staticmethod
+    def find_inputs(patterns):
+        '''
+        Returns (input_path, relative_path) for every file named by the given
+        files, directories and glob patterns. Directories are searched
+        recursively for files in a format that rdflib recognises, and the
+        path of each file relative to its directory is kept for its output.
+        '''
+        inputs = []
+        for pattern in patterns:
+            if os.path.isdir(pattern):
+                for root, dirs, files in os.walk(pattern):
+                    dirs.sort()
+                    for name in sorted(files):
+                        path = os.path.join(root, name)
+                        if guess_format(path) is not None:
+                            inputs.append((path, os.path.relpath(path, pattern)))
+            elif os.path.isfile(pattern):
+                inputs.append((pattern, os.path.basename(pattern)))
+            else:
+                paths = sorted(glob.glob(pattern, recursive=True))
+                if not paths:
+                    raise FileNotFoundError(f'No files match {pattern}')
+                inputs += [(path, os.path.basename(path)) for path in paths if os.path.isfile(path)]
+        return inputs
+
+    def output_file(self, input_path, relative_path):
+        stem, _ = os.path.splitext(relative_path)
+        output_dir = self.output_path
+        if output_dir is None:
+            output_dir = os.path.dirname(input_path)
+            stem = os.path.basename(stem)
+        output_file = os.path.join(output_dir, stem + FORMATS[self.output_format])
+        if os.path.abspath(output_file) == os.path.abspath(input_path):
+            output_file = os.path.join(output_dir, f'{stem}.{self.output_format}{FORMATS[self.output_format]}')
+        return output_file
+
+    def plan(self, patterns):
+        '''
+        Returns (input_path, output_file) for every file to convert. Files
+        that an earlier conversion wrote, as listed in the manifest of their
+        directory, are not inputs themselves. An input may not be converted
+        to another input, and two inputs may not be converted to the same
+        output.
+        '''
+        outputs = {}
+        for input_path, relative_path in BatchConverter.find_inputs(patterns):
+            outputs[os.path.abspath(input_path)] = (input_path, self.output_file(input_path, relative_path))
+        manifests = {}
+        written = set()
+        for key in outputs:
+            directory = os.path.dirname(key)
+            if directory not in manifests:
+                manifests[directory] = BatchConverter.read_manifest(directory)
+            if os.path.basename(key) in manifests[directory]:
+                written.add(key)
+        plan = []
+        converted_from = {}
+        for key, (input_path, output_file) in outputs.items():
+            if key in written:
+                continue
+            output_key = os.path.abspath(output_file)
+            if output_key in outputs and output_key not in written:
+                raise ValueError(f'{input_path} would be converted to {output_file}, which is also an input')
+            if output_key in converted_from:
+                raise ValueError(f'{converted_from[output_key]} and {input_path} would both be converted to '
+                                 f'{output_file}')
+            converted_from[output_key] = input_path
+            plan.append((input_path, output_file))
+        return plan
+
+    @staticmethod
+    def read_manifest(directory):
+        '''
+        Returns the names of the files in a directory that earlier conversions wrote
+        '''
+        try:
+            with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+                return set(json.load(f))
+        except FileNotFoundError:
+            return set()
+
+    @staticmethod
+    def record_outputs(output_files):
+        '''
+        Adds the given outputs to the manifests of their directories
+        '''
+        by_directory = {}
+        for output_file in output_files:
+            by_directory.setdefault(os.path.dirname(os.path.abspath(output_file)), set()).add(
+                os.path.basename(output_file))
+        for directory, names in by_directory.items():
+            names |= BatchConverter.read_manifest(directory)
+            with open(os.path.join(directory, MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump(sorted(names), f, indent=1)
+
+    def is_up_to_date(self, input_path, output_file):
+        return (not self.force and os.path.exists(output_file) and
+                os.path.getmtime(output_file) >= os.path.getmtime(input_path))
+
+    def convert(self, patterns, report=print):
+        '''
+        Converts the files named by the given files, directories and glob
+        patterns. Calls report with a line for each file as it completes, and
+        with a summary of the throughput. Returns (input_path, output_path,
+        seconds, error) for each file that was converted or failed.
+        '''
+        jobs = []
+        skipped = 0
+        for input_path, output_file in self.plan(patterns):
+            if self.is_up_to_date(input_path, output_file):
+                skipped += 1
+            else:
+                jobs.append((input_path, output_file))
+
+        start = time.perf_counter()
+        results = []
+        if jobs:
+            context = None
+            if 'fork' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(self.processes, mp_context=context,
+                                     initializer=BatchConverter._init_worker,
+                                     initargs=(self.modules, self.buffer_size)) as executor:
+                futures = [executor.submit(BatchConverter._convert_file, input_path, output_file,
+                                           self.output_format)
+                           for input_path, output_file in jobs]
+                for future in as_completed(futures):
+                    result = future.result()
+                    input_path, output_file, seconds, error = result
+                    if error is None:
+                        report(f'{seconds:8.2f} s  {input_path} -> {output_file}')
+                    else:
+                        report(f'  failed    {input_path}: {error}')
+                    results.append(result)
+        seconds = time.perf_counter() - start
+
+        converted = [result for result in results if result[3] is None]
+        BatchConverter.record_outputs(output_file for _, output_file, _, _ in converted)
+        failed = len(results) - len(converted)
+        megabytes = sum(os.path.getsize(input_path) for input_path, _, _, _ in converted) / 2**20
+        summary = f'{len(converted)} converted, {skipped} up to date, {failed} failed in {seconds:.2f} s'
+        if converted and seconds > 0:
+            summary += f' ({len(converted) / seconds:.1f} files/s, {megabytes / seconds:.1f} MB/s)'
+        report(summary)
+        return results
+
+    @staticmethod
+    def _init_worker(modules, buffer_size):
+        # Importing the modules generates their classes, which registers the
+        # prefixes of their ontologies for the context
+        for module in modules:
+            importlib.import_module(module)
+        BatchConverter._writer = JsonLdWriter(buffer_size=buffer_size)
+
+    @staticmethod
+    def _convert_file(input_path, output_file, output_format):
+        start = time.perf_counter()
+        # Write to a temporary file first so that a failed conversion never
+        # leaves behind an output that looks up to date
+        partial_file = f'{output_file}.part'
+        try:
+            os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+            BatchConverter.convert_file(input_path, partial_file, output_format, BatchConverter._writer)
+            os.replace(partial_file, output_file)
+        except Exception as e:
+            if os.path.exists(partial_file):
+                os.remove(partial_file)
+            return input_path, output_file, time.perf_counter() - start, f'{type(e).__name__}: {e}'
+        return input_path, output_file, time.perf_counter() - start, None
+
+    @staticmethod
+    def convert_file(input_path, output_file, output_format, writer=None):
+        '''
+        Converts one RDF file, in any format that rdflib can parse, to the given output format
+        '''
+        input_format = guess_format(input_path) or 'turtle'
+        if writer is None:
+            writer = JsonLdWriter()
+        if output_format == 'json-ld':
+            writer.convert(input_path, output_file, input_format)
+        elif output_format == 'sorted-nt':
+            with open(output_file, 'w', encoding='utf-8') as f:
+                previous = None
+                for row in sorted_rows(input_path, input_format, writer.buffer_size):
+                    if row != previous:
+                        f.write(row)
+                    previous = row
+        elif output_format == 'nt':
+            with open(output_file, 'w', encoding='utf-8') as f:
+                TripleSink(lambda triple: f.write(nt_row(triple))).parse(input_path, format=input_format)
+        else:
+            graph = Graph()
+            for prefix, namespace in writer.context.items():
+                graph.bind(prefix, namespace)
+            graph.parse(input_path, format=input_format)
+            graph.serialize(destination=output_file, format=output_format)
+
+    @staticmethod
+    def main(argv=None):
+        parser = argparse.ArgumentParser(description='Convert RDF files between formats')
+        parser.add_argument(
+            'inputs',
+            nargs='+',
+            help='Input files, directories or glob patterns'
+        )
+        parser.add_argument(
+            '-t',
+            '--to',
+            dest='output_format',
+            required=True,
+            choices=list(FORMATS),
+            help='Output format'
+        )
+        parser.add_argument(
+            '-o',
+            '--output',
+            dest='output',
+            help='Directory in which to write the converted files. By default, each is written beside its input'
+        )
+        parser.add_argument(
+            '-m',
+            '--module',
+            dest='modules',
+            action='append',
+            default=[],
+            help='Module that generates its classes with the SBOLFactory when imported, e.g., opil. '
+                 'The prefixes of its ontologies are defined in the JSON-LD context'
+        )
+        parser.add_argument(
+            '-j',
+            '--processes',
+            dest='processes',
+            type=int,
+            help='Number of worker processes. By default, the number of CPUs'
+        )
+        parser.add_argument(
+            '--buffer-size',
+            dest='buffer_size',
+            type=int,
+            default=1000000,
+            help='Number of triples held in memory by each worker before they are spilled to disk'
+        )
+        parser.add_argument(
+            '--force',
+            dest='force',
+            action='store_true',
+            help='Convert files whose outputs are newer than their inputs'
+        )
+        args = parser.parse_args(argv)
+
+        converter = BatchConverter(args.output_format, args.output, args.modules, args.processes,
+                                   args.buffer_size, args.force)
+        try:
+            results = converter.convert(args.inputs)
+        except (FileNotFoundError, ValueError) as e:
+            parser.error(str(e))
+        if any(error is not None for _, _, _, error in results):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    BatchConverter.main()
@@ -1,9 +1,210 @@
 import argparse
-from rdflib import Graph, plugin
+import heapq
+import importlib
+import json
+import os
+import tempfile
+
+from rdflib import Graph, URIRef, BNode, Literal, RDF, XSD
+from rdflib.util import from_n3, guess_format
+
+from .sbol_factory import SBOLFactory
+
+
+class TripleSink(Graph):
+    '''
+    A Graph that passes each triple parsed into it to a callback, rather than
+    storing it, so that an input can be parsed without holding its triples
+    '''
+
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+
+    def add(self, triple):
+        self.callback(triple)
+        return self
+
+
+def nt_row(triple):
+    '''
+    Returns a triple as a line of N-Triples
+    '''
+    s, p, o = triple
+    if not isinstance(o, Literal):
+        return f'{s.n3()} {p.n3()} {o.n3()} .\n'
+    # Unlike Literal.n3(), a literal is always written on a single line
+    value = o.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"').replace('\r', '\\r')
+    if o.language:
+        return f'{s.n3()} {p.n3()} "{value}"@{o.language} .\n'
+    if o.datatype:
+        return f'{s.n3()} {p.n3()} "{value}"^^<{o.datatype}> .\n'
+    return f'{s.n3()} {p.n3()} "{value}" .\n'
+
+
+def sorted_rows(input_path, format=None, buffer_size=1000000):
+    '''
+    Yields the triples of an RDF file as lines of N-Triples, sorted, and so
+    grouped by subject. At most buffer_size triples are held in memory; the
+    rest are spilled to sorted runs on disk, which are merged.
+    '''
+    if format is None:
+        format = guess_format(input_path) or 'turtle'
+    with tempfile.TemporaryDirectory() as spill_dir:
+        runs = []
+        buffer = []
+
+        def add(triple):
+            buffer.append(nt_row(triple))
+            if len(buffer) >= buffer_size:
+                runs.append(spill(buffer, spill_dir, len(runs)))
+                buffer.clear()
+
+        TripleSink(add).parse(input_path, format=format)
+        if not runs:
+            buffer.sort()
+            yield from buffer
+            return
+        runs.append(spill(buffer, spill_dir, len(runs)))
+        buffer.clear()
+        files = [open(run, 'r', encoding='utf-8') for run in runs]
+        try:
+            yield from heapq.merge(*files)
+        finally:
+            for f in files:
+                f.close()
+
+
+def spill(rows, spill_dir, i):
+    # Each row is a line of N-Triples, so sorting the rows sorts the
+    # triples by subject: the N3 of a subject followed by a space is
+    # never a prefix of that of another
+    rows.sort()
+    path = os.path.join(spill_dir, f'run{i}.nt')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(rows)
+    return path
+
 
 class JsonLdWriter:
-    ''' Reads in a RDF file in Turtle format and writes it out as JSON-LD
+    ''' Reads in a RDF file in Turtle or another format and writes it out as JSON-LD
+
+    The input is streamed: its triples are grouped by subject in a buffer of
+    at most buffer_size triples, which is spilled to sorted runs on disk when
+    it fills, and a JSON-LD node object is written for each subject as soon
+    as all its triples have been read back. The output does not depend on
+    the size of the buffer.
     '''
+
+    def __init__(self, context=None, buffer_size=1000000):
+        if context is None:
+            context = JsonLdWriter.context()
+        self.context = context
+        self.buffer_size = buffer_size
+        # Longest namespaces first, so that an IRI is compacted with the most specific prefix
+        self.namespaces = sorted(((namespace, prefix) for prefix, namespace in context.items()),
+                                 key=lambda item: -len(item[0]))
+        self.terms = {}
+
+    @staticmethod
+    def context(namespace_to_prefix=None):
+        '''
+        Returns a JSON-LD context that defines the prefix of each namespace
+        in the ontologies loaded by the SBOLFactory
+        '''
+        if namespace_to_prefix is None:
+            namespace_to_prefix = SBOLFactory.namespace_to_prefix
+        return {prefix: namespace for namespace, prefix in sorted(namespace_to_prefix.items(), key=lambda item: item[1])
+                if prefix and not prefix.startswith('@')}
+
+    def convert(self, input_path, output_path, format=None):
+        '''
+        Converts an RDF file in any format that rdflib can parse to JSON-LD
+        '''
+        self.write(sorted_rows(input_path, format, self.buffer_size), output_path)
+
+    def write(self, rows, output_path):
+        '''
+        Writes the triples in the given sorted N-Triples rows as JSON-LD node objects
+        '''
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write('{\n  "@context": ')
+            f.write(json.dumps(self.context, indent=2).replace('\n', '\n  '))
+            f.write(',\n  "@graph": [')
+            separator = '\n'
+            for node in self.nodes(rows):
+                f.write(separator)
+                f.write('    ')
+                f.write(json.dumps(node))
+                separator = ',\n'
+            f.write('\n  ]\n}\n')
+
+    def nodes(self, rows):
+        subject = None
+        node = None
+        previous = None
+        for row in rows:
+            # Duplicate triples are adjacent once sorted
+            if row == previous:
+                continue
+            previous = row
+            s, p, o = row[:-3].split(' ', 2)
+            if s != subject:
+                if node is not None:
+                    yield JsonLdWriter.unwrap(node)
+                subject = s
+                node = {'@id': self.compact(JsonLdWriter.term(s))}
+            p = self.term_key(p)
+            o = JsonLdWriter.term(o)
+            if p == '@type' and isinstance(o, URIRef):
+                node.setdefault('@type', []).append(self.term_key(o.n3()))
+            else:
+                node.setdefault(p, []).append(self.value(o))
+        if node is not None:
+            yield JsonLdWriter.unwrap(node)
+
+    @staticmethod
+    def unwrap(node):
+        return {key: values[0] if isinstance(values, list) and len(values) == 1 else values
+                for key, values in node.items()}
+
+    @staticmethod
+    def term(n3):
+        if n3.startswith('<'):
+            return URIRef(n3[1:-1])
+        if n3.startswith('_:'):
+            return BNode(n3[2:])
+        return from_n3(n3)
+
+    def term_key(self, n3):
+        # Predicates, types and datatypes come from a small vocabulary, so
+        # their compact forms are remembered
+        if n3 not in self.terms:
+            iri = JsonLdWriter.term(n3)
+            self.terms[n3] = '@type' if iri == RDF.type else self.compact(iri)
+        return self.terms[n3]
+
+    def compact(self, node):
+        if isinstance(node, BNode):
+            return node.n3()
+        for namespace, prefix in self.namespaces:
+            if node.startswith(namespace):
+                local_name = node[len(namespace):]
+                # A compact IRI whose local name starts with // would be read as an absolute IRI
+                if local_name and not local_name.startswith('//'):
+                    return f'{prefix}:{local_name}'
+                break
+        return str(node)
+
+    def value(self, node):
+        if isinstance(node, Literal):
+            if node.language:
+                return {'@value': str(node), '@language': node.language}
+            if node.datatype is not None and node.datatype != XSD.string:
+                return {'@value': str(node), '@type': self.term_key(node.datatype.n3())}
+            return str(node)
+        return {'@id': self.compact(node)}
+
     def main(self):
 
         # Parse the arguments
@@ -12,7 +213,7 @@ class JsonLdWriter:
             "-i",
             "--input",
             dest="input",
-            help="Input Turtle file"
+            help="Input RDF file, in Turtle or any format that rdflib can parse"
         )
         parser.add_argument(
             '-o',
@@ -20,27 +221,37 @@ class JsonLdWriter:
             dest='output',
             help='Output JSON-LD file',
         )
+        parser.add_argument(
+            '-f',
+            '--format',
+            dest='format',
+            help='Format of the input file, if it cannot be guessed from its extension',
+        )
+        parser.add_argument(
+            '-m',
+            '--module',
+            dest='modules',
+            action='append',
+            default=[],
+            help='Module that generates its classes with the SBOLFactory when imported, e.g., opil. '
+                 'The prefixes of its ontologies are defined in the context',
+        )
+        parser.add_argument(
+            '--buffer-size',
+            dest='buffer_size',
+            type=int,
+            default=1000000,
+            help='Number of triples held in memory before they are spilled to disk',
+        )
 
         # Generate a dict from the command-line arguments
         args_dict = vars(parser.parse_args())
 
-        # Load RDF files
-        g = Graph()
-        g.parse(args_dict['input'], format='ttl')
-
-        # Define contexts
-        context = {'@timeseries': 'http://bbn.com/synbio/sd2/timeseries#',
-                   '@ncit': 'http://ncicb.nci.nih.gov/xml/owl/EVS/Thesaurus.owl#',
-                   '@opil': 'http://bioprotocols.org/opil/v1#',
-                   '@om' : 'http://www.ontology-of-units-of-measure.org/resource/om-2/',
-                   '@rdfs' : 'http://www.w3.org/2000/01/rdf-schema#',
-                   '@abox' : 'http://bbn.com/synbio/sd2/abox#',
-                   '@xsd' : 'http://www.w3.org/2001/XMLSchema#',
-                   '@sd2' : 'http://bbn.com/synbio/sd2#',
-                   '@sbol3' : 'http://sbols.org/v3#',
-                   '@owl' : 'http://www.w3.org/2002/07/owl#' }
-        g.serialize(destination=args_dict['output'],
-                    format='json-ld', context=context, indent=4)
+        # Load the ontologies whose prefixes define the context
+        for module in args_dict['modules']:
+            importlib.import_module(module)
+        writer = JsonLdWriter(buffer_size=args_dict['buffer_size'])
+        writer.convert(args_dict['input'], args_dict['output'], args_dict['format'])
 
 
 if __name__ == "__main__":
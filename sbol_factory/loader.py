@@ -4,10 +4,19 @@ import importlib.util
 
 class OntologyLoader(importlib.abc.Loader):
 
-    def __init__(self, symbol_table):
+    def __init__(self, symbol_table, resolver=None, lazy_symbols=()):
         super().__init__()
         self.symbol_table = symbol_table
 
+        # A lazy module generates the classes named by lazy_symbols on first
+        # access, by calling resolver with the class name
+        self.resolver = resolver
+        self.lazy_symbols = set(lazy_symbols)
+        self.pending = set()
+
+        # The builders registered with sbol3 for the module's classes, by class URI
+        self.builders = {}
+
     def create_module(self, spec):
         return None
     
@@ -15,3 +24,33 @@ class OntologyLoader(importlib.abc.Loader):
         for symbol, obj in self.symbol_table.items():
             module.__dict__[symbol] = obj
         # TODO: delete symbol_table?  it is not needed after call to exec_module
+        if self.resolver is None:
+            return
+
+        def __getattr__(symbol):
+            obj = self.resolve(module, symbol)
+            if obj is None:
+                raise AttributeError(f'module {module.__name__!r} has no attribute {symbol!r}')
+            return obj
+
+        def __dir__():
+            return sorted(set(module.__dict__) | self.lazy_symbols)
+
+        module.__getattr__ = __getattr__
+        module.__dir__ = __dir__
+        module.__all__ = sorted(set(self.symbol_table) | self.lazy_symbols)
+
+    def resolve(self, module, symbol):
+        if symbol in module.__dict__:
+            return module.__dict__[symbol]
+        # A symbol that is being resolved is not available yet
+        if self.resolver is None or symbol not in self.lazy_symbols or symbol in self.pending:
+            return None
+        self.pending.add(symbol)
+        try:
+            obj = self.resolver(symbol)
+        finally:
+            self.pending.discard(symbol)
+        if obj is not None:
+            module.__dict__[symbol] = obj
+        return obj
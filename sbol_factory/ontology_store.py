@@ -0,0 +1,109 @@
+import os
+import pathlib
+import posixpath
+
+import rdflib
+import rdflib.compare
+
+
+def abs_path(relative_path):  # Expand path based on module installation directory
+    return posixpath.join(os.path.dirname(os.path.realpath(__file__)), relative_path)
+
+
+# Ontologies bundled with the package, which every generated module depends on
+BUNDLED_ONTOLOGIES = [abs_path('rdf/sbolowl3.rdf'), abs_path('rdf/prov-o.owl')]
+
+
+def serialized_path(ontology_path):
+    # The bundled ontologies are shipped pre-serialized as N-Triples as well,
+    # which parse several times faster than RDF/XML
+    return os.path.splitext(ontology_path)[0] + '.nt'
+
+
+class OntologyStore():
+    '''
+    The ontologies shared by SBOLFactory, Query and UMLFactory. Each ontology
+    is parsed once into its own named graph, and is reference counted so that
+    its triples are removed from the store when the last module using it is
+    unloaded. The union of the named graphs is available as graph.
+    '''
+
+    def __init__(self):
+        self.graph = rdflib.ConjunctiveGraph()
+        self.graph.namespace_manager.bind('sbol', rdflib.URIRef('http://sbols.org/v3#'))
+        self.graph.namespace_manager.bind('owl', rdflib.OWL)
+        self.graph.namespace_manager.bind('rdfs', rdflib.RDFS)
+        self.graph.namespace_manager.bind('rdf', rdflib.RDF)
+        self.graph.namespace_manager.bind('xsd', rdflib.XSD)
+        self.graph.namespace_manager.bind('om', rdflib.URIRef('http://www.ontology-of-units-of-measure.org/resource/om-2/'))
+        self.graph.namespace_manager.bind('prov', rdflib.URIRef('http://www.w3.org/ns/prov#'))
+        self.refcounts = {}
+
+        # Incremented whenever triples are added or removed, so that indices
+        # built from the graph can tell that they are stale
+        self.generation = 0
+
+        # The bundled ontologies stay loaded for the lifetime of the store
+        for path in BUNDLED_ONTOLOGIES:
+            if os.path.exists(serialized_path(path)):
+                self.load(path, format='nt', source=serialized_path(path))
+            else:
+                self.load(path, format='xml')
+
+    @staticmethod
+    def identifier(ontology_path):
+        if os.path.exists(ontology_path):
+            return rdflib.URIRef(pathlib.Path(os.path.realpath(ontology_path)).as_uri())
+        return rdflib.URIRef(ontology_path)
+
+    def load(self, ontology_path, format=None, source=None):
+        '''
+        Parses an ontology into the store, unless it is already loaded, and
+        adds a reference to it. The triples are read from source if given,
+        which is an equivalent serialization of the ontology
+        '''
+        identifier = OntologyStore.identifier(ontology_path)
+        if identifier in self.refcounts:
+            self.refcounts[identifier] += 1
+            return
+        if source is None:
+            source = ontology_path
+        if format is None:
+            format = rdflib.util.guess_format(source)
+        self.graph.get_context(identifier).parse(source, format=format)
+        self.refcounts[identifier] = 1
+        self.generation += 1
+
+    def release(self, ontology_path):
+        '''
+        Removes a reference to an ontology, and removes its triples from the
+        store once there are no references left
+        '''
+        identifier = OntologyStore.identifier(ontology_path)
+        if identifier not in self.refcounts:
+            return
+        self.refcounts[identifier] -= 1
+        if self.refcounts[identifier] == 0:
+            del self.refcounts[identifier]
+            self.graph.remove_context(self.graph.get_context(identifier))
+            self.generation += 1
+
+    @staticmethod
+    def serialize_bundled():
+        '''
+        Writes the N-Triples serializations of the bundled ontologies. Run this
+        whenever a bundled ontology is updated
+        '''
+        for path in BUNDLED_ONTOLOGIES:
+            g = rdflib.Graph()
+            g.parse(path, format='xml')
+            # Canonical blank node labels and sorted lines, so that the
+            # serialization only changes with the ontology
+            g = rdflib.compare.to_canonical_graph(g)
+            lines = sorted(line for line in g.serialize(format='nt').splitlines() if line)
+            with open(serialized_path(path), 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+
+
+if __name__ == '__main__':
+    OntologyStore.serialize_bundled()
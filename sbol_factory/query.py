@@ -1,12 +1,19 @@
 import rdflib
-import os
 import posixpath
 from math import inf
 from sbol3 import SBOL_IDENTIFIED, SBOL_TOP_LEVEL, PROV_ACTIVITY, PROV_PLAN, PROV_AGENT
+from .schema_index import SchemaIndex, SparqlSchemaIndex
+from .ontology_store import OntologyStore
 
 class Query():
 
+    store = None
     graph = None
+    index = None
+
+    # How an index is extracted from the graph: 'triples', in one pass over
+    # them, or 'sparql', with a fixed number of queries over every class
+    extraction = 'triples'
     OWL = rdflib.URIRef('http://www.w3.org/2002/07/owl#')
     RDF = rdflib.URIRef('http://www.w3.org/1999/02/22-rdf-syntax-ns#')
     SBOL = rdflib.URIRef('http://sbols.org/v3#')
@@ -15,22 +22,50 @@ class Query():
     OM = rdflib.URIRef('http://www.ontology-of-units-of-measure.org/resource/om-2/')
     PROVO = rdflib.URIRef('http://www.w3.org/ns/prov#')
 
-    def __init__(self, ontology_path):
-        if not Query.graph:
-            Query.graph = rdflib.Graph()
-            Query.graph.parse(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'rdf/sbolowl3.rdf'))
-            Query.graph.parse(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'rdf/prov-o.owl'), format ='xml')
-            Query.graph.namespace_manager.bind('sbol', Query.SBOL)
-            Query.graph.namespace_manager.bind('rdfs', Query.RDFS)
-            Query.graph.namespace_manager.bind('rdf', Query.RDF)
-            Query.graph.namespace_manager.bind('xsd', Query.XSD)
-            Query.graph.namespace_manager.bind('om', Query.OM)
-            Query.graph.namespace_manager.bind('prov', Query.PROVO)
-
-        Query.graph.parse(ontology_path, format=rdflib.util.guess_format(ontology_path))
+    def __init__(self, ontology_path, indexed=True, extraction=None):
+        # Every Query shares one OntologyStore, which parses each ontology only once
+        if Query.store is None:
+            Query.store = OntologyStore()
+            Query.graph = Query.store.graph
+        Query.store.load(ontology_path)
+        self.store = Query.store
         self.graph = Query.graph
 
+        # By default, queries are answered from an in-memory SchemaIndex rather
+        # than by evaluating SPARQL against the graph
+        self.indexed = indexed
+        self.extraction = extraction or Query.extraction
+
+    def get_index(self):
+        # The index is shared by every Query on the same store, and is rebuilt
+        # on first use after ontologies are loaded or released
+        index = Query.index
+        sparql = self.extraction == 'sparql'
+        if index is not None and index.graph is self.graph and index.generation == self.store.generation \
+                and isinstance(index, SparqlSchemaIndex) == sparql:
+            return index
+        if sparql:
+            index = SparqlSchemaIndex(self.graph, self.store.generation, self.evaluate)
+        else:
+            index = SchemaIndex(self.graph, self.store.generation)
+        if self.store is Query.store:
+            Query.index = index
+        return index
+
+    def evaluate(self, query):
+        # Every SPARQL query is evaluated here, so that QueryStats can time them
+        return self.graph.query(query)
+
+    @staticmethod
+    def clear():
+        # Drop the shared store, along with every ontology in it
+        Query.store = None
+        Query.graph = None
+        Query.index = None
+
     def query_base_class(self, cls):
+        if self.indexed:
+            return self.get_index().query_base_class(cls)
         try:
             superclass = self.query_superclass(cls)
             return self.query_base_class(superclass)
@@ -46,6 +81,8 @@ class Query():
         return list(base_classes)
 
     def query_classes(self):
+        if self.indexed:
+            return self.get_index().query_classes()
         query = '''
             SELECT distinct ?cls 
             WHERE 
@@ -53,11 +90,13 @@ class Query():
                 ?cls rdf:type owl:Class . 
             }
             '''
-        response = self.graph.query(query)
+        response = self.evaluate(query)
         sbol_types = [str(row[0]) for row in response]
         return sbol_types
 
     def query_subclasses(self, superclass):
+        if self.indexed:
+            return self.get_index().query_subclasses(superclass)
         query = '''
             SELECT distinct ?subclass 
             WHERE 
@@ -66,11 +105,13 @@ class Query():
                 ?subclass rdfs:subClassOf <{}>
             }}
             '''.format(superclass)
-        response = self.graph.query(query)
+        response = self.evaluate(query)
         subclasses = [row[0] for row in response]
         return subclasses
 
     def query_superclass(self, subclass):
+        if self.indexed:
+            return self.get_index().query_superclass(subclass)
         query = '''
             SELECT distinct ?superclass 
             WHERE 
@@ -79,7 +120,7 @@ class Query():
                 <{}> rdfs:subClassOf ?superclass
             }}
             '''.format(subclass)
-        response = self.graph.query(query)
+        response = self.evaluate(query)
         if len(response) == 0:
             raise Exception('{} has no superclass'.format(subclass))
         if len(response) > 1:
@@ -91,6 +132,11 @@ class Query():
         return superclass
 
     def query_ancestors(self, class_uri):
+        if self.indexed:
+            ancestors = self.get_index().query_ancestors(class_uri)
+            if len(ancestors) == 0:
+                raise Exception('{} has no ancestors'.format(class_uri))
+            return [str(c) for c in ancestors]
         query = f'''
             SELECT distinct ?superclass
             WHERE 
@@ -99,13 +145,18 @@ class Query():
                 ?superclass rdf:type owl:Class .
             }}}}
             '''
-        response = self.graph.query(query)
+        response = self.evaluate(query)
         if len(response) == 0:
-            raise Exception('{} has no ancestors'.format(subclass))
+            raise Exception('{} has no ancestors'.format(class_uri))
         return [str(row[0]) for row in response]
 
 
     def query_descendants(self, class_uri):
+        if self.indexed:
+            descendants = self.get_index().query_descendants(class_uri)
+            if len(descendants) == 0:
+                raise Exception('{} has no descendants'.format(class_uri))
+            return [str(c) for c in descendants]
         query = f'''
             SELECT distinct ?descendant
             WHERE 
@@ -114,14 +165,16 @@ class Query():
                 ?descendant rdfs:subClassOf* <{class_uri}>
             }}}}
             '''
-        response = self.graph.query(query)
+        response = self.evaluate(query)
         if len(response) == 0:
-            raise Exception('{} has no superclass'.format(subclass))
+            raise Exception('{} has no descendants'.format(class_uri))
         return [str(row[0]) for row in response]
 
 
 
     def query_object_properties(self, class_uri):
+        if self.indexed:
+            return self.get_index().query_object_properties(class_uri)
         query =     '''
             SELECT distinct ?property_uri
             WHERE 
@@ -130,7 +183,7 @@ class Query():
                 ?property_uri rdfs:domain/(owl:unionOf/rdf:rest*/rdf:first)* <{}>.
             }}
             '''.format(class_uri)
-        response = self.graph.query(query)
+        response = self.evaluate(query)
         response = [str(row[0]) for row in response]
         property_types = response
 
@@ -144,7 +197,7 @@ class Query():
                 ?restriction owl:onProperty ?property_uri .
             }}
             '''.format(class_uri) 
-        response = self.graph.query(query)
+        response = self.evaluate(query)
         response = [str(row[0]) for row in response]
         property_types.extend(response)
         return list(set(property_types))
@@ -163,6 +216,8 @@ class Query():
         return [self.query_label(p).replace(' ', '_') for p in property_uris] 
 
     def query_compositional_properties(self, class_uri):
+        if self.indexed:
+            return self.get_index().query_compositional_properties(class_uri)
         query = '''
             SELECT distinct ?property_uri
             WHERE 
@@ -173,7 +228,7 @@ class Query():
             }}
             '''.format(class_uri)
 
-        response = self.graph.query(query)
+        response = self.evaluate(query)
         response = [str(row[0]) for row in response]
         property_types = response
 
@@ -188,12 +243,14 @@ class Query():
                 ?restriction owl:onProperty ?property_uri .
             }}
             '''.format(class_uri)
-        response = self.graph.query(query)
+        response = self.evaluate(query)
         response = [str(row[0]) for row in response]
         property_types.extend(response) 
         return list(set(property_types))
 
     def query_datatype_properties(self, class_uri):
+        if self.indexed:
+            return self.get_index().query_datatype_properties(class_uri)
         query =     '''
             SELECT distinct ?property_uri
             WHERE 
@@ -202,7 +259,7 @@ class Query():
                 ?property_uri rdfs:domain/(owl:unionOf/rdf:rest*/rdf:first)* <{}>.
             }}
             '''.format(class_uri)
-        response = self.graph.query(query)
+        response = self.evaluate(query)
         response = [str(row[0]) for row in response]
         property_types = response
 
@@ -216,12 +273,14 @@ class Query():
                 ?restriction owl:onProperty ?property_uri .
             }}
             '''.format(class_uri) 
-        response = self.graph.query(query)
+        response = self.evaluate(query)
         response = [str(row[0]) for row in response]
         property_types.extend(response)
         return list(set(property_types))
 
     def query_cardinality(self, property_uri, class_uri):
+        if self.indexed:
+            return self.get_index().query_cardinality(property_uri, class_uri)
         lower_bound = 0
         upper_bound = inf
         query = '''
@@ -234,17 +293,24 @@ class Query():
                 ?restriction {{}} ?cardinality .
             }}}}
             '''.format(class_uri, property_uri)
-        response = self.graph.query(query.format('owl:minCardinality'))
+        response = self.evaluate(query.format('owl:minCardinality'))
         response = [str(row[0]) for row in response]
         if len(response):
             lower_bound = int(response[0])
-        response = self.graph.query(query.format('owl:maxCardinality'))
+        response = self.evaluate(query.format('owl:maxCardinality'))
         response = [str(row[0]) for row in response]
         if len(response):
             upper_bound = int(response[0])
         return (lower_bound, upper_bound)
 
     def query_property_datatype(self, property_uri, class_uri):
+        if self.indexed:
+            datatypes = self.get_index().query_restricted_datatypes(property_uri, class_uri)
+            if len(datatypes) > 1:
+                raise Exception(f'Conflicting owl:allValuesFrom restrictions found for values of {property_uri} property')
+            if len(datatypes) == 1:
+                return datatypes
+            return self.get_index().query_ranges(property_uri)
         # Check for a restriction first on a specific property of a specific class
         query = '''
             SELECT distinct ?datatype
@@ -256,7 +322,7 @@ class Query():
                 ?restriction owl:onProperty <{}> .
             }}
             '''.format(class_uri, property_uri)    
-        response = self.graph.query(query)
+        response = self.evaluate(query)
         response = [str(row[0]) for row in response]
         datatypes = response
         if len(datatypes) > 1:
@@ -281,7 +347,7 @@ class Query():
             }}
             '''.format(property_uri)   
 
-        response = self.graph.query(query)
+        response = self.evaluate(query)
         response = [str(row[0]) for row in response]
         if len(datatypes) > 1:
             raise Exception(f'Multiple ranges found for {property_uri} property. '
@@ -290,6 +356,18 @@ class Query():
         return datatypes
 
     def query_label(self, property_uri):
+        if self.indexed:
+            response = self.get_index().query_labels(property_uri)
+        else:
+            response = self._query_label(property_uri)
+        if len(response) == 0:
+            raise Exception(f'{property_uri} has no label')
+        if len(response) > 1:
+            raise Exception(f'{property_uri} has more than one label')
+        property_name = response[0]
+        return property_name
+
+    def _query_label(self, property_uri):
         query =     '''
             SELECT distinct ?property_name
             WHERE 
@@ -297,16 +375,23 @@ class Query():
                 <{}> rdfs:label ?property_name
             }}
             '''.format(property_uri)    
-        response = self.graph.query(query)
-        response = [str(row[0]) for row in response]
+        response = self.evaluate(query)
+        return [str(row[0]) for row in response]
+
+    def query_comment(self, uri):
+        if self.indexed:
+            response = self.get_index().query_comments(uri)
+        else:
+            response = self._query_comment(uri)
         if len(response) == 0:
-            raise Exception(f'{property_uri} has no label')
+            return ''
+            #raise Exception(f'{uri} has no comment')
         if len(response) > 1:
-            raise Exception(f'{property_uri} has more than one label')
+            raise Exception(f'{uri} has more than one comment')
         property_name = response[0]
         return property_name
 
-    def query_comment(self, uri):
+    def _query_comment(self, uri):
         query =     '''
             SELECT distinct ?comment
             WHERE 
@@ -314,27 +399,32 @@ class Query():
                 <{}> rdfs:comment ?comment
             }}
             '''.format(uri)    
-        response = self.graph.query(query)
-        response = [str(row[0]) for row in response]
-        if len(response) == 0:
-            return ''
-            #raise Exception(f'{uri} has no comment')
-        if len(response) > 1:
-            raise Exception(f'{uri} has more than one comment')
-        property_name = response[0]
-        return property_name
+        response = self.evaluate(query)
+        return [str(row[0]) for row in response]
 
     def is_top_level(self, class_uri):
+        if self.indexed:
+            return self.get_index().is_top_level(class_uri)
         query = '''
             SELECT ?type
             WHERE {
               ?type rdfs:subClassOf* sbol:TopLevel.
             }'''
-        response = self.graph.query(query)
+        response = self.evaluate(query)
         response = [str(row[0]) for row in response]
         return class_uri in response
 
     def query_required_properties(self, class_uri):
+        # The required properties of each class are only worked out once per
+        # index, so the recursion stops at the first superclass already seen
+        if self.indexed:
+            required_properties = self.get_index().required_properties
+            if class_uri not in required_properties:
+                required_properties[class_uri] = self._query_required_properties(class_uri)
+            return list(required_properties[class_uri])
+        return self._query_required_properties(class_uri)
+
+    def _query_required_properties(self, class_uri):
         inherited_required = []
 
         # Currently we cannot perform inference on PROV-O classes.
@@ -378,7 +468,21 @@ class Query():
     #             print(label)
     #     return required
 
+    def is_subclass(self, class_uri, superclass_uri):
+        # Reflexive, like rdfs:subClassOf*
+        if self.indexed:
+            return self.get_index().is_subclass(class_uri, superclass_uri)
+        query = f'''
+            ASK
+            {{
+                <{class_uri}> rdfs:subClassOf* <{superclass_uri}> .
+            }}
+            '''
+        return bool(self.evaluate(query))
+
     def query_inheritance_hierarchy(self, class_uri):
+        if self.indexed:
+            return self.get_index().query_inheritance_hierarchy(class_uri)
         query = '''
             SELECT distinct ?superclass 
             WHERE 
@@ -387,6 +491,6 @@ class Query():
                 ?superclass rdf:type owl:Class .
             }}
             '''.format(class_uri)
-        response = self.graph.query(query)
+        response = self.evaluate(query)
         subclasses = [row[0] for row in response]
         return subclasses
@@ -0,0 +1,196 @@
+import contextlib
+import functools
+import json
+import logging
+import re
+import time
+import types
+
+
+LOGGER = logging.getLogger(__name__)
+
+# IRIs and literals are replaced in a SPARQL query to give its shape
+SHAPE_PATTERNS = [(re.compile(r'<[^<>\s]*>'), '<?>'), (re.compile(r'"[^"]*"'), '"?"'), (re.compile(r'\s+'), ' ')]
+
+
+class Timings():
+    '''
+    The count, latencies and result sizes of the calls of one method or query shape
+    '''
+
+    def __init__(self):
+        self.latencies = []
+        self.sizes = []
+
+    def add(self, seconds, size):
+        self.latencies.append(seconds)
+        if size is not None:
+            self.sizes.append(size)
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            # Nearest rank
+            return latencies[max(0, -(-len(latencies) * p // 100) - 1)]
+
+        return {
+            'count': len(latencies),
+            'total_seconds': sum(latencies),
+            'mean_seconds': sum(latencies) / len(latencies),
+            'p50_seconds': percentile(50),
+            'p90_seconds': percentile(90),
+            'p99_seconds': percentile(99),
+            'max_seconds': latencies[-1],
+            'total_results': sum(self.sizes),
+            'max_results': max(self.sizes, default=0),
+        }
+
+
+class QueryStats():
+    '''
+    Opt-in instrumentation of Query and of SBOLFactory. While enabled, every
+    query method call and every SPARQL evaluation is timed, and recorded by
+    method and by query shape, i.e., the query with its IRIs and literals
+    elided. Calls slower than slow_query_threshold seconds are logged. The
+    time of each module generated by the SBOLFactory is broken down by phase,
+    and the time of generating each of its classes is recorded.
+    '''
+
+    enabled = False
+    slow_query_threshold = None
+    methods = {}
+    shapes = {}
+    slow_queries = []
+    modules = {}
+
+    # The phases being timed, innermost last, and the module they belong to
+    _stack = []
+    _module = None
+    _patched = {}
+
+    @staticmethod
+    def enable(slow_query_threshold=None):
+        from .query import Query
+        QueryStats.slow_query_threshold = slow_query_threshold
+        if QueryStats.enabled:
+            return
+        QueryStats.enabled = True
+        for name, method in list(vars(Query).items()):
+            if isinstance(method, types.FunctionType) and \
+                    (name.startswith('query_') or name in ('is_top_level', 'is_subclass', 'evaluate')):
+                QueryStats._patched[name] = method
+                setattr(Query, name, QueryStats._instrument(name, method))
+
+    @staticmethod
+    def disable():
+        from .query import Query
+        for name, method in QueryStats._patched.items():
+            setattr(Query, name, method)
+        QueryStats._patched = {}
+        QueryStats.enabled = False
+
+    @staticmethod
+    def reset():
+        QueryStats.methods = {}
+        QueryStats.shapes = {}
+        QueryStats.slow_queries = []
+        QueryStats.modules = {}
+
+    @staticmethod
+    def _instrument(name, method):
+        @functools.wraps(method)
+        def instrumented(self, *args, **kwargs):
+            start = time.perf_counter()
+            result = method(self, *args, **kwargs)
+            seconds = time.perf_counter() - start
+            size = len(result) if isinstance(result, (list, tuple, set)) or name == 'evaluate' else None
+            QueryStats.methods.setdefault(name, Timings()).add(seconds, size)
+            entry = {'method': name, 'args': [str(arg) for arg in args], 'seconds': seconds}
+            if name == 'evaluate':
+                shape = QueryStats.shape(args[0])
+                QueryStats.shapes.setdefault(shape, Timings()).add(seconds, size)
+                entry = {'method': name, 'shape': shape, 'seconds': seconds}
+            threshold = QueryStats.slow_query_threshold
+            if threshold is not None and seconds >= threshold:
+                QueryStats.slow_queries.append(entry)
+                LOGGER.warning(f'Slow query: {name}({", ".join(entry.get("args", [entry.get("shape")]))}) '
+                               f'took {seconds:.3f} s')
+            return result
+        return instrumented
+
+    @staticmethod
+    def shape(query):
+        for pattern, replacement in SHAPE_PATTERNS:
+            query = pattern.sub(replacement, query)
+        return query.strip()
+
+    @staticmethod
+    @contextlib.contextmanager
+    def module(module_name):
+        '''
+        Times the generation of a module, whose phases are timed by phase()
+        '''
+        if not QueryStats.enabled:
+            yield
+            return
+        outer = QueryStats._module
+        QueryStats._module = QueryStats.modules.setdefault(module_name, {'total_seconds': 0.0, 'phases': {},
+                                                                        'classes': {}})
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            QueryStats._module['total_seconds'] += time.perf_counter() - start
+            QueryStats._module = outer
+
+    @staticmethod
+    def phase(name, class_name=None):
+        '''
+        Times a phase of the generation of the current module. The time of a
+        phase excludes that of the phases nested in it, so that the phases
+        of a module add up to its total. With class_name, the time is also
+        recorded for the class.
+        '''
+        if QueryStats._module is None:
+            return contextlib.nullcontext()
+        return QueryStats._phase(name, class_name)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _phase(name, class_name):
+        module = QueryStats._module
+        frame = [0.0]  # Time of the nested phases
+        QueryStats._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            QueryStats._stack.pop()
+            if QueryStats._stack:
+                QueryStats._stack[-1][0] += elapsed
+            module['phases'][name] = module['phases'].get(name, 0.0) + elapsed - frame[0]
+            if class_name is not None:
+                module['classes'][class_name] = module['classes'].get(class_name, 0.0) + elapsed
+
+    @staticmethod
+    def snapshot():
+        '''
+        Returns the statistics recorded so far, as JSON-serializable dicts
+        '''
+        def by_total(timings):
+            snapshots = {key: t.snapshot() for key, t in timings.items()}
+            return dict(sorted(snapshots.items(), key=lambda item: -item[1]['total_seconds']))
+
+        return {
+            'methods': by_total(QueryStats.methods),
+            'shapes': by_total(QueryStats.shapes),
+            'slow_queries': list(QueryStats.slow_queries),
+            'modules': json.loads(json.dumps(QueryStats.modules)),
+        }
+
+    @staticmethod
+    def dump(path):
+        with open(path, 'w') as f:
+            json.dump(QueryStats.snapshot(), f, indent=2)
@@ -1,24 +1,29 @@
 from .query import Query
-from .shacl_validator import ShaclValidator
+from .query_stats import QueryStats
 from .loader import OntologyLoader
+from .schema_cache import SchemaCache
+from .class_source import class_source
+from .validation_report import ValidationReport, ValidationResult
 
 import sbol3 as sbol
-from sbol3 import PYSBOL3_MISSING, SBOL_TOP_LEVEL, SBOL_IDENTIFIED
+from sbol3 import SBOL_TOP_LEVEL, SBOL_IDENTIFIED
 
 # pySBOL extension classes are aliased because they are not present in SBOL-OWL
 from sbol3 import CustomTopLevel as TopLevel
 from sbol3 import CustomIdentified as Identified
 
 import rdflib
-import os
 import sys
 import importlib
+import linecache
 import logging
+from math import inf, ceil
 
 
 SBOL = 'http://sbols.org/v3#'
 OM = 'http://www.ontology-of-units-of-measure.org/resource/om-2/'
 PROVO = 'http://www.w3.org/ns/prov#'
+XSD = 'http://www.w3.org/2001/XMLSchema#'
 
 
 logging.basicConfig()
@@ -37,83 +42,459 @@ LOGGER.addHandler(ch2)
 
 class Document(sbol.Document):
 
-    def __init__(self):
-        super(Document, self).__init__()
-        self._validator = ShaclValidator()        
+    # The number of TopLevel objects validated at a time when validation may stop early
+    FAIL_FAST_SHARD_SIZE = 32
+
+    def __init__(self, *args, **kwargs):
+        super(Document, self).__init__(*args, **kwargs)
+        # The triples of each TopLevel as of the last validation, and its report
+        self._validated = None
+        self._validator = None
+        self._report = None
+
+    def validate(self, full=False, processes=None, precheck=True, max_violations=None, cache=True):
+        '''
+        Validates the document against the SHACL shapes.
+
+        Unless precheck is False, the objects to be validated are first
+        checked against the cardinalities, datatypes and ranges that the
+        SBOLFactory compiled from the ontology, and any violations found are
+        reported without running the much slower SHACL validation.
+
+        After the first validation, only the TopLevel objects that were added,
+        removed or changed since the last validation are validated again,
+        along with the objects they refer to and the objects that refer to
+        them, and their results are merged into the report of the last
+        validation. With full=True, the whole document is validated. With
+        processes, the objects are validated in shards across a pool of that
+        many processes.
+
+        With max_violations, validation stops once that many violations are
+        found, and the report is truncated to them.
+
+        The results of each object are cached by a hash of its content and
+        of the objects it refers to, so that an object that was validated
+        before, in any document, is not validated again. A ValidationCache
+        can be given as cache to use instead of the shared one, or False to
+        not use a cache.
+        '''
+        # The shapes are loaded on the first validation, and shared by every
+        # Document. Imported here so that the validator is only imported if used
+        from .shacl_validator import ShaclValidator
+        validator = ShaclValidator.shared()
+        subgraphs = self.subgraphs()
+
+        # A change outside the TopLevel objects, or to the shapes, may affect any object
+        if full or self._validator is not validator or subgraphs[None] != self._validated[None]:
+            identities = set(subgraphs) - {None}
+            previous = {}
+        else:
+            identities = self.affected_objects(subgraphs)
+            previous = self._report.results_by_object
+        merged = {identity: results for identity, results in previous.items() if identity not in identities}
+
+        # The objects whose content was validated before are not validated again
+        cached = {}
+        if cache:
+            from .validation_cache import ValidationCache
+            if cache is True:
+                cache = ValidationCache.shared()
+            keys = self.cache_keys(validator, identities, subgraphs)
+            cached = {identity: cache.get(key) for identity, key in keys.items()}
+            cached = {identity: results for identity, results in cached.items() if results is not None}
+            merged.update(cached)
+
+        # The violations of the objects that are not validated again count towards the limit
+        remaining = None if max_violations is None else max_violations - sum(map(len, merged.values()))
+        # Only the objects that are validated again are pre-checked, and their
+        # violations are reported along with the results of the others
+        if precheck:
+            from .schema_validator import SchemaValidator
+            schema_validator = SchemaValidator.shared()
+            results = schema_validator.validate(self, remaining, identities - set(cached))
+            if results:
+                merged.update(results)
+                return ValidationReport.from_results(merged, max_violations, schema_validator.stopped)
+        results = self.validate_objects(validator, identities - set(cached), subgraphs, processes, remaining)
+        merged.update(results)
+        if cache:
+            for identity, identity_results in results.items():
+                if identity is not None:
+                    cache.put(keys[identity], identity_results)
+
+        # Only a validation of all the objects is remembered for the next one
+        complete = identities <= set(results) | set(cached)
+        if complete:
+            self._validated = subgraphs
+            self._validator = validator
+            self._report = ValidationReport(merged)
+        # With max_violations=1, pyshacl stops at the first violation of a shard
+        stopped = not complete or (max_violations == 1 and any(results.values()))
+        return ValidationReport.from_results(merged, max_violations, stopped)
+
+    def cache_keys(self, validator, identities, subgraphs):
+        '''
+        Returns the key in the validation cache of each of the TopLevel
+        objects with the given identities, which hashes the shapes, the
+        content of the object, the content of the objects that it refers to
+        and the remaining triples of the document. The remaining triples have
+        no key of their own, as they are validated with every object
+        '''
+        from .validation_cache import ValidationCache
+        owners = {s: identity for identity, triples in subgraphs.items() for s, _, _ in triples}
+        hashes = {}
+
+        def content_hash(identity):
+            if identity not in hashes:
+                hashes[identity] = ValidationCache.content_hash(subgraphs.get(identity, ()))
+            return hashes[identity]
+
+        keys = {}
+        for identity in identities - {None}:
+            references = self.references({identity}, subgraphs, owners) | {None}
+            keys[identity] = ValidationCache.key(validator.hash, content_hash(identity),
+                                                 [content_hash(reference) for reference in references - {identity}])
+        return keys
 
-    def validate(self):
-        conforms, results_graph, results_txt = self._validator.validate(self.graph())
-        return ValidationReport(conforms, results_txt)
+    @staticmethod
+    def references(identities, subgraphs, owners):
+        '''
+        Returns the identities of the TopLevel objects that own the nodes
+        referred to by the objects with the given identities
+        '''
+        references = {o for identity in identities for _, _, o in subgraphs.get(identity, ())}
+        return {owners[o] for o in references if o in owners}
+
+    def validate_objects(self, validator, identities, subgraphs, processes=None, max_violations=None):
+        '''
+        Validates the TopLevel objects with the given identities, and returns
+        their results by identity. The objects are partitioned into a shard
+        per process, each of which is validated along with the objects that
+        its objects refer to. With max_violations, the objects are validated
+        in smaller shards, and the objects of the shards after the one in
+        which that many violations are found are not validated, or returned.
+        The remaining triples of the document are validated with every shard,
+        and their results that no object owns are returned under None by the
+        first shard
+        '''
+        if not identities:
+            return {}
+        owners = {s: identity for identity, triples in subgraphs.items() for s, _, _ in triples}
+        n_shards = processes or 1
+        if max_violations is not None:
+            n_shards = max(n_shards, ceil(len(identities) / Document.FAIL_FAST_SHARD_SIZE))
+        shards = [set() for _ in range(min(n_shards, max(len(identities), 1)))]
+        sizes = [0] * len(shards)
+        # Balance the shards by their number of triples, largest objects first
+        for identity in sorted(identities, key=lambda identity: (-len(subgraphs.get(identity, ())), str(identity))):
+            i = sizes.index(min(sizes))
+            shards[i].add(identity)
+            sizes[i] += len(subgraphs.get(identity, ()))
+
+        graphs = []
+        for shard in shards:
+            neighbours = Document.references(shard, subgraphs, owners)
+            graphs.append(set().union(*(subgraphs.get(identity, ()) for identity in shard | neighbours | {None})))
+
+        results = {}
+        n_violations = 0
+        shard_results = validator.validate_shards(graphs, processes, abort_on_first=max_violations == 1)
+        for i, shard in enumerate(shards):
+            if max_violations is not None and n_violations >= max_violations:
+                break
+            results_graph = next(shard_results)
+            # The results that no object owns are reported by the first shard
+            reported = shard | {None} if i == 0 else shard
+            results.update({identity: [] for identity in reported})
+            for owner, owner_results in ValidationReport.parse_results(results_graph, owners, subgraphs).items():
+                # Results for the objects pulled into other shards are reported by those shards
+                if owner in reported:
+                    results[owner] += owner_results
+                    n_violations += len(owner_results)
+        # Cancels the validation of the remaining shards
+        shard_results.close()
+        return results
+
+    def subgraphs(self):
+        '''
+        Returns the triples of each TopLevel object, including its owned
+        objects, by identity. The remaining triples of the document are
+        returned under None
+        '''
+        subgraphs = {}
+        for obj in self.objects:
+            graph = rdflib.Graph()
+            obj.serialize(graph)
+            subgraphs[rdflib.URIRef(obj.identity)] = frozenset(graph)
+        graph = rdflib.Graph()
+        for orphan in self.orphans:
+            orphan.serialize(graph)
+        graph += self._other_rdf
+        subgraphs[None] = frozenset(graph)
+        return subgraphs
+
+    def affected_objects(self, subgraphs):
+        '''
+        Returns the TopLevel objects whose results may have changed since the
+        last validation: those that changed, and the objects that they refer
+        to or that refer to them, before or after the change
+        '''
+        changed = {identity for identity in set(subgraphs) | set(self._validated)
+                   if subgraphs.get(identity) != self._validated.get(identity)}
+        affected = set(changed)
+        for version in (self._validated, subgraphs):
+            # The nodes of the changed objects, including their owned objects
+            owners = {s: identity for identity, triples in version.items() if identity is not None
+                      for s, _, _ in triples}
+            changed_nodes = {s for identity in changed for s, _, _ in version.get(identity, ())}
+            for identity, triples in version.items():
+                for _, _, o in triples:
+                    # Objects that refer to a changed object
+                    if identity is not None and o in changed_nodes:
+                        affected.add(identity)
+                    # Objects that a changed object refers to
+                    if identity in changed and o in owners:
+                        affected.add(owners[o])
+        affected.discard(None)
+        return affected
 
 
-class ValidationReport():
+class SBOLFactory():
 
-    def __init__(self, is_valid, results_txt):
-        self.is_valid = is_valid
-        self.results = results_txt
-        self.message = ''
-        if not is_valid:
-            i_message = results_txt.find('Message: ') + 9
-            self.message = results_txt[i_message:]
+    # The union of every loaded ontology, shared with Query. See OntologyStore
+    graph = None
+    query = None
 
-    def __repr__(self):
-        return self.message
+    # Prefixes are used to automatically generate module names
+    namespace_to_prefix = {}
 
+    # Ontologies loaded since the last clear(), in order. A module's schema may
+    # depend on any ontology loaded before it, so all of them key its cache entry
+    ontology_paths = []
 
-class SBOLFactory():
+    # The name of the module that loaded each of the ontology_paths, so that
+    # unload() can release the module's ontologies
+    ontology_modules = []
 
-    graph = rdflib.Graph()
-    graph.parse(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'rdf/sbolowl3.rdf'), format ='xml')
-    graph.parse(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'rdf/prov-o.owl'), format ='xml')
-    graph.namespace_manager.bind('sbol', Query.SBOL)
-    graph.namespace_manager.bind('owl', Query.OWL)
-    graph.namespace_manager.bind('rdfs', Query.RDFS)
-    graph.namespace_manager.bind('rdf', Query.RDF)
-    graph.namespace_manager.bind('xsd', Query.XSD)
-    graph.namespace_manager.bind('om', Query.OM)
-    graph.namespace_manager.bind('prov', Query.PROVO)
+    # The schema of each generated class, by class URI, from which generated
+    # objects are checked by the SchemaValidator
+    schemas = {}
 
-    # Prefixes are used to automatically generate module names
-    namespace_to_prefix = {}
+    # Incremented whenever the schemas change, so that a SchemaValidator built
+    # from them can tell that it is out of date
+    schemas_version = 0
+
+    # Number of ontology_paths that have actually been parsed. Ontologies skipped
+    # by a cache hit are parsed later if a subsequent module misses the cache
+    n_parsed = 0
 
-    def __new__(cls, module_name, ontology_path, ontology_namespace, verbose=False):
+    def __new__(cls, module_name, ontology_path, ontology_namespace, verbose=False, cache_dir=None, lazy=False):
         if verbose is False:
             logging.disable(logging.INFO)
-        SBOLFactory.graph.parse(ontology_path, format=rdflib.util.guess_format(ontology_path))
+        with QueryStats.module(module_name):
+            SBOLFactory.add_ontology(module_name, ontology_path)
+
+            # A cache_dir (or the SBOL_FACTORY_CACHE environment variable) enables
+            # the on-disk schema cache, in which case a warm start skips parsing
+            # and querying the ontologies altogether
+            with QueryStats.phase('cache'):
+                cache = SchemaCache.open(cache_dir, module_name, ontology_namespace, SBOLFactory.ontology_paths)
+                schema = cache.load() if cache else None
+            query = None
+            class_uris = None
+            if schema is None:
+                with QueryStats.phase('parse'):
+                    SBOLFactory.load_ontologies()
+                query = SBOLFactory.query
+                if lazy and not cache:
+                    # Classes are compiled on first use, so only enumerate them here
+                    schema = {'namespaces': dict(SBOLFactory.namespace_to_prefix),
+                              'classes': {}}
+                    with QueryStats.phase('enumerate'):
+                        class_uris = [uri for uri in query.query_classes() if ontology_namespace in uri]
+                else:
+                    schema = SBOLFactory.compile_schema(ontology_namespace)
+                    if cache:
+                        with QueryStats.phase('cache'):
+                            cache.save(schema)
+            if class_uris is None:
+                class_uris = list(schema['classes'].keys())
+            SBOLFactory.namespace_to_prefix.update(schema['namespaces'])
+
+            # The builders registered for the module, which unload() unregisters
+            symbol_table = {}
+            builders = {}
+            if lazy:
+                # In lazy mode, classes are generated on first attribute access of
+                # the module, or on first deserialization of an object of the class
+                class_names = {sbol.utils.parse_class_name(uri): uri for uri in class_uris}
+
+                def resolve(class_name):
+                    return SBOLFactory.materialize(class_names[class_name], schema, symbol_table,
+                                                   ontology_namespace, query, builders)
+
+                loader = OntologyLoader(symbol_table, resolve, class_names.keys())
+            else:
+                for class_schema in schema['classes'].values():
+                    symbol_table = SBOLFactory.generate(class_schema, symbol_table, builders)
+                loader = OntologyLoader(symbol_table)
+            loader.builders = builders
+
+            spec = importlib.util.spec_from_loader(
+                module_name,
+                loader
+            )
+            with QueryStats.phase('exec'):
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                sys.modules[module_name] = module
+            if lazy:
+                with QueryStats.phase('register'):
+                    for class_name, class_uri in class_names.items():
+                        builders[class_uri] = SBOLFactory.lazy_builder(module, class_name, class_uri)
+                        sbol.Document.register_builder(class_uri, builders[class_uri])
+            return module
+
+    @staticmethod
+    def materialize(class_uri, schema, symbol_table, ontology_namespace, query, builders=None):
+        '''
+        Generates a class of a lazy module, along with its superclasses
+        '''
+        class_name = sbol.utils.parse_class_name(class_uri)
+        if class_name in symbol_table:
+            return symbol_table[class_name]
+        if class_uri not in schema['classes']:
+            SBOLFactory.compile_class(class_uri, schema['classes'], ontology_namespace, query)
+        class_schema = schema['classes'][class_uri]
+        if ontology_namespace in class_schema['superclass_uri']:
+            SBOLFactory.materialize(class_schema['superclass_uri'], schema, symbol_table, ontology_namespace, query,
+                                    builders)
+        SBOLFactory.generate(class_schema, symbol_table, builders)
+        return SBOLFactory.get_constructor(class_uri, symbol_table)
+
+    @staticmethod
+    def lazy_builder(module, class_name, class_uri):
+        def builder(identity, type_uri):
+            # Generating the class registers its actual builder
+            Class = getattr(module, class_name)
+            actual_builder = sbol.Document._uri_type_map.get(class_uri)
+            if actual_builder is None or actual_builder is builder:
+                return Class(identity=identity, type_uri=type_uri)
+            return actual_builder(identity=identity, type_uri=type_uri)
+        return builder
+
+    @staticmethod
+    def add_ontology(module_name, ontology_path):
+        '''
+        Records an ontology for a module, to be parsed by load_ontologies. An
+        ontology that is already recorded for the module is not added again
+        '''
+        if (module_name, ontology_path) in zip(SBOLFactory.ontology_modules, SBOLFactory.ontology_paths):
+            return
+        SBOLFactory.ontology_paths.append(ontology_path)
+        SBOLFactory.ontology_modules.append(module_name)
+
+    @staticmethod
+    def load_ontologies():
+        # Parse every ontology that has not been parsed yet
+        # into the OntologyStore shared with Query
+        for ontology_path in SBOLFactory.ontology_paths[SBOLFactory.n_parsed:]:
+            SBOLFactory.query = Query(ontology_path)
+            SBOLFactory.graph = Query.graph
+        SBOLFactory.n_parsed = len(SBOLFactory.ontology_paths)
+        if SBOLFactory.graph is None:
+            return
         for prefix, ns in SBOLFactory.graph.namespaces():
             SBOLFactory.namespace_to_prefix[str(ns)] = prefix
             # TODO: handle namespace with conflicting prefixes
 
-        # Use ontology prefix as module name
-        ontology_namespace = ontology_namespace
-        SBOLFactory.query = Query(ontology_path)
-        symbol_table = {}
-        for class_uri in SBOLFactory.query.query_classes():
-            symbol_table = SBOLFactory.generate(class_uri, symbol_table, ontology_namespace)
-
-        spec = importlib.util.spec_from_loader(
-            module_name,
-            OntologyLoader(symbol_table)
-        )
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        sys.modules[module_name] = module
-        return module
+    @staticmethod
+    def compile_schema(ontology_namespace):
+        '''
+        Queries everything needed to generate the classes in the given namespace.
+        The result is JSON-serializable so that it can be cached on disk.
+        '''
+        classes = {}
+        with QueryStats.phase('enumerate'):
+            class_uris = SBOLFactory.query.query_classes()
+        for class_uri in class_uris:
+            classes = SBOLFactory.compile_class(class_uri, classes, ontology_namespace, SBOLFactory.query)
+        return {'namespaces': dict(SBOLFactory.namespace_to_prefix),
+                'classes': classes}
 
     @staticmethod
-    def generate(class_uri, symbol_table, ontology_namespace):
-        log = ''
-        if ontology_namespace not in class_uri: 
-            return symbol_table
+    def compile_class(class_uri, classes, ontology_namespace, query):
+        if ontology_namespace not in class_uri:
+            return classes
+        if class_uri in classes:  # Abort if the class has already been compiled
+            return classes
+
+        # Recurse into superclass, so that superclasses precede their subclasses
+        superclass_uri = query.query_superclass(class_uri)
+        classes = SBOLFactory.compile_class(superclass_uri, classes, ontology_namespace, query)
+
+        with QueryStats.phase('compile'):
+            # Object properties can be either compositional or associative
+            property_uris = query.query_object_properties(class_uri)
+            compositional_properties = query.query_compositional_properties(class_uri)
+            associative_properties = [uri for uri in property_uris if uri not in
+                                      compositional_properties]
+            datatype_properties = query.query_datatype_properties(class_uri)
+            all_property_uris = property_uris + datatype_properties
+            required_args = [arg.replace(' ', '_') for arg in query.query_required_properties(class_uri)]
+
+            classes[class_uri] = {
+                'class_uri': class_uri,
+                'superclass_uri': superclass_uri,
+                'is_top_level': query.is_top_level(class_uri),
+                'associative_properties': sorted(associative_properties),
+                'compositional_properties': sorted(compositional_properties),
+                'datatype_properties': sorted(datatype_properties),
+                'property_names': {uri: query.query_label(uri).replace(' ', '_') for uri in all_property_uris},
+                'cardinalities': {uri: query.query_cardinality(uri, class_uri) for uri in all_property_uris},
+                'datatypes': {uri: query.query_property_datatype(uri, class_uri) for uri in all_property_uris},
+                'required_args': required_args,
+                'placeholder_args': SBOLFactory.query_placeholder_args(class_uri, required_args, query),
+            }
+        return classes
 
-        # Recurse into superclass
-        superclass_uri = SBOLFactory.query.query_superclass(class_uri)
-        symbol_table = SBOLFactory.generate(superclass_uri, symbol_table, ontology_namespace)
+    @staticmethod
+    def query_placeholder_args(class_uri, required_args, query):
+        '''
+        Returns the required arguments whose properties can hold the
+        PYSBOL3_MISSING placeholder, which builders pass until a document
+        provides the actual values. Only reference, text and URI properties
+        accept it.
+        '''
+        pending = set(required_args) - {'identity'}
+        placeholders = set()
+        while pending:
+            object_properties = query.query_object_properties(class_uri)
+            compositional_properties = query.query_compositional_properties(class_uri)
+            for property_uri in object_properties + query.query_datatype_properties(class_uri):
+                property_name = query.query_label(property_uri).replace(' ', '_')
+                if property_name not in pending:
+                    continue
+                # The most specific class that declares the property determines its type
+                pending.remove(property_name)
+                if property_uri in compositional_properties:
+                    continue
+                if property_uri in object_properties or \
+                        query.query_property_datatype(property_uri, class_uri)[:1] in ([XSD + 'string'], [XSD + 'anyURI']):
+                    placeholders.add(property_name)
+            try:
+                class_uri = query.query_superclass(class_uri)
+            except Exception:
+                break
+        return [arg for arg in required_args if arg in placeholders]
 
-        CLASS_URI = class_uri
-        CLASS_NAME = sbol.utils.parse_class_name(class_uri)
+    @staticmethod
+    def generate(class_schema, symbol_table, builders=None):
+        CLASS_URI = class_schema['class_uri']
+        CLASS_NAME = sbol.utils.parse_class_name(CLASS_URI)
+        superclass_uri = class_schema['superclass_uri']
 
-        if SBOLFactory.get_constructor(class_uri, symbol_table):  # Abort if the class has already been generated
+        if SBOLFactory.get_constructor(CLASS_URI, symbol_table):  # Abort if the class has already been generated
             return symbol_table
 
         Super = SBOLFactory.get_constructor(superclass_uri, symbol_table)
@@ -124,126 +505,33 @@ class SBOLFactory():
         LOGGER.info(f'\n{CLASS_NAME}\n')
         LOGGER.info('-' * (len(CLASS_NAME) - 2) + '\n')
 
-        # Collect property information for constructor, cached outside for speed
-        # Object properties can be either compositional or associative
-        property_uris = SBOLFactory.query.query_object_properties(CLASS_URI)
-        compositional_properties = SBOLFactory.query.query_compositional_properties(CLASS_URI)
-        associative_properties = [uri for uri in property_uris if uri not in
-                                  compositional_properties]
-        datatype_properties = SBOLFactory.query.query_datatype_properties(CLASS_URI)
-        property_names = [SBOLFactory.query.query_label(uri) for uri in property_uris]
-        property_names.extend([SBOLFactory.query.query_label(uri) for uri in datatype_properties])
-        property_names = [name.replace(' ', '_') for name in property_names]
-        class_is_top_level = SBOLFactory.query.is_top_level(CLASS_URI)
-        all_property_uris = property_uris + datatype_properties
-        property_uri_to_name = {uri: SBOLFactory.query.query_label(uri).replace(' ', '_') for uri in all_property_uris}
-        property_cardinalities = {uri: SBOLFactory.query.query_cardinality(uri, CLASS_URI) for uri in all_property_uris}
-        property_datatypes = {uri: SBOLFactory.query.query_property_datatype(uri, CLASS_URI) for uri in datatype_properties}
-
-
-
-        # Define constructor
-        def __init__(self, *args, **kwargs):
-            base_kwargs = {kw: val for kw, val in kwargs.items() if kw not in property_names}
-            if 'type_uri' not in base_kwargs:
-                base_kwargs['type_uri'] = CLASS_URI
-            Super.__init__(self, *args, **base_kwargs)
-            if 'http://sbols.org/v3#' in superclass_uri and not superclass_uri == SBOL_TOP_LEVEL and not superclass_uri == SBOL_IDENTIFIED:
-                if class_is_top_level:
-                    self._rdf_types.append(SBOL_TOP_LEVEL)
-                else:
-                    self._rdf_types.append(SBOL_IDENTIFIED)
-
-            # Initialize associative properties
-            for property_uri in associative_properties:
-                property_name = property_uri_to_name[property_uri]
-                lower_bound, upper_bound = property_cardinalities[property_uri]
-                self.__dict__[property_name] = sbol.ReferencedObject(self, property_uri, lower_bound, upper_bound)
-
-            # Initialize compositional properties
-            for property_uri in compositional_properties:
-                property_name = property_uri_to_name[property_uri]
-                lower_bound, upper_bound = property_cardinalities[property_uri]
-                self.__dict__[property_name] = sbol.OwnedObject(self, property_uri, lower_bound, upper_bound)
-
-            # Initialize datatype properties
-            for property_uri in datatype_properties:
-                # TODO: Cache query information outside of constructor
-                property_name = property_uri_to_name[property_uri]
-                # Get the datatype of this property
-                datatypes = property_datatypes[property_uri]
-                if len(datatypes) == 0:
-                    continue
-                if len(datatypes) > 1:  # This might indicate an error in the ontology
-                    raise
-
-                # Get the cardinality of this datatype property
-                lower_bound, upper_bound = property_cardinalities[property_uri]
-                if datatypes[0] == 'http://www.w3.org/2001/XMLSchema#string':
-                    self.__dict__[property_name] = sbol.TextProperty(self, property_uri, lower_bound, upper_bound)
-                elif datatypes[0] == 'http://www.w3.org/2001/XMLSchema#integer':
-                    self.__dict__[property_name] = sbol.IntProperty(self, property_uri, lower_bound, upper_bound)                    
-                elif datatypes[0] == 'http://www.w3.org/2001/XMLSchema#boolean':
-                    self.__dict__[property_name] = sbol.BooleanProperty(self, property_uri, lower_bound, upper_bound)
-                elif datatypes[0] == 'http://www.w3.org/2001/XMLSchema#anyURI':
-                    self.__dict__[property_name] = sbol.URIProperty(self, property_uri, lower_bound, upper_bound)
-                elif datatypes[0] == 'http://www.w3.org/2001/XMLSchema#dateTime':
-                    self.__dict__[property_name] = sbol.DateTimeProperty(self, property_uri, lower_bound, upper_bound)
-
-            for kw, val in kwargs.items():
-                if kw == 'type_uri':
-                    continue
-                if kw in self.__dict__:
-                    try:
-                        self.__dict__[kw].set(val)
-                    except:
-                        pass
-                        # print(kw, val, type(self.__dict__[kw]))
-                        # raise
-
-        def accept(self, visitor):
-            visitor_method = f'visit_{CLASS_NAME}'.lower()
-            getattr(visitor, visitor_method)(self)
-
-        # Instantiate metaclass
-        attribute_dict = {}
-        attribute_dict['__init__'] = __init__
-        attribute_dict['accept'] = accept
-        Class = type(CLASS_NAME, (Super,), attribute_dict)
-
-        #globals()[CLASS_NAME] = Class
-        #self.symbol_table[CLASS_NAME] = Class
-        symbol_table[CLASS_NAME] = Class
-        arg_names = SBOLFactory.query.query_required_properties(CLASS_URI)  # moved outside of builder for speed
-        kwargs = {arg.replace(' ', '_'): PYSBOL3_MISSING for arg in arg_names}
-
-        def builder(identity, type_uri):
-            kwargs['identity'] = identity
-            kwargs['type_uri'] = type_uri
-            return Class(**kwargs)
-
-        sbol.Document.register_builder(str(CLASS_URI), builder)
+        # The constructor and builder are specialized for this class, see class_source
+        with QueryStats.phase('generate', CLASS_NAME):
+            namespace = {'__name__': __name__, '_Super': Super, 'sbol': sbol, 'inf': inf}
+            source = class_source(class_schema, '_Super')
+            # Registered with linecache, so that tracebacks through the class show its source
+            filename = f'<{CLASS_URI}>'
+            linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+            exec(compile(source, filename, 'exec'), namespace)
+            Class = namespace[CLASS_NAME]
+            symbol_table[CLASS_NAME] = Class
+        with QueryStats.phase('register'):
+            sbol.Document.register_builder(str(CLASS_URI), namespace[f'build_{CLASS_NAME}'])
+        if builders is not None:
+            builders[str(CLASS_URI)] = namespace[f'build_{CLASS_NAME}']
+        SBOLFactory.schemas[str(CLASS_URI)] = class_schema
+        SBOLFactory.schemas_version += 1
 
         # Print out properties -- this is for logging only
-        property_uris = SBOLFactory.query.query_object_properties(CLASS_URI)
-        for property_uri in property_uris:
-            property_name = SBOLFactory.query.query_label(property_uri).replace(' ', '_')
-            datatype = SBOLFactory.query.query_property_datatype(property_uri, CLASS_URI)
+        for property_uri in (class_schema['compositional_properties'] + class_schema['associative_properties'] +
+                             class_schema['datatype_properties']):
+            property_name = class_schema['property_names'][property_uri]
+            datatype = class_schema['datatypes'][property_uri]
             if len(datatype):
                 datatype = sbol.utils.parse_class_name(datatype[0])
             else:
                 datatype = None
-            lower_bound, upper_bound = SBOLFactory.query.query_cardinality(property_uri, CLASS_URI)
-            LOGGER.info(f'\t{property_name}\t{datatype}\t{lower_bound}\t{upper_bound}\n')
-        property_uris = SBOLFactory.query.query_datatype_properties(CLASS_URI)
-        for property_uri in property_uris:
-            property_name = SBOLFactory.query.query_label(property_uri).replace(' ', '_')
-            datatype = SBOLFactory.query.query_property_datatype(property_uri, CLASS_URI)
-            if len(datatype):
-                datatype = sbol.utils.parse_class_name(datatype[0])
-            else:
-                datatype = None
-            lower_bound, upper_bound = SBOLFactory.query.query_cardinality(property_uri, CLASS_URI)            
+            lower_bound, upper_bound = class_schema['cardinalities'][property_uri]
             LOGGER.info(f'\t{property_name}\t{datatype}\t{lower_bound}\t{upper_bound}\n')
         return symbol_table
 
@@ -261,13 +549,7 @@ class SBOLFactory():
             return symbol_table[class_name]
 
         # Look in submodule
-        namespace = None
-        if '#' in class_uri:
-            namespace = class_uri[:class_uri.rindex('#')+1]
-        elif '/' in class_uri:
-            namespace = class_uri[:class_uri.rindex('/')+1]
-        else:
-            raise ValueError(f'Cannot parse namespace from {class_uri}. URI must use either / or # as a delimiter.')
+        namespace = SBOLFactory.parse_namespace(class_uri)
 
         # Look in the sbol module 
         if namespace == SBOL or namespace == PROVO or namespace == OM:
@@ -275,8 +557,13 @@ class SBOLFactory():
 
         # Look in other ontologies
         module_name = SBOLFactory.namespace_to_prefix[namespace]
-        if module_name in sys.modules and class_name in sys.modules[module_name].__dict__:
-            return sys.modules[module_name].__dict__[class_name]
+        if module_name in sys.modules:
+            module = sys.modules[module_name]
+            if class_name in module.__dict__:
+                return module.__dict__[class_name]
+            # Classes of a lazy module are generated on first use
+            if type(module.__dict__.get('__loader__')) is OntologyLoader:
+                return module.__loader__.resolve(module, class_name)
 
         #if class_name in globals():
         #    if class_name == 'BehaviorExecution':
@@ -286,18 +573,59 @@ class SBOLFactory():
 
 
 
+    @staticmethod
+    def parse_namespace(class_uri):
+        if '#' in class_uri:
+            return class_uri[:class_uri.rindex('#')+1]
+        if '/' in class_uri:
+            return class_uri[:class_uri.rindex('/')+1]
+        raise ValueError(f'Cannot parse namespace from {class_uri}. URI must use either / or # as a delimiter.')
+
+    @staticmethod
+    def unload(module_name):
+        '''
+        Removes a generated module, unregisters its builders and releases the
+        ontology it was generated from, so that its classes and triples can be
+        garbage collected
+        '''
+        module = sys.modules.get(module_name)
+        if module is None or type(module.__dict__.get('__loader__')) is not OntologyLoader:
+            raise ValueError(f'{module_name} is not a module generated by the SBOLFactory')
+        loader = module.__loader__
+
+        # A builder that has since been replaced belongs to another module
+        for class_uri, builder in loader.builders.items():
+            if sbol.Document._uri_type_map.get(class_uri) is builder:
+                del sbol.Document._uri_type_map[class_uri]
+                SBOLFactory.schemas.pop(class_uri, None)
+                SBOLFactory.schemas_version += 1
+        loader.builders.clear()
+        loader.symbol_table.clear()
+        del sys.modules[module_name]
+
+        for i in reversed(range(len(SBOLFactory.ontology_modules))):
+            if SBOLFactory.ontology_modules[i] != module_name:
+                continue
+            ontology_path = SBOLFactory.ontology_paths.pop(i)
+            del SBOLFactory.ontology_modules[i]
+            # An ontology skipped by a cache hit was never loaded
+            if i < SBOLFactory.n_parsed:
+                SBOLFactory.n_parsed -= 1
+                Query.store.release(ontology_path)
+
     @staticmethod
     def clear():
-        Query.graph = None
-        modules = []
-        ontology_modules = []
-        for name, module in sys.modules.items():
-            modules.append((name, module))
-        for name, module in modules:
-            if '__loader__' in module.__dict__ and type(module.__loader__) is OntologyLoader:
-                ontology_modules.append(name)
-        for name in ontology_modules:
-            del sys.modules[name]
+        for name, module in list(sys.modules.items()):
+            if type(module.__dict__.get('__loader__')) is OntologyLoader:
+                SBOLFactory.unload(name)
+        Query.clear()
+        SBOLFactory.graph = None
+        SBOLFactory.query = None
+        SBOLFactory.ontology_paths = []
+        SBOLFactory.ontology_modules = []
+        SBOLFactory.schemas = {}
+        SBOLFactory.schemas_version += 1
+        SBOLFactory.n_parsed = 0
 
     @staticmethod
     def delete(symbol):
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+
+from .ontology_store import BUNDLED_ONTOLOGIES
+
+
+# Bump whenever the layout of a compiled schema changes
+CACHE_VERSION = 2
+
+
+class SchemaCache():
+    '''
+    On-disk cache of compiled class schemas, so that a warm start can rebuild
+    a module without parsing ontologies or running any queries.
+
+    A schema is stored per module and is keyed by a content hash of every
+    ontology it was compiled from. An entry whose hash no longer matches
+    is treated as a miss and is overwritten by the next save.
+    '''
+
+    def __init__(self, cache_dir, module_name, key):
+        self.path = os.path.join(cache_dir, f'{module_name}.json')
+        self.key = key
+
+    @staticmethod
+    def open(cache_dir, module_name, ontology_namespace, ontology_paths):
+        '''
+        Returns a cache for the given module, or None if caching is disabled
+        or an ontology cannot be hashed (e.g., it was loaded from a URL)
+        '''
+        if cache_dir is None:
+            cache_dir = os.environ.get('SBOL_FACTORY_CACHE')
+        if not cache_dir:
+            return None
+        key = SchemaCache.hash(module_name, ontology_namespace, BUNDLED_ONTOLOGIES + list(ontology_paths))
+        if key is None:
+            return None
+        return SchemaCache(cache_dir, module_name, key)
+
+    @staticmethod
+    def hash(module_name, ontology_namespace, ontology_paths):
+        digest = hashlib.sha256()
+        digest.update(f'{CACHE_VERSION}\0{module_name}\0{ontology_namespace}\0'.encode())
+        for path in ontology_paths:
+            if not os.path.isfile(path):
+                return None
+            with open(path, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        return digest.hexdigest()
+
+    def load(self):
+        '''
+        Returns the cached schema, or None on a miss or stale entry
+        '''
+        try:
+            with open(self.path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('key') != self.key:
+            return None
+        return entry['schema']
+
+    def save(self, schema):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Write to a temporary file first so that concurrent workers never
+        # read a partially written entry
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'key': self.key, 'schema': schema}, f)
+        os.replace(tmp_path, self.path)
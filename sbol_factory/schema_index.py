@@ -0,0 +1,299 @@
+import rdflib
+from collections import defaultdict
+from math import inf
+
+from .class_hierarchy import ClassHierarchy
+
+
+OWL = rdflib.OWL
+RDF = rdflib.RDF
+RDFS = rdflib.RDFS
+SBOL_DIRECTLY_COMPRISES = rdflib.URIRef('http://sbols.org/v3#directlyComprises')
+SBOL_TOP_LEVEL = rdflib.URIRef('http://sbols.org/v3#TopLevel')
+
+
+class SchemaIndex():
+    '''
+    Dictionary-based index of the classes, properties and restrictions in an
+    ontology graph. The index is built in a single pass over the triples and
+    then answers the same questions as the SPARQL queries in Query, without
+    evaluating any SPARQL.
+    '''
+
+    def __init__(self, graph, generation=0):
+        self.graph = graph
+        self.generation = generation
+
+        # Raw triples, grouped by predicate
+        self.types = defaultdict(set)
+        self.superclasses = defaultdict(list)
+        self.subclasses = defaultdict(list)
+        self.domains = defaultdict(list)
+        self.ranges = defaultdict(list)
+        self.super_properties = defaultdict(set)
+        self.union_of = defaultdict(list)
+        self.first = {}
+        self.rest = {}
+        self.on_property = defaultdict(list)
+        self.min_cardinality = defaultdict(list)
+        self.max_cardinality = defaultdict(list)
+        self.all_values_from = defaultdict(list)
+        self.labels = defaultdict(list)
+        self.comments = defaultdict(list)
+
+        self.extract(graph)
+        self.derive()
+
+    def extract(self, graph):
+        # Groups the triples of the graph by predicate, in a single pass
+        dispatch = {
+            RDF.type: self.types,
+            RDFS.domain: self.domains,
+            RDFS.range: self.ranges,
+            RDFS.label: self.labels,
+            RDFS.comment: self.comments,
+            OWL.unionOf: self.union_of,
+            OWL.onProperty: self.on_property,
+            OWL.minCardinality: self.min_cardinality,
+            OWL.maxCardinality: self.max_cardinality,
+            OWL.allValuesFrom: self.all_values_from,
+        }
+        for s, p, o in graph:
+            if p == RDFS.subClassOf:
+                self.superclasses[s].append(o)
+                self.subclasses[o].append(s)
+            elif p == RDFS.subPropertyOf:
+                self.super_properties[s].add(o)
+            elif p == RDF.first:
+                self.first[s] = o
+            elif p == RDF.rest:
+                self.rest[s] = o
+            elif p in dispatch:
+                index = dispatch[p]
+                if type(index[s]) is set:
+                    index[s].add(o)
+                elif o not in index[s]:
+                    index[s].append(o)
+
+    def derive(self):
+        # Derived indices
+        self.classes = [s for s, types in self.types.items() if OWL.Class in types]
+        self.class_set = set(self.classes)
+
+        # Properties whose domain names the class, directly or through
+        # (possibly nested) owl:unionOf lists
+        self.domain_properties = defaultdict(set)
+        for property_uri, domains in self.domains.items():
+            for domain in domains:
+                for class_uri in self._union_members(domain):
+                    self.domain_properties[class_uri].add(property_uri)
+
+        # Ancestors and descendants of every class, computed once
+        self.hierarchy = ClassHierarchy(self.superclasses, self.class_set)
+
+        # The required properties of each class, filled in by Query
+        self.required_properties = {}
+
+        # Properties on which the class places a restriction
+        self.restriction_properties = defaultdict(set)
+        for class_uri, superclasses in self.superclasses.items():
+            for restriction in superclasses:
+                for property_uri in self.on_property.get(restriction, []):
+                    self.restriction_properties[class_uri].add(property_uri)
+
+    def _union_members(self, node):
+        # Follows owl:unionOf/rdf:rest*/rdf:first zero or more times
+        members = set()
+        pending = [node]
+        while pending:
+            node = pending.pop()
+            if node in members:
+                continue
+            members.add(node)
+            for head in self.union_of.get(node, []):
+                visited = set()
+                while head in self.first and head not in visited:
+                    visited.add(head)
+                    pending.append(self.first[head])
+                    head = self.rest.get(head)
+        return members
+
+    def _restrictions(self, class_uri, property_uri):
+        # owl:Restriction nodes on the given property of the given class
+        return [r for r in self.superclasses.get(class_uri, [])
+                if OWL.Restriction in self.types.get(r, ())
+                and property_uri in self.on_property.get(r, ())]
+
+    def query_classes(self):
+        return [str(c) for c in self.classes]
+
+    def query_subclasses(self, superclass):
+        return [s for s in self.subclasses.get(rdflib.URIRef(superclass), [])
+                if s in self.class_set]
+
+    def query_superclass(self, subclass):
+        superclasses = [s for s in self.superclasses.get(rdflib.URIRef(subclass), [])
+                        if s in self.class_set]
+        if len(superclasses) == 0:
+            raise Exception('{} has no superclass'.format(subclass))
+        if len(superclasses) > 1:
+            raise Exception('{} has more than one {} superclass {}'.format(subclass, superclasses, len(superclasses)))
+        return str(superclasses[0])
+
+    def query_ancestors(self, class_uri):
+        return [c for c in self.hierarchy.ancestors(rdflib.URIRef(class_uri)) if c in self.class_set]
+
+    def query_descendants(self, class_uri):
+        return [c for c in self.hierarchy.descendants(rdflib.URIRef(class_uri)) if c in self.class_set]
+
+    def query_base_class(self, class_uri):
+        return str(self.hierarchy.lineage(rdflib.URIRef(class_uri))[-1])
+
+    def is_subclass(self, class_uri, superclass_uri):
+        return self.hierarchy.is_a(rdflib.URIRef(class_uri), rdflib.URIRef(superclass_uri))
+
+    def _properties(self, class_uri, property_type):
+        class_uri = rdflib.URIRef(class_uri)
+        candidates = self.domain_properties.get(class_uri, set()) | self.restriction_properties.get(class_uri, set())
+        return [str(p) for p in candidates if property_type in self.types.get(p, ())]
+
+    def query_object_properties(self, class_uri):
+        return self._properties(class_uri, OWL.ObjectProperty)
+
+    def query_compositional_properties(self, class_uri):
+        return [p for p in self._properties(class_uri, OWL.ObjectProperty)
+                if SBOL_DIRECTLY_COMPRISES in self.super_properties.get(rdflib.URIRef(p), ())]
+
+    def query_datatype_properties(self, class_uri):
+        return self._properties(class_uri, OWL.DatatypeProperty)
+
+    def query_cardinality(self, property_uri, class_uri):
+        lower_bound = 0
+        upper_bound = inf
+        restrictions = self._restrictions(rdflib.URIRef(class_uri), rdflib.URIRef(property_uri))
+        for r in restrictions:
+            if r in self.min_cardinality:
+                lower_bound = int(str(self.min_cardinality[r][0]))
+                break
+        for r in restrictions:
+            if r in self.max_cardinality:
+                upper_bound = int(str(self.max_cardinality[r][0]))
+                break
+        return (lower_bound, upper_bound)
+
+    def query_restricted_datatypes(self, property_uri, class_uri):
+        datatypes = []
+        for r in self._restrictions(rdflib.URIRef(class_uri), rdflib.URIRef(property_uri)):
+            for o in self.all_values_from[r]:
+                if str(o) not in datatypes:
+                    datatypes.append(str(o))
+        return datatypes
+
+    def query_ranges(self, property_uri):
+        return [str(o) for o in self.ranges.get(rdflib.URIRef(property_uri), [])]
+
+    def query_labels(self, uri):
+        return [str(o) for o in self.labels.get(rdflib.URIRef(uri), [])]
+
+    def query_comments(self, uri):
+        return [str(o) for o in self.comments.get(rdflib.URIRef(uri), [])]
+
+    def is_top_level(self, class_uri):
+        return self.hierarchy.is_a(rdflib.URIRef(class_uri), SBOL_TOP_LEVEL)
+
+    def query_inheritance_hierarchy(self, class_uri):
+        return self.query_ancestors(class_uri)
+
+
+class SparqlSchemaIndex(SchemaIndex):
+    '''
+    A SchemaIndex whose contents are extracted from the graph by a fixed
+    number of set-oriented SPARQL queries, each over every class at once,
+    rather than read from the triples. SPARQL remains the source of truth,
+    but the number of queries evaluated does not depend on the size of the
+    ontology.
+    '''
+
+    PREFIXES = '''
+        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        PREFIX owl: <http://www.w3.org/2002/07/owl#>
+        '''
+
+    QUERIES = {
+        'types': '''
+            SELECT DISTINCT ?s ?type
+            WHERE {
+                ?s rdf:type ?type .
+                VALUES ?type { owl:Class owl:ObjectProperty owl:DatatypeProperty owl:Restriction }
+            }''',
+        'subclasses': '''
+            SELECT DISTINCT ?subclass ?superclass
+            WHERE {
+                ?subclass rdfs:subClassOf ?superclass .
+            }''',
+        'domains': '''
+            SELECT DISTINCT ?property ?class
+            WHERE {
+                ?property rdfs:domain/(owl:unionOf/rdf:rest*/rdf:first)* ?class .
+            }''',
+        'ranges': '''
+            SELECT DISTINCT ?property ?range
+            WHERE {
+                ?property rdfs:range ?range .
+            }''',
+        'super_properties': '''
+            SELECT DISTINCT ?property ?super_property
+            WHERE {
+                ?property rdfs:subPropertyOf ?super_property .
+            }''',
+        'restrictions': '''
+            SELECT DISTINCT ?restriction ?property ?min ?max ?values
+            WHERE {
+                ?restriction owl:onProperty ?property .
+                OPTIONAL { ?restriction owl:minCardinality ?min }
+                OPTIONAL { ?restriction owl:maxCardinality ?max }
+                OPTIONAL { ?restriction owl:allValuesFrom ?values }
+            }''',
+        'annotations': '''
+            SELECT DISTINCT ?s ?annotation ?value
+            WHERE {
+                ?s ?annotation ?value .
+                VALUES ?annotation { rdfs:label rdfs:comment }
+            }''',
+    }
+
+    def __init__(self, graph, generation=0, evaluate=None):
+        # Queries are evaluated through Query.evaluate where given, so that
+        # QueryStats sees them
+        self.evaluate = evaluate if evaluate is not None else graph.query
+        super().__init__(graph, generation)
+
+    def extract(self, graph):
+        def select(name):
+            return self.evaluate(SparqlSchemaIndex.PREFIXES + SparqlSchemaIndex.QUERIES[name])
+
+        def append(index, key, value):
+            if value is not None and value not in index[key]:
+                index[key].append(value)
+
+        for s, type_uri in select('types'):
+            self.types[s].add(type_uri)
+        for subclass, superclass in select('subclasses'):
+            self.superclasses[subclass].append(superclass)
+            self.subclasses[superclass].append(subclass)
+        # The owl:unionOf lists are followed by the query, so each domain is a member of a union
+        for property_uri, class_uri in select('domains'):
+            append(self.domains, property_uri, class_uri)
+        for property_uri, range_uri in select('ranges'):
+            append(self.ranges, property_uri, range_uri)
+        for property_uri, super_property in select('super_properties'):
+            self.super_properties[property_uri].add(super_property)
+        for restriction, property_uri, lower, upper, values in select('restrictions'):
+            append(self.on_property, restriction, property_uri)
+            append(self.min_cardinality, restriction, lower)
+            append(self.max_cardinality, restriction, upper)
+            append(self.all_values_from, restriction, values)
+        annotations = {RDFS.label: self.labels, RDFS.comment: self.comments}
+        for s, annotation, value in select('annotations'):
+            append(annotations[annotation], s, value)
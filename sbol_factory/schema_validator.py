@@ -0,0 +1,157 @@
+import rdflib
+import sbol3 as sbol
+from sbol3 import SBOL_TOP_LEVEL, SBOL_IDENTIFIED
+
+from .sbol_factory import SBOLFactory
+from .class_hierarchy import ClassHierarchy
+from .validation_report import ValidationResult
+
+
+XSD = rdflib.XSD
+SH = rdflib.Namespace('http://www.w3.org/ns/shacl#')
+
+
+class SchemaValidator():
+    '''
+    Checks generated objects against the cardinality, datatype and range of
+    each of their properties, as compiled from the ontology by the SBOLFactory.
+    It runs in-process on the Python objects, so it is much faster than SHACL
+    validation, but only covers the constraints of the classes' schemas.
+    Objects whose classes were not generated by the SBOLFactory are skipped.
+    '''
+
+    # The validator shared by every Document, and the version of the schemas it was built from
+    _shared = None
+    _shared_version = None
+
+    def __init__(self, schemas=None):
+        if schemas is None:
+            schemas = SBOLFactory.schemas
+        self.schemas = schemas
+        self.range_classes = {}
+        # The lineage of each class is found once, rather than for every object
+        self.hierarchy = ClassHierarchy({class_uri: [class_schema['superclass_uri']]
+                                         for class_uri, class_schema in schemas.items()}, schemas)
+        # Whether the last validation stopped before every object was checked
+        self.stopped = False
+
+    @staticmethod
+    def shared():
+        '''
+        Returns the validator shared by every Document, which is built again
+        once the schemas of the SBOLFactory change
+        '''
+        if SchemaValidator._shared is None or SchemaValidator._shared_version != SBOLFactory.schemas_version:
+            SchemaValidator._shared = SchemaValidator()
+            SchemaValidator._shared_version = SBOLFactory.schemas_version
+        return SchemaValidator._shared
+
+    def validate(self, document, max_violations=None, identities=None):
+        '''
+        Returns the violations in a document, by the identity of the
+        TopLevel object that owns the violating object. With identities,
+        only the TopLevel objects with those identities are checked. With
+        max_violations, no more objects are checked once that many
+        violations are found
+        '''
+        results = {}
+        n_violations = 0
+        self.stopped = False
+        objects = document.objects
+        if identities is not None:
+            objects = [obj for obj in objects if rdflib.URIRef(obj.identity) in identities]
+        for i, obj in enumerate(objects):
+            owner = rdflib.URIRef(obj.identity)
+            violations = []
+            obj.traverse(lambda child: violations.extend(self.validate_object(child, document)))
+            if violations:
+                results[owner] = violations
+                n_violations += len(violations)
+                if max_violations is not None and n_violations >= max_violations:
+                    self.stopped = i < len(objects) - 1
+                    break
+        return results
+
+    def validate_object(self, obj, document):
+        violations = []
+        if obj.type_uri not in self.schemas:
+            return violations
+        # The properties of a class are declared by it and its superclasses
+        for class_uri in self.hierarchy.lineage(obj.type_uri):
+            class_schema = self.schemas[class_uri]
+            for property_uri in class_schema['datatype_properties']:
+                values = obj._properties.get(property_uri, [])
+                violations += self.check_cardinality(obj, property_uri, values, class_schema)
+                datatypes = class_schema['datatypes'][property_uri]
+                if len(datatypes) == 1:
+                    violations += [self.violation(obj, property_uri, 'DatatypeConstraintComponent',
+                                                  f'Value is not Literal with datatype {datatypes[0]}', value)
+                                   for value in values if not SchemaValidator.has_datatype(value, datatypes[0])]
+            for property_uri in class_schema['compositional_properties']:
+                values = obj._owned_objects.get(property_uri, [])
+                violations += self.check_cardinality(obj, property_uri, values, class_schema)
+                violations += self.check_range(obj, property_uri, values, class_schema)
+            for property_uri in class_schema['associative_properties']:
+                values = obj._properties.get(property_uri, [])
+                violations += self.check_cardinality(obj, property_uri, values, class_schema)
+                # Referenced objects can only be checked if they are in the document
+                referenced = [document.find(str(value)) for value in values]
+                violations += self.check_range(obj, property_uri, [o for o in referenced if o is not None],
+                                               class_schema)
+        return violations
+
+    def check_cardinality(self, obj, property_uri, values, class_schema):
+        lower_bound, upper_bound = class_schema['cardinalities'][property_uri]
+        if len(values) < lower_bound:
+            return [self.violation(obj, property_uri, 'MinCountConstraintComponent',
+                                   f'Less than {lower_bound} values on <{obj.identity}>-><{property_uri}>')]
+        if len(values) > upper_bound:
+            return [self.violation(obj, property_uri, 'MaxCountConstraintComponent',
+                                   f'More than {upper_bound} values on <{obj.identity}>-><{property_uri}>')]
+        return []
+
+    def check_range(self, obj, property_uri, values, class_schema):
+        ranges = class_schema['datatypes'][property_uri]
+        if len(ranges) != 1:
+            return []
+        Range = self.range_class(ranges[0])
+        if Range is None:
+            return []
+        # Objects of classes that were not generated cannot be checked
+        return [self.violation(obj, property_uri, 'ClassConstraintComponent',
+                               f'Value does not have class <{ranges[0]}>', rdflib.URIRef(value.identity))
+                for value in values
+                if not isinstance(value, Range) and type(value) not in (sbol.CustomIdentified, sbol.CustomTopLevel)]
+
+    def range_class(self, class_uri):
+        if class_uri not in self.range_classes:
+            if class_uri == SBOL_IDENTIFIED:
+                Range = sbol.Identified
+            elif class_uri == SBOL_TOP_LEVEL:
+                Range = sbol.TopLevel
+            else:
+                try:
+                    Range = SBOLFactory.get_constructor(class_uri, {})
+                except (KeyError, ValueError):
+                    Range = None
+            self.range_classes[class_uri] = Range
+        return self.range_classes[class_uri]
+
+    @staticmethod
+    def has_datatype(value, datatype):
+        if datatype == str(XSD.anyURI):
+            return isinstance(value, rdflib.URIRef) or \
+                (isinstance(value, rdflib.Literal) and value.datatype == XSD.anyURI)
+        if not isinstance(value, rdflib.Literal):
+            return False
+        if datatype == str(XSD.string):
+            return value.datatype in (None, XSD.string)
+        if datatype in (str(XSD.integer), str(XSD.boolean), str(XSD.dateTime)):
+            return str(value.datatype) == datatype and value.value is not None
+        # Other datatypes are left to SHACL validation
+        return True
+
+    @staticmethod
+    def violation(obj, property_uri, constraint_component, message, value=None):
+        return ValidationResult(rdflib.URIRef(obj.identity), rdflib.URIRef(property_uri), rdflib.Literal(message),
+                                SH.Violation, SH[constraint_component], value)
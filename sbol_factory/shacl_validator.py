@@ -1,20 +1,155 @@
-from rdflib import Graph
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import multiprocessing
+
+from rdflib import Graph, Literal, RDF, RDFS
+from rdflib.util import guess_format
 from pyshacl import validate
+from pyshacl.inference import CustomRDFSSemantics
+import owlrl
 import os
 import posixpath
+import threading
+
+from .union_store import UnionStore
 
 def abs_path(relative_path):  # Expand path based on module installation directory
     return posixpath.join(os.path.dirname(os.path.realpath(__file__)), relative_path)
 
 class ShaclValidator:
 
-    def __init__(self):
+    # The shapes and ontologies that documents are validated against
+    shapes_paths = [
+        abs_path('rdf/sbol3.ttl'),
+        abs_path('rdf/opil.ttl'),
+        abs_path('rdf/sd2.ttl'),
+        abs_path('rdf/om-2.0.rdf'),
+        abs_path('rdf/opil-shacl.shapes.ttl'),
+    ]
+
+    # Loading the shapes is expensive, so a single validator is shared by
+    # every Document in the process. See shared()
+    _shared = None
+    _lock = threading.Lock()
+
+    # The pool of worker processes for sharded validation. See executor()
+    _executor = None
+    _executor_key = None
+
+    def __init__(self, shapes_paths=None):
+        if shapes_paths is None:
+            shapes_paths = ShaclValidator.shapes_paths
+        self.shapes_paths = list(shapes_paths)
         self.g = Graph()
-        self.g.parse(abs_path('rdf/sbol3.ttl'), format='ttl')
-        self.g.parse(abs_path('rdf/opil.ttl'), format='ttl')
-        self.g.parse(abs_path('rdf/sd2.ttl'), format='ttl')
-        self.g.parse(abs_path('rdf/om-2.0.rdf'))
-        self.g.parse(abs_path('rdf/opil-shacl.shapes.ttl'), format='ttl')
+        for path in self.shapes_paths:
+            self.g.parse(path, format=guess_format(path))
+
+        # The RDFS entailments of the shapes and ontologies are computed once,
+        # with the same semantics as inference='rdfs' in pyshacl, so that each
+        # validation only needs inference over the document
+        owlrl.DeductiveClosure(CustomRDFSSemantics).expand(self.g)
+        self.superclasses = defaultdict(set)
+        self.superproperties = defaultdict(set)
+        self.domains = defaultdict(set)
+        self.ranges = defaultdict(set)
+        for index, predicate in ((self.superclasses, RDFS.subClassOf), (self.superproperties, RDFS.subPropertyOf),
+                                 (self.domains, RDFS.domain), (self.ranges, RDFS.range)):
+            for s, o in self.g.subject_objects(predicate):
+                index[s].add(o)
+        self._hash = None
+
+    @property
+    def hash(self):
+        '''
+        A hash of the shapes and ontologies, by the content of their files
+        '''
+        if self._hash is None:
+            digest = hashlib.sha256()
+            for path in self.shapes_paths:
+                if os.path.isfile(path):
+                    with open(path, 'rb') as f:
+                        digest.update(hashlib.sha256(f.read()).digest())
+                else:
+                    digest.update(path.encode())
+            self._hash = digest.hexdigest()
+        return self._hash
+
+    @staticmethod
+    def shared():
+        '''
+        Returns the validator shared by every Document, loading the shapes
+        on first use. The shared validator must be treated as read-only
+        '''
+        if ShaclValidator._shared is None:
+            with ShaclValidator._lock:
+                if ShaclValidator._shared is None:
+                    ShaclValidator._shared = ShaclValidator()
+        return ShaclValidator._shared
+
+    @staticmethod
+    def preload(shapes_paths=None):
+        '''
+        Loads the shared validator ahead of the first validation, e.g., in a
+        server before it forks its workers, replacing any that was loaded
+        '''
+        validator = ShaclValidator(shapes_paths)
+        with ShaclValidator._lock:
+            ShaclValidator._shared = validator
+            ShaclValidator._shutdown_executor()
+        return validator
+
+    @staticmethod
+    def clear():
+        with ShaclValidator._lock:
+            ShaclValidator._shared = None
+            ShaclValidator._shutdown_executor()
+
+    @staticmethod
+    def executor(processes, shapes_paths):
+        '''
+        Returns the pool of worker processes used for sharded validation.
+        Where the platform supports it, workers are forked from this process
+        so that they share the shapes already loaded here; otherwise each
+        worker loads the same shapes when it starts
+        '''
+        with ShaclValidator._lock:
+            if ShaclValidator._executor_key != (processes, shapes_paths):
+                ShaclValidator._shutdown_executor()
+            if ShaclValidator._executor is None:
+                context = None
+                if 'fork' in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context('fork')
+                ShaclValidator._executor = ProcessPoolExecutor(processes, mp_context=context,
+                                                               initializer=ShaclValidator._init_worker,
+                                                               initargs=(shapes_paths,))
+                ShaclValidator._executor_key = (processes, shapes_paths)
+            return ShaclValidator._executor
+
+    @staticmethod
+    def _shutdown_executor():
+        if ShaclValidator._executor is not None:
+            ShaclValidator._executor.shutdown(wait=False)
+        ShaclValidator._executor = None
+        ShaclValidator._executor_key = None
+
+    @staticmethod
+    def _init_worker(shapes_paths):
+        # A forked worker inherits the shared validator, so only a worker that
+        # was spawned, or that is to use other shapes, needs to load them
+        if ShaclValidator._shared is None or ShaclValidator._shared.shapes_paths != shapes_paths:
+            ShaclValidator._shared = ShaclValidator(shapes_paths)
+        # The pool inherited by a forked worker belongs to the parent
+        ShaclValidator._executor = None
+        ShaclValidator._executor_key = None
+
+    @staticmethod
+    def _validate_triples(triples, abort_on_first=False):
+        graph = Graph()
+        for triple in triples:
+            graph.add(triple)
+        conforms, results_graph, results_text = ShaclValidator.shared().validate(graph, abort_on_first)
+        return results_graph.serialize(format='nt')
 
     def main(self):
 
@@ -53,12 +188,60 @@ class ShaclValidator:
             query = ' '.join([line.strip() for line in query_file])
         return query
 
-    def validate(self, graph_to_validate):
-        g = graph_to_validate + self.g
-        return validate(g, shacl_graph=None, ont_graph=None,
-                        inference='rdfs', abort_on_error=False, meta_shacl=False,
-                        advanced=True, debug=False)
+    def infer(self, graph_to_validate):
+        '''
+        Returns the RDFS entailments of a document that are not already in the
+        document or the shapes and ontologies. These follow from the rules
+        rdf1, rdfs2-4, rdfs7 and rdfs9 applied to the document's triples,
+        given the closed shapes and ontologies; a document is expected not
+        to declare classes or properties of its own
+        '''
+        inferred = Graph()
+        pending = list(graph_to_validate)
+        while pending:
+            s, p, o = pending.pop()
+            entailments = [(p, RDF.type, RDF.Property), (s, RDF.type, RDFS.Resource)]
+            entailments += [(s, q, o) for q in self.superproperties[p]]
+            entailments += [(s, RDF.type, c) for c in self.domains[p]]
+            # A literal is never the subject of an entailment
+            if not isinstance(o, Literal):
+                entailments.append((o, RDF.type, RDFS.Resource))
+                entailments += [(o, RDF.type, c) for c in self.ranges[p]]
+            if p == RDF.type:
+                entailments += [(s, RDF.type, c) for c in self.superclasses[o]]
+            for triple in entailments:
+                if triple not in inferred and triple not in graph_to_validate and triple not in self.g:
+                    inferred.add(triple)
+                    pending.append(triple)
+        return inferred
 
+    def validate_shards(self, shards, processes=None, abort_on_first=False):
+        '''
+        Validates each of the given collections of triples, across a pool of
+        the given number of worker processes if there is more than one.
+        Yields the results graph of each, in order, so that the caller can
+        stop once it has seen enough results
+        '''
+        if not processes or processes < 2 or len(shards) < 2:
+            for triples in shards:
+                graph = Graph()
+                for triple in triples:
+                    graph.add(triple)
+                yield self.validate(graph, abort_on_first)[1]
+            return
+        executor = ShaclValidator.executor(processes, self.shapes_paths)
+        # The shards that have not started are cancelled if the caller stops early
+        for results in executor.map(ShaclValidator._validate_triples, [list(triples) for triples in shards],
+                                    [abort_on_first] * len(shards)):
+            yield Graph().parse(data=results, format='nt')
+
+    def validate(self, graph_to_validate, abort_on_first=False):
+        # The document is validated in a read-only union with its entailments
+        # and the shapes, rather than in a copy of the shapes
+        data_graph = UnionStore.graph([graph_to_validate, self.infer(graph_to_validate), self.g])
+        return validate(data_graph, shacl_graph=self.g, ont_graph=None,
+                        inference='none', inplace=True, abort_on_first=abort_on_first, meta_shacl=False,
+                        advanced=True, debug=False)
 
 if __name__ == "__main__":
     validator = ShaclValidator()
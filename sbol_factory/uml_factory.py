@@ -2,20 +2,24 @@ from .query import Query
 
 import sbol3 as sbol
 import pylatex
-import PyPDF2
-if PyPDF2.__version__.split('.')[0] < '3':
-   from PyPDF2 import PdfFileReader
-else:
-   # PdfFileReader is deprecated and was removed in PyPDF2 3.0.0. Use PdfReader instead.
-   from PyPDF2 import PdfReader as PdfFileReader
 
 import os
+import subprocess
 import graphviz
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
 from math import inf
 from collections import OrderedDict
 
 GLOBALS = set()
 
+# Records what was generated for each class, so that unchanged classes are
+# not rendered again. Bump the version whenever its layout, or how the
+# widths in it are worked out, changes
+MANIFEST = 'manifest.json'
+MANIFEST_VERSION = 2
+
 class UMLFactory:
     """
     Class for generating UML diagrams from an ontology file
@@ -29,11 +33,35 @@ class UMLFactory:
         for prefix, ns in self.query.graph.namespaces():
             UMLFactory.namespace_to_prefix[str(ns)] = prefix
         self.prefix = UMLFactory.namespace_to_prefix[self.namespace]
-
-    def generate(self, output_path):
+        self.superclasses = {}
+        self.plans = {}
+        self.traversals = {}
+        self.comments = {}
+        self.classes = []
+        self.class_names = []
+
+    def generate(self, output_path, workers=None):
+        '''
+        Draws a diagram of each class that is not derived from another class
+        in the ontology, renders the diagrams concurrently across a pool of
+        workers threads, then writes the LaTeX documentation of the classes
+        in the order that they were drawn
+        '''
         if not os.path.exists(output_path):
             os.mkdir(output_path)
-        for class_uri in self.query.query_classes():
+        # The classes are queried once, as they are first drawn, and what is
+        # found is reused by every drawing pass. See class_plan and traversal
+        self.superclasses = {}
+        self.plans = {}
+        self.traversals = {}
+        self.comments = {}
+        # Sorted, so that the classes are documented in the same order on every run
+        self.classes = sorted(self.query.query_classes())
+        # The names that descriptions are cross-referenced by
+        self.class_names = [(format_prefix(uri), sbol.utils.parse_class_name(uri), format_qname(uri))
+                            for uri in self.classes if format_prefix(uri) != '']
+        diagrams = []
+        for class_uri in self.classes:
             # Don't try to document classes in the graph
             # that don't belong to this ontology specifically
             if self.namespace not in class_uri:
@@ -41,7 +69,8 @@ class UMLFactory:
             print('Generating ' + class_uri)
             # Skip subclasses in the same ontology, since these
             # will be clustered into the same diagram as the super
-            if self.namespace in self.query.query_superclass(class_uri):
+            superclass_uri = self.superclass(class_uri)
+            if self.namespace in superclass_uri:
                 continue
 
             GLOBALS.add(class_uri)
@@ -50,7 +79,6 @@ class UMLFactory:
             dot = graphviz.Digraph(class_name)
             # dot.graph_attr['splines'] = 'ortho'
 
-            superclass_uri = self.query.query_superclass(class_uri)
             create_inheritance(dot, superclass_uri, class_uri)
 
             # Order matters here, as the label for an entity
@@ -60,56 +88,147 @@ class UMLFactory:
 
             dot_source_sanitized = dot.source.replace('\\\\', '\\')
             dot_source_sanitized = remove_duplicates(dot_source_sanitized)
-            source = graphviz.Source(dot_source_sanitized)
-            outfile = f'{class_name}_abstraction_hierarchy'
-            source.render(os.path.join(output_path, outfile))
-            outfile += '.pdf'
-            width = 470  # default \textwidth of LaTeX document
-            with open(os.path.join(output_path, outfile), 'rb') as pdf:
-                if PyPDF2.__version__.split('.')[0] < '3':
-                    # reader.getPage(pageNumber) is deprecated and was removed in PyPDF2 3.0.0. Use reader.pages[page_number] instead.
-                    width = PdfFileReader(pdf).getPage(0).mediaBox[2]
-                else:
-                    width = PdfFileReader(pdf).pages[0].mediabox[2]
-
-            self._generate(class_uri, self.write_class_definition, 0, class_name, output_path, width)
-
-        fname_tex = f'{self.prefix}DataModel'
-        self.tex.generate_tex(fname_tex)
-        fname_tex += '.tex'
-        with open(fname_tex, 'r') as f:
-            tex_source = f.read()
-        # Strip preamble
-        opening_clause = '\\begin{document}'
-        closing_clause = '\\end{document}'
-        lpos = tex_source.find(opening_clause) + len(opening_clause)
-        rpos = tex_source.find(closing_clause)
-        tex_source = tex_source[lpos:rpos]
-        with open(fname_tex, 'w') as f:
-            f.write(tex_source)
-        print(f'Wrote ./{fname_tex}')
+            diagrams.append((class_uri, class_name, dot_source_sanitized))
+
+        # A diagram whose DOT source is unchanged since the last run is not
+        # rendered again, and its width is taken from the manifest
+        manifest = load_manifest(output_path)
+        entries = {}
+        stale = []
+        for class_uri, class_name, source in diagrams:
+            dot_hash = hashlib.sha256(source.encode()).hexdigest()
+            outfile = os.path.join(output_path, f'{class_name}_abstraction_hierarchy')
+            entry = manifest.get(class_name)
+            if entry and entry['dot'] == dot_hash and os.path.exists(outfile + '.pdf'):
+                entries[class_name] = dict(entry)
+            else:
+                entries[class_name] = {'dot': dot_hash}
+                stale.append((class_name, source, outfile))
+
+        # Rendering is spent waiting on dot subprocesses, so threads suffice
+        with ThreadPoolExecutor(workers) as executor:
+            widths = executor.map(render_diagram, [source for _, source, _ in stale], [outfile for _, _, outfile in stale])
+            for (class_name, _, _), width in zip(stale, widths):
+                entries[class_name]['width'] = width
+        print(f'Rendered {len(stale)} of {len(diagrams)} diagrams')
+
+        for class_uri, class_name, _ in diagrams:
+            start = len(self.tex.data)
+            self._generate(class_uri, self.write_class_definition, 0, class_name, output_path,
+                           entries[class_name]['width'])
+            fragment = pylatex.utils.dumps_list(self.tex.data[start:])
+            entries[class_name]['tex'] = hashlib.sha256(fragment.encode()).hexdigest()
+
+        # The LaTeX is only rewritten if a class was added, removed or changed,
+        # so that tools that compare modification times do not rebuild it
+        fname_tex = f'{self.prefix}DataModel.tex'
+        tex_hashes = [(class_name, entry['tex']) for class_name, entry in entries.items()]
+        if tex_hashes != [(class_name, entry.get('tex')) for class_name, entry in manifest.items()] \
+                or not os.path.exists(fname_tex):
+            tex_source = self.tex.dumps()
+            # Strip preamble
+            opening_clause = '\\begin{document}'
+            closing_clause = '\\end{document}'
+            lpos = tex_source.find(opening_clause) + len(opening_clause)
+            rpos = tex_source.find(closing_clause)
+            tex_source = tex_source[lpos:rpos]
+            with open(fname_tex, 'w') as f:
+                f.write(tex_source)
+            print(f'Wrote ./{fname_tex}')
+        save_manifest(output_path, entries)
         print(f'Wrote figures to {output_path}')
 
     def _generate(self, class_uri, drawing_method_callback, level, fig_ref,  *args):
-        superclass_uri = self.query.query_superclass(class_uri)
-        drawing_method_callback(class_uri, superclass_uri, level, fig_ref, *args)
-        if class_uri in GLOBALS or class_uri in completed or 'sbol' in class_uri:
-            return
-        print(f'  Generating ' + class_uri)
-
+        # Every drawing pass visits the same classes, in the same order
+        for uri, depth in self.traversal(class_uri):
+            superclass_uri = self.superclass(uri)
+            drawing_method_callback(uri, superclass_uri, level + depth, fig_ref, *args)
+
+    def traversal(self, class_uri):
+        '''
+        Returns the classes that the drawing passes visit from a class, with
+        their levels, in the order that they visit them: the class itself,
+        then the classes it is composed of and its subclasses. Each class is
+        expanded only once, so that a cycle of composition terminates
+        '''
+        if class_uri in self.traversals:
+            return self.traversals[class_uri]
+        order = []
+        completed = set()
+
+        def visit(uri, level):
+            order.append((uri, level))
+            if uri in GLOBALS or uri in completed or 'sbol' in uri:
+                return
+            completed.add(uri)
+            print(f'  Generating ' + uri)
+            plan = self.class_plan(uri)
+            for _, _, _, child_class_uri in plan['compositional']:
+                visit(child_class_uri, level)
+            for i, subclass_uri in enumerate(plan['subclasses']):
+                visit(subclass_uri, level + i + 1)
+
+        visit(class_uri, 0)
+        self.traversals[class_uri] = order
+        return order
+
+    def superclass(self, class_uri):
+        if class_uri not in self.superclasses:
+            self.superclasses[class_uri] = self.query.query_superclass(class_uri)
+        return self.superclasses[class_uri]
+
+    def class_plan(self, class_uri):
+        '''
+        Returns what the drawing passes need to know about a class: its
+        subclasses, and the cardinality and type of each of its properties.
+        A class is only queried the first time it is drawn
+        '''
+        if class_uri in self.plans:
+            return self.plans[class_uri]
+        object_properties = sorted(self.query.query_object_properties(class_uri))
+        datatype_properties = sorted(self.query.query_datatype_properties(class_uri))
+        compositional_properties = sorted(self.query.query_compositional_properties(class_uri))
+        associative_properties = [uri for uri in object_properties if uri not in compositional_properties]
+        plan = {
+            'subclasses': sorted(self.query.query_subclasses(class_uri)),
+            'properties': sorted(datatype_properties + object_properties),
+            'associative': [self.property_plan(uri, class_uri) for uri in associative_properties],
+            'compositional': [self.property_plan(uri, class_uri) for uri in compositional_properties],
+            'datatype': [],
+        }
+        for property_uri in datatype_properties:
+            # Get the datatype of this property
+            datatypes = self.query.query_property_datatype(property_uri, class_uri)
+            if len(datatypes) == 0:
+                continue
+            if len(datatypes) > 1:  # This might indicate an error in the ontology
+                raise
+            # Get the cardinality of this datatype property
+            lower_bound, upper_bound = self.query.query_cardinality(property_uri, class_uri)
+            plan['datatype'].append((property_uri, lower_bound, upper_bound, datatypes[0]))
 
-        child_class_uris = [self.query.query_property_datatype(p, class_uri)[0] for p in self.query.query_compositional_properties(class_uri)]
-        for uri in child_class_uris:
-            self._generate(uri, drawing_method_callback, level, fig_ref, *args)
+        label = f'{format_qname(class_uri)}|'
+        for property_uri, lower_bound, upper_bound, datatype in plan['datatype']:
+            datatype = sbol.utils.parse_class_name(datatype)
+            if datatype == 'anyURI':
+                datatype = 'URI'
+            label += f'{format_qname(property_uri)} {format_cardinality(lower_bound, upper_bound)}: {datatype}\\l'
+        plan['label'] = '{' + label + '}'  # graphviz syntax for record-style label
+        self.plans[class_uri] = plan
+        return plan
 
-        subclass_uris = self.query.query_subclasses(class_uri)
-        for uri in subclass_uris:
-            level += 1
-            self._generate(uri, drawing_method_callback, level, fig_ref, *args)
+    def property_plan(self, property_uri, class_uri):
+        lower_bound, upper_bound = self.query.query_cardinality(property_uri, class_uri)
+        object_class_uri = self.query.query_property_datatype(property_uri, class_uri)[0]
+        return (property_uri, lower_bound, upper_bound, object_class_uri)
 
+    def comment(self, uri):
+        if uri not in self.comments:
+            self.comments[uri] = self.query.query_comment(uri)
+        return self.comments[uri]
 
     def write_class_definition(self, class_uri, superclass_uri, header_level, fig_ref, output_path, figure_width):
-        CLASS_URI = class_uri
+        plan = self.class_plan(class_uri)
         CLASS_NAME = sbol.utils.parse_class_name(class_uri)
         SUPERCLASS_NAME = sbol.utils.parse_class_name(superclass_uri)
         FIG_REF = fig_ref
@@ -142,7 +261,7 @@ class UMLFactory:
                 self.tex.append(pylatex.NoEscape(f'\label{{fig:{CLASS_NAME}}}'))
 
         tex_description = f'The \{CMD1}{{{CLASS_NAME}}} class is shown in \\ref{{fig:{FIG_REF}}}. It is derived from \{CMD2}{{{SUPERCLASS_NAME}}}'
-        subclasses = [sbol.utils.parse_class_name(p) for p in self.query.query_subclasses(CLASS_URI)]
+        subclasses = [sbol.utils.parse_class_name(p) for p in plan['subclasses']]
         if len(subclasses):
             subclasses = [f'\{CMD1}{{{subclass}}}' for subclass in subclasses]
             tex_description += f' and includes the following specializations: ' + ', '.join(subclasses) + '. '
@@ -151,66 +270,48 @@ class UMLFactory:
         self.tex.append(pylatex.NoEscape(tex_description))
 
 
-        property_names = [sbol.utils.parse_class_name(p) for p in self.query.query_properties(CLASS_URI)]
+        property_names = [sbol.utils.parse_class_name(p) for p in plan['properties']]
         if len(property_names):
             property_names = [f'\{CMD1}{{{pname}}}' for pname in property_names]
             tex_description = f'This class includes the following properties: ' + ', '.join(property_names) + '. '
             self.tex.append(pylatex.NoEscape(tex_description))
 
         with self.tex.create(pylatex.Itemize()) as items:
-            for property_uri in self.query.query_associative_properties(class_uri):
-                lower_bound, upper_bound = self.query.query_cardinality(property_uri, class_uri)
-                object_class_uri = self.query.query_property_datatype(property_uri, CLASS_URI)[0]
+            for property_uri, lower_bound, upper_bound, object_class_uri in plan['associative']:
                 PNAME = sbol.utils.parse_class_name(property_uri)
                 CMD = format_prefix(property_uri)
                 OPTIONALITY = 'REQUIRED' if lower_bound == 1 else 'OPTIONAL'
                 OBJ_NAME = sbol.utils.parse_class_name(object_class_uri)
                 PLURALITY = 'a URI reference to an associated object' if upper_bound == 1 else 'URI references to associated objects'
                 tex_description = f'The \{CMD}{{{PNAME}}} property is {OPTIONALITY} and contains {PLURALITY} of type {OBJ_NAME}' 
-                tex_description += self.query.query_comment(property_uri)
+                tex_description += self.comment(property_uri)
                 items.add_item(pylatex.NoEscape(tex_description))
-            for property_uri in self.query.query_compositional_properties(class_uri):
-                lower_bound, upper_bound = self.query.query_cardinality(property_uri, class_uri)
-                object_class_uri = self.query.query_property_datatype(property_uri, CLASS_URI)[0]
+            for property_uri, lower_bound, upper_bound, object_class_uri in plan['compositional']:
                 PNAME = sbol.utils.parse_class_name(property_uri)
                 CMD = format_prefix(property_uri)
                 OPTIONALITY = 'REQUIRED' if lower_bound == 1 else 'OPTIONAL'
                 OBJ_NAME = sbol.utils.parse_class_name(object_class_uri)
                 PLURALITY = 'a child object' if upper_bound == 1 else 'child objects'
                 tex_description = f'The \{CMD}{{{PNAME}}} property is {OPTIONALITY} that points to {PLURALITY} of type {OBJ_NAME}' 
-                tex_description += self.query.query_comment(property_uri)
+                tex_description += self.comment(property_uri)
                 items.add_item(pylatex.NoEscape(tex_description))
 
             # Datatype properties
-            property_uris = self.query.query_datatype_properties(CLASS_URI)
-            property_names = self.query.query_property_names(property_uris)
-            for property_uri, property_name in zip(property_uris, property_names):
-                # Get the datatype of this property
-                datatypes = self.query.query_property_datatype(property_uri, CLASS_URI)
-                if len(datatypes) == 0:
-                    continue
-                if len(datatypes) > 1:  # This might indicate an error in the ontology
-                    raise
-                # Get the cardinality of this datatype property
-                lower_bound, upper_bound = self.query.query_cardinality(property_uri, class_uri)
+            for property_uri, lower_bound, upper_bound, datatype in plan['datatype']:
                 PNAME = sbol.utils.parse_class_name(property_uri)
                 CMD = format_prefix(property_uri)
-                DT = sbol.utils.parse_class_name(datatypes[0])
+                DT = sbol.utils.parse_class_name(datatype)
                 if DT == 'anyURI':
                     DT = 'URI'
                 OPTIONALITY = 'REQUIRED' if lower_bound == 1 else 'OPTIONAL'
                 PLURALITY = 'has a singleton value' if upper_bound == 1 else 'may contain multiple values'
                 tex_description = f'The \{CMD}{{{PNAME}}} property is {OPTIONALITY} and {PLURALITY} of type {DT}' 
-                tex_description += self.query.query_comment(property_uri)
+                tex_description += self.comment(property_uri)
                 items.add_item(pylatex.NoEscape(tex_description))
         return [output_path, figure_width]
 
     def draw_abstraction_hierarchy(self, class_uri, superclass_uri, header_level, fig_ref, dot_graph=None):
 
-
-        #if len(subclass_uris) <= 1:
-        #    return
-
         class_name = sbol.utils.parse_class_name(class_uri)
         if dot_graph:
             dot = dot_graph
@@ -221,12 +322,8 @@ class UMLFactory:
         label = f'{qname}|'
         label = '{' + label + '}'  # graphviz syntax for record-style label
         create_uml_record(dot, class_uri, label)
-        
-        #superclass_uri = self.query.query_superclass(class_uri)
-        #create_inheritance(dot, superclass_uri, class_uri)
-        subclass_uris = self.query.query_subclasses(class_uri)
-        for uri in subclass_uris:
-            subclass_name = sbol.utils.parse_class_name(uri)
+
+        for uri in self.class_plan(class_uri)['subclasses']:
             create_inheritance(dot, class_uri, uri)
             label = self.label_properties(uri)
             create_uml_record(dot, uri, label)
@@ -234,152 +331,32 @@ class UMLFactory:
         return [dot_graph]
 
     def label_properties(self, class_uri):
-        class_name = sbol.utils.parse_class_name(class_uri)
-        qname = format_qname(class_uri)
-        label = f'{qname}|'
-
-        # Object properties can be either compositional or associative
-        property_uris = self.query.query_object_properties(class_uri)
-        compositional_properties = self.query.query_compositional_properties(class_uri)
-        associative_properties = [uri for uri in property_uris if uri not in
-                                    compositional_properties]
-
-        # Label associative properties
-        for property_uri in associative_properties:
-            if len(associative_properties) != len(set(associative_properties)):
-                print(f'{property_uri} is found more than once')
-            property_name = self.query.query_label(property_uri).replace(' ', '_')
-            property_name = format_qname(property_uri)
-            lower_bound, upper_bound = self.query.query_cardinality(property_uri, class_uri)
-            if upper_bound == inf:
-                upper_bound = '*'
-            object_class_uri = self.query.query_property_datatype(property_uri, class_uri)
-            arrow_label = f'{property_name} [{lower_bound}..{upper_bound}]'
-
-        # Label compositional properties
-        for property_uri in compositional_properties:
-            if len(compositional_properties) != len(set(compositional_properties)):
-                print(f'{property_uri} is found more than once')
-            property_name = self.query.query_label(property_uri).replace(' ', '_')
-            property_name = format_qname(property_uri)
-            cardinality = self.query.query_cardinality(property_uri, class_uri)
-            lower_bound, upper_bound = self.query.query_cardinality(property_uri, class_uri)
-            if upper_bound == inf:
-                upper_bound = '*'
-            object_class_uri = self.query.query_property_datatype(property_uri, class_uri)
-            arrow_label = f'{property_name} [{lower_bound}..{upper_bound}]'
-
-        # Label datatype properties
-        property_uris = self.query.query_datatype_properties(class_uri)
-        for property_uri in property_uris:
-            property_name = self.query.query_label(property_uri).replace(' ', '_')
-            property_name = format_qname(property_uri)
-
-            # Get the datatype of this property
-            datatypes = self.query.query_property_datatype(property_uri, class_uri)
-            if len(datatypes) == 0:
-                continue
-            if len(datatypes) > 1:  # This might indicate an error in the ontology
-                raise
-            # Get the cardinality of this datatype property
-            lower_bound, upper_bound = self.query.query_cardinality(property_uri, class_uri)
-            if upper_bound == inf:
-                upper_bound = '*'
-            datatype = sbol.utils.parse_class_name(datatypes[0])
-            if datatype == 'anyURI':
-                datatype = 'URI'
-            label += f'{property_name} [{lower_bound}..{upper_bound}]: {datatype}\\l'
-        label = '{' + label + '}'  # graphviz syntax for record-style label
-        return label
+        return self.class_plan(class_uri)['label']
 
     def draw_class_definition(self, class_uri, superclass_uri, header_level, fig_ref, dot_graph=None):
-
-        CLASS_URI = class_uri
+        plan = self.class_plan(class_uri)
         CLASS_NAME = sbol.utils.parse_class_name(class_uri)
-        SUPERCLASS_NAME = sbol.utils.parse_class_name(superclass_uri)
-
-        log = ''
-        prefix = ''
-        qname = format_qname(class_uri)
-        label = f'{qname}|'
 
         if dot_graph:
             dot = dot_graph
         else:
             dot = graphviz.Digraph(CLASS_NAME)
 
-        #create_inheritance(dot, superclass_uri, class_uri)
-
         # Object properties can be either compositional or associative
-        property_uris = self.query.query_object_properties(CLASS_URI)
-        compositional_properties = self.query.query_compositional_properties(CLASS_URI)
-        associative_properties = [uri for uri in property_uris if uri not in
-                                    compositional_properties]
-
-        # Initialize associative properties
-        for property_uri in associative_properties:
-            if len(associative_properties) != len(set(associative_properties)):
-                print(f'{property_uri} is found more than once')
-            property_name = self.query.query_label(property_uri).replace(' ', '_')
-            property_name = format_qname(property_uri)
-            lower_bound, upper_bound = self.query.query_cardinality(property_uri, class_uri)
-            if upper_bound == inf:
-                upper_bound = '*'
-            object_class_uri = self.query.query_property_datatype(property_uri, CLASS_URI)[0]
-            arrow_label = f'{property_name} [{lower_bound}..{upper_bound}]'
+        for property_uri, lower_bound, upper_bound, object_class_uri in plan['associative']:
+            arrow_label = f'{format_qname(property_uri)} {format_cardinality(lower_bound, upper_bound)}'
             create_association(dot, class_uri, object_class_uri, arrow_label)
-            # self.__dict__[property_name] = sbol.ReferencedObject(self, property_uri, 0, upper_bound)
-
-        # Initialize compositional properties
-        for property_uri in compositional_properties:
-            if len(compositional_properties) != len(set(compositional_properties)):
-                print(f'{property_uri} is found more than once')
-            property_name = self.query.query_label(property_uri).replace(' ', '_')
-            property_name = format_qname(property_uri)
-            lower_bound, upper_bound = self.query.query_cardinality(property_uri, class_uri)
-            if upper_bound == inf:
-                upper_bound = '*'
-            object_class_uri = self.query.query_property_datatype(property_uri, CLASS_URI)[0]
-            arrow_label = f'{property_name} [{lower_bound}..{upper_bound}]'
+        for property_uri, lower_bound, upper_bound, object_class_uri in plan['compositional']:
+            arrow_label = f'{format_qname(property_uri)} {format_cardinality(lower_bound, upper_bound)}'
             create_composition(dot, class_uri, object_class_uri, arrow_label)
 
-        # Initialize datatype properties
-        property_uris = self.query.query_datatype_properties(CLASS_URI)
-        for property_uri in property_uris:
-            property_name = self.query.query_label(property_uri).replace(' ', '_')
-            property_name = format_qname(property_uri)
-
-            # Get the datatype of this property
-            datatypes = self.query.query_property_datatype(property_uri, CLASS_URI)
-            if len(datatypes) == 0:
-                continue
-            if len(datatypes) > 1:  # This might indicate an error in the ontology
-                raise
-            # Get the cardinality of this datatype property
-            lower_bound, upper_bound = self.query.query_cardinality(property_uri, class_uri)
-            if upper_bound == inf:
-                upper_bound = '*'
-
-            datatype = sbol.utils.parse_class_name(datatypes[0])
-            if datatype == 'anyURI':
-                datatype = 'URI'
-            label += f'{property_name} [{lower_bound}..{upper_bound}]: {datatype}\\l'
-        label = '{' + label + '}'  # graphviz syntax for record-style label
-        create_uml_record(dot, class_uri, label)
-        # if not dot_graph:
-        #     source = graphviz.Source(dot.source.replace('\\\\', '\\'))
-        #     source.render(f'./uml/{CLASS_NAME}')
+        # Datatype properties are listed in the record of the class
+        create_uml_record(dot, class_uri, plan['label'])
         return [dot_graph]
 
     def format_description(self, class_uri):
-        tex_description = self.query.query_comment(class_uri)
-        class_list = self.query.query_classes()
-        for uri in class_list:
-            prefix = format_prefix(uri)
-            if prefix == '':
-                continue
-            class_name = sbol.utils.parse_class_name(uri)
-            qname = format_qname(uri)
+        tex_description = self.comment(class_uri)
+        for prefix, class_name, qname in self.class_names:
             tex_description = tex_description.replace(f' {qname} ', f' \\{prefix}{{{class_name}}} ')
             tex_description = tex_description.replace(f' {qname}.', f' \\{prefix}{{{class_name}}}.')
             tex_description = tex_description.replace(f' {qname},', f' \\{prefix}{{{class_name}}},')
@@ -400,6 +377,12 @@ def format_qname(class_uri):
     return qname
 
 
+def format_cardinality(lower_bound, upper_bound):
+    if upper_bound == inf:
+        upper_bound = '*'
+    return f'[{lower_bound}..{upper_bound}]'
+
+
 def format_prefix(class_uri):
     for ns, prefix in UMLFactory.namespace_to_prefix.items():
         if ns in class_uri:
@@ -469,6 +452,57 @@ def create_inheritance(dot_graph, superclass_uri, subclass_uri):
     label = '{' + qname + '|}'
     create_uml_record(dot_graph, superclass_uri, label)
 
+def render_diagram(dot_source, outfile):
+    '''
+    Renders a diagram to outfile.pdf, and returns its width in points, as
+    laid out by the same run of dot
+    '''
+    graphviz.Source(dot_source).save(outfile)
+    layout_file = outfile + '.plain'
+    cmd = ['dot', '-Tpdf', '-o', outfile + '.pdf', '-Tplain', '-o', layout_file, outfile]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True)
+    except FileNotFoundError as e:
+        raise graphviz.ExecutableNotFound(cmd) from e
+    except subprocess.CalledProcessError as e:
+        # Unlike subprocess's, graphviz's error says what dot wrote to stderr
+        raise graphviz.CalledProcessError(e.returncode, e.cmd, output=e.output, stderr=e.stderr) from e
+    with open(layout_file, 'r') as f:
+        width = layout_width(f.readline())
+    os.remove(layout_file)
+    return width
+
+def layout_width(graph_statement):
+    '''
+    Returns the width in points of the page that dot renders a diagram on,
+    given the graph statement of its plain layout, 'graph scale width height'.
+    The layout is in inches. dot pads the drawing by 4 points on each side,
+    and the PDF device adds its default margin of 36 points on each side
+    '''
+    _, scale, width, height = graph_statement.split()
+    return float(width) * float(scale) * 72 + 2 * 4 + 2 * 36
+
+def load_manifest(output_path):
+    '''
+    Returns the hashes of the DOT source and LaTeX of each class, and the
+    width of its diagram, as of the last run of UMLFactory.generate
+    '''
+    try:
+        with open(os.path.join(output_path, MANIFEST), 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest['classes']
+
+def save_manifest(output_path, classes):
+    path = os.path.join(output_path, MANIFEST)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': MANIFEST_VERSION, 'classes': classes}, f, indent=1)
+    os.replace(tmp_path, path)
+
 def remove_duplicates(dot_source):
     d = OrderedDict()
     entries = dot_source.split('\n')
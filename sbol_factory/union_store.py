@@ -0,0 +1,63 @@
+from rdflib import Graph
+from rdflib.store import Store
+
+
+class UnionStore(Store):
+    '''
+    A read-only view of the union of several graphs, which are not copied.
+    A triple that is in more than one of the graphs is only seen once.
+    '''
+
+    def __init__(self, graphs):
+        super().__init__()
+        self.graphs = list(graphs)
+        self._len = None
+        self._namespaces = {}
+        self._prefixes = {}
+
+    @staticmethod
+    def graph(graphs, namespace_manager=None):
+        '''
+        Returns a Graph over the union of the given graphs
+        '''
+        return Graph(store=UnionStore(graphs), namespace_manager=namespace_manager)
+
+    def triples(self, triple_pattern, context=None):
+        for i, graph in enumerate(self.graphs):
+            for triple in graph.triples(triple_pattern):
+                if any(triple in other for other in self.graphs[:i]):
+                    continue
+                yield triple, iter(())
+
+    def __len__(self, context=None):
+        # Counted once, since the truth value of a Graph is its length
+        if self._len is None:
+            self._len = sum(1 for _ in self.triples((None, None, None)))
+        return self._len
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def add(self, triple, context, quoted=False):
+        raise TypeError('UnionStore is read-only')
+
+    def addN(self, quads):
+        raise TypeError('UnionStore is read-only')
+
+    def remove(self, triple, context=None):
+        raise TypeError('UnionStore is read-only')
+
+    def bind(self, prefix, namespace, override=True):
+        if not override and (prefix in self._namespaces or namespace in self._prefixes):
+            return
+        self._namespaces[prefix] = namespace
+        self._prefixes[namespace] = prefix
+
+    def namespace(self, prefix):
+        return self._namespaces.get(prefix)
+
+    def prefix(self, namespace):
+        return self._prefixes.get(namespace)
+
+    def namespaces(self):
+        yield from self._namespaces.items()
@@ -0,0 +1,130 @@
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+import rdflib
+from rdflib.compare import to_isomorphic
+from rdflib.util import from_n3
+
+from .validation_report import ValidationResult
+
+
+# Bump whenever the layout of a cached entry changes
+CACHE_VERSION = 1
+
+
+class ValidationCache():
+    '''
+    Cache of the ValidationResults of TopLevel objects, so that an object
+    that was already validated, in this or any other document, is not
+    validated again.
+
+    An entry is keyed by a hash of the shapes graph, of the content of the
+    object and of the content of the objects that it refers to, which are
+    validated along with it. The most recently used entries are kept in
+    memory, and every entry is also stored in an SQLite database if a path
+    is given. An entry for other shapes, or an object that has since
+    changed, is never looked up again.
+    '''
+
+    # Shared by every Document in the process. See shared()
+    _shared = None
+    _lock = threading.Lock()
+
+    def __init__(self, capacity=10000, path=None):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.path = path
+        self.db = None
+        self.lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, results TEXT)')
+            self.db.commit()
+
+    @staticmethod
+    def shared():
+        '''
+        Returns the cache shared by every Document, which is backed by the
+        SQLite database at SBOL_FACTORY_VALIDATION_CACHE if that is set
+        '''
+        if ValidationCache._shared is None:
+            with ValidationCache._lock:
+                if ValidationCache._shared is None:
+                    ValidationCache._shared = ValidationCache(path=os.environ.get('SBOL_FACTORY_VALIDATION_CACHE'))
+        return ValidationCache._shared
+
+    @staticmethod
+    def clear():
+        with ValidationCache._lock:
+            if ValidationCache._shared is not None and ValidationCache._shared.db is not None:
+                ValidationCache._shared.db.close()
+            ValidationCache._shared = None
+
+    @staticmethod
+    def content_hash(triples):
+        '''
+        Returns a hash of a collection of triples that does not depend on the
+        labels of their blank nodes
+        '''
+        if any(isinstance(term, rdflib.BNode) for triple in triples for term in triple):
+            graph = rdflib.Graph()
+            for triple in triples:
+                graph.add(triple)
+            return f'b{to_isomorphic(graph).graph_digest():x}'
+        digest = hashlib.sha256()
+        for line in sorted(' '.join(term.n3() for term in triple) for triple in triples):
+            digest.update(line.encode())
+            digest.update(b'\n')
+        return digest.hexdigest()
+
+    @staticmethod
+    def key(shapes_hash, content_hash, references_hashes):
+        digest = hashlib.sha256()
+        digest.update(f'{CACHE_VERSION}\0{shapes_hash}\0{content_hash}\0'.encode())
+        for references_hash in sorted(references_hashes):
+            digest.update(f'{references_hash}\0'.encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        '''
+        Returns the cached results, or None on a miss
+        '''
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            if self.db is None:
+                return None
+            row = self.db.execute('SELECT results FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            results = [ValidationResult(*(from_n3(term) if term is not None else None for term in result))
+                       for result in json.loads(row[0])]
+            self._remember(key, results)
+            return results
+
+    def put(self, key, results):
+        # The labels of blank nodes in the results are particular to one
+        # document, so results that refer to them cannot be reused
+        fields = [(r.focus_node, r.result_path, r.message, r.severity, r.constraint_component, r.value_node)
+                  for r in results]
+        if any(isinstance(term, rdflib.BNode) for result in fields for term in result):
+            return
+        with self.lock:
+            self._remember(key, list(results))
+            if self.db is not None:
+                entry = json.dumps([[term.n3() if term is not None else None for term in result]
+                                    for result in fields])
+                self.db.execute('INSERT OR REPLACE INTO results VALUES (?, ?)', (key, entry))
+                self.db.commit()
+
+    def _remember(self, key, results):
+        self.entries[key] = results
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
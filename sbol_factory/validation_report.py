@@ -0,0 +1,139 @@
+import rdflib
+
+
+class ValidationResult():
+
+    def __init__(self, focus_node, result_path, message, severity, constraint_component, value_node=None):
+        self.focus_node = focus_node
+        self.result_path = result_path
+        self.message = message
+        self.severity = severity
+        self.constraint_component = constraint_component
+        self.value_node = value_node
+
+    def key(self):
+        return (str(self.focus_node), str(self.result_path), str(self.constraint_component),
+                str(self.value_node), str(self.message))
+
+    def __eq__(self, other):
+        return isinstance(other, ValidationResult) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __str__(self):
+        lines = [f'Constraint Violation in {self.constraint_component}:',
+                 f'\tSeverity: {self.severity}',
+                 f'\tFocus Node: {self.focus_node}']
+        if self.value_node is not None:
+            lines.append(f'\tValue Node: {self.value_node}')
+        if self.result_path is not None:
+            lines.append(f'\tResult Path: {self.result_path}')
+        lines.append(f'\tMessage: {self.message}')
+        return '\n'.join(lines) + '\n'
+
+
+class ValidationReport():
+    '''
+    The ValidationResults of a document, by the identity of the TopLevel
+    object that owns each focus node. The text of the report is only
+    rendered when it is asked for. A report can also be made from the
+    conformance and text of a pyshacl report, with from_text, in which case
+    it has no ValidationResults
+    '''
+
+    def __init__(self, results_by_object=None, truncated=False):
+        # The ValidationResults of each TopLevel object, by identity
+        self.results_by_object = {identity: results for identity, results in (results_by_object or {}).items()
+                                  if results}
+        # Whether the document may have more violations than are reported,
+        # because validation stopped early
+        self.truncated = truncated
+        self.is_valid = not self.results_by_object
+        self._results_txt = None
+        self._message = None
+
+    def __repr__(self):
+        return self.message
+
+    @property
+    def results(self):
+        if self._results_txt is None:
+            results = list(self)
+            self._results_txt = f'Validation Report\nConforms: {self.is_valid}\n'
+            if results:
+                self._results_txt += f'Results ({len(results)}):\n' + ''.join(str(result) for result in results)
+        return self._results_txt
+
+    @property
+    def message(self):
+        if self._message is not None:
+            return self._message
+        if self.is_valid:
+            return ''
+        return ''.join(str(result.message) + '\n' for result in self)
+
+    @staticmethod
+    def parse_results(results_graph, owners, subgraphs):
+        '''
+        Returns the ValidationResults in a pyshacl results graph, by the identity
+        of the TopLevel object that owns the focus node. A focus node that no
+        object owns is attributed to an object that refers to it
+        '''
+        sh = rdflib.Namespace('http://www.w3.org/ns/shacl#')
+        results = {}
+        for result in results_graph.subjects(rdflib.RDF.type, sh.ValidationResult):
+            focus_node = results_graph.value(result, sh.focusNode)
+            owner = owners.get(focus_node)
+            if owner is None:
+                referrers = sorted(identity for identity, triples in subgraphs.items()
+                                   if identity is not None and any(o == focus_node for _, _, o in triples))
+                owner = referrers[0] if referrers else None
+            results.setdefault(owner, []).append(ValidationResult(
+                focus_node,
+                results_graph.value(result, sh.resultPath),
+                results_graph.value(result, sh.resultMessage),
+                results_graph.value(result, sh.resultSeverity),
+                results_graph.value(result, sh.sourceConstraintComponent),
+                results_graph.value(result, sh.value)))
+        return results
+
+    @staticmethod
+    def from_results(results_by_object, max_violations=None, stopped=False):
+        '''
+        Returns a report of the given results. With max_violations, the report
+        is cut to the first that many of them, in the order that they are
+        iterated. The report is marked as truncated if results were cut, or
+        if validation stopped before the whole document was validated
+        '''
+        if max_violations is None:
+            return ValidationReport(results_by_object, truncated=stopped)
+        kept = {}
+        remaining = max_violations
+        for identity in sorted(results_by_object, key=str):
+            kept[identity] = results_by_object[identity][:max(remaining, 0)]
+            remaining -= len(results_by_object[identity])
+        return ValidationReport(kept, truncated=stopped or remaining < 0)
+
+    @classmethod
+    def from_text(cls, is_valid, results_txt):
+        '''
+        Returns a report of the conformance and text of a pyshacl report
+        '''
+        report = cls()
+        report.is_valid = is_valid
+        report._results_txt = results_txt
+        report._message = '' if is_valid else results_txt[results_txt.find('Message: ') + 9:]
+        return report
+
+    def merge(self, results_by_object):
+        '''
+        Returns a report with the results of the given objects replaced
+        '''
+        merged = dict(self.results_by_object)
+        merged.update(results_by_object)
+        return ValidationReport(merged)
+
+    def __iter__(self):
+        for identity in sorted(self.results_by_object, key=str):
+            yield from self.results_by_object[identity]
@@ -14,12 +14,17 @@ setup(name='sbol_factory',
             'python-dateutil>=2.9',
             'requests',
             'graphviz',
-            'pylatex',
-            'PyPDF2'
+            'pylatex'
       ],
       packages=['sbol_factory'],
       package_data={'sbol_factory': ['rdf/*', 'sparql/*']},
       include_package_data=True,
+      entry_points={
+            'console_scripts': [
+                  'sbol-factory-codegen = sbol_factory.codegen:ModuleWriter.main',
+                  'sbol-factory-convert = sbol_factory.convert:BatchConverter.main',
+            ],
+      },
 #      entry_points = {
 #            'rdf.plugins.sparqleval': [
 #            'custom_eval =  custom_eval:customEval',
@@ -0,0 +1,50 @@
+'''
+Micro-benchmark of generated constructors. Reports objects per second for
+the classes generated from test-ontology.ttl, both when constructed through
+their Document builders and when constructed directly with keyword arguments.
+
+    python test/benchmarks/bench_constructors.py [--number N]
+'''
+import argparse
+import logging
+import os
+import timeit
+
+import sbol3
+from sbol_factory import SBOLFactory
+
+
+TEST_FILES = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), 'test_files')
+NAMESPACE = 'http://bioprotocols.org/uml#'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=2000, help='Objects constructed per measurement')
+    args = parser.parse_args()
+
+    logging.disable()
+    sbol3.set_namespace('https://example.org/test')
+    uml = SBOLFactory('uml', os.path.join(TEST_FILES, 'test-ontology.ttl'), NAMESPACE)
+    classes = {name: obj for name, obj in uml.__dict__.items() if isinstance(obj, type)}
+
+    def build_all():
+        for name in classes:
+            sbol3.Document._uri_type_map[NAMESPACE + name](identity=f'https://example.org/test/{name}',
+                                                           type_uri=NAMESPACE + name)
+
+    def construct_with_kwargs():
+        uml.Parameter(name='x', direction=NAMESPACE + 'in', is_ordered=True, is_unique=True)
+        uml.LiteralInteger(value=1)
+        uml.Behavior('https://example.org/test/b', name='b', description='a behavior')
+
+    number = max(1, args.number // len(classes))
+    seconds = min(timeit.repeat(build_all, number=number, repeat=5))
+    print(f'builders:      {number * len(classes) / seconds:10.0f} objects/s')
+    number = max(1, args.number // 3)
+    seconds = min(timeit.repeat(construct_with_kwargs, number=number, repeat=5))
+    print(f'with kwargs:   {number * 3 / seconds:10.0f} objects/s')
+
+
+if __name__ == '__main__':
+    main()
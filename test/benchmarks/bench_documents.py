@@ -0,0 +1,51 @@
+'''
+Benchmark of Document construction. Reports the cost of constructing a
+Document with small and large shapes graphs loaded, which should not depend
+on the size of the shapes, alongside the one-off cost of loading each shapes
+graph and of the first validation.
+
+    python test/benchmarks/bench_documents.py [--number N]
+'''
+import argparse
+import logging
+import os
+import time
+import timeit
+
+import sbol3
+from sbol_factory import Document, ShaclValidator
+
+
+TEST_FILES = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), 'test_files')
+RDF = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))), 'sbol_factory', 'rdf')
+SMALL = [os.path.join(TEST_FILES, 'test-ontology.ttl'), os.path.join(TEST_FILES, 'test-shapes.ttl')]
+LARGE = SMALL + [os.path.join(RDF, 'om-2.0.rdf'), os.path.join(RDF, 'SBO_OWL.rdf')]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=2000, help='Documents constructed per measurement')
+    args = parser.parse_args()
+
+    logging.disable()
+    sbol3.set_namespace('https://example.org/test')
+    for label, shapes_paths in (('small shapes', SMALL), ('large shapes', LARGE)):
+        start = time.perf_counter()
+        validator = ShaclValidator.preload(shapes_paths)
+        load = time.perf_counter() - start
+
+        start = time.perf_counter()
+        doc = Document()
+        doc.add(sbol3.Sequence('genome'))
+        doc.validate()
+        first = time.perf_counter() - start
+
+        seconds = min(timeit.repeat(Document, number=args.number, repeat=5))
+        print(f'{label} ({len(validator.g)} triples):')
+        print(f'    load shapes:          {load * 1000:10.1f} ms')
+        print(f'    first validation:     {first * 1000:10.1f} ms')
+        print(f'    construct Document:   {seconds / args.number * 1e6:10.1f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+'''
+Import-time benchmark. Runs `python -X importtime -c "import sbol_factory"`
+in fresh interpreters and reports the cumulative import time of sbol_factory,
+the slowest modules it imports, and which optional subsystems were imported
+eagerly. Also reports the time to load the bundled ontologies, which happens
+on the first factory call.
+
+    python test/benchmarks/bench_import.py [--repeat N] [--top N]
+'''
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+# Subsystems that importing sbol_factory should not pull in
+DEFERRED = ['sbol_factory.uml_factory', 'sbol_factory.shacl_validator', 'pylatex', 'graphviz']
+
+LOAD_STORE = '''
+import time
+from sbol_factory.ontology_store import OntologyStore
+t = time.perf_counter()
+OntologyStore()
+print(time.perf_counter() - t)
+'''
+
+
+def run(args):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    return subprocess.run([sys.executable] + args, env=env, capture_output=True, text=True, check=True)
+
+
+def importtime():
+    '''
+    Returns {module: (self_us, cumulative_us)} for one import of sbol_factory
+    '''
+    modules = {}
+    for line in run(['-X', 'importtime', '-c', 'import sbol_factory']).stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5, help='Number of fresh interpreters to measure')
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest modules to list')
+    args = parser.parse_args()
+
+    runs = [importtime() for _ in range(args.repeat)]
+    total = statistics.median(r['sbol_factory'][1] for r in runs)
+    print(f'import sbol_factory:        {total / 1000:8.1f} ms (median of {args.repeat})')
+
+    print('slowest modules (self time):')
+    modules = runs[-1]
+    for name in sorted(modules, key=lambda name: -modules[name][0])[:args.top]:
+        print(f'    {modules[name][0] / 1000:8.1f} ms  {name}')
+
+    eager = [name for name in DEFERRED if name in modules]
+    print(f'deferred subsystems imported: {", ".join(eager) if eager else "none"}')
+
+    seconds = statistics.median(float(run(['-c', LOAD_STORE]).stdout) for _ in range(args.repeat))
+    print(f'load bundled ontologies:    {seconds * 1000:8.1f} ms (median of {args.repeat})')
+
+
+if __name__ == '__main__':
+    main()
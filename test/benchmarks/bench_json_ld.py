@@ -0,0 +1,101 @@
+'''
+Benchmark of JSON-LD conversion. Writes a synthetic N-Triples file, by
+default of a million triples with the triples of each subject scattered
+through it, and converts it with JsonLdWriter, in memory and spilled to
+disk, and with rdflib's JSON-LD serializer. Each conversion runs in its own
+process, which reports its time and peak memory.
+
+    python test/benchmarks/bench_json_ld.py [--triples N] [--buffer-size N] [--no-rdflib]
+'''
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from sbol_factory.json_ld_writer import JsonLdWriter
+
+
+SBOL = 'http://sbols.org/v3#'
+CONTEXT = {'sbol': SBOL, 'xsd': 'http://www.w3.org/2001/XMLSchema#'}
+
+
+def write_triples(path, n_triples, seed=0):
+    '''
+    Writes n_triples triples about components, five per component, in random order
+    '''
+    rng = random.Random(seed)
+    n_subjects = n_triples // 5
+    order = list(range(n_subjects * 5))
+    rng.shuffle(order)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in order:
+            subject, field = divmod(i, 5)
+            s = f'<https://example.org/lab/component{subject}>'
+            if field == 0:
+                f.write(f'{s} <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <{SBOL}Component> .\n')
+            elif field == 1:
+                f.write(f'{s} <{SBOL}displayId> "component{subject}" .\n')
+            elif field == 2:
+                f.write(f'{s} <{SBOL}name> "Component {subject}"@en .\n')
+            elif field == 3:
+                f.write(f'{s} <{SBOL}role> <https://identifiers.org/SO:{rng.randrange(10000):07d}> .\n')
+            else:
+                f.write(f'{s} <{SBOL}hasFeature> <https://example.org/lab/component{rng.randrange(n_subjects)}> .\n')
+
+
+def peak_memory_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+
+
+def run(method, input_path, output_path, buffer_size):
+    start = time.perf_counter()
+    if method == 'rdflib':
+        import rdflib
+        graph = rdflib.Graph()
+        graph.parse(input_path, format='nt')
+        graph.serialize(destination=output_path, format='json-ld', context=CONTEXT)
+    else:
+        JsonLdWriter(CONTEXT, buffer_size=buffer_size).convert(input_path, output_path)
+    seconds = time.perf_counter() - start
+    print(json.dumps({'seconds': seconds, 'peak_mb': peak_memory_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--triples', type=int, default=1000000)
+    parser.add_argument('--buffer-size', type=int, default=100000,
+                        help='Buffer size of the spilled conversion')
+    parser.add_argument('--no-rdflib', action='store_true', help="Skip rdflib's serializer")
+    parser.add_argument('--run', nargs=4, metavar=('METHOD', 'INPUT', 'OUTPUT', 'BUFFER_SIZE'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        method, input_path, output_path, buffer_size = args.run
+        run(method, input_path, output_path, int(buffer_size))
+        return
+
+    conversions = [('in memory', 'writer', args.triples + 1), ('spilled', 'writer', args.buffer_size)]
+    if not args.no_rdflib:
+        conversions.append(('rdflib', 'rdflib', 0))
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'input.nt')
+        write_triples(input_path, args.triples)
+        print(f'{args.triples} triples, {os.path.getsize(input_path) / 2**20:.0f} MB of N-Triples')
+        for label, method, buffer_size in conversions:
+            output_path = os.path.join(tmp, f'{method}.jsonld')
+            result = subprocess.run([sys.executable, __file__, '--run', method, input_path, output_path,
+                                     str(buffer_size)], capture_output=True, text=True, check=True)
+            result = json.loads(result.stdout.strip().splitlines()[-1])
+            print(f'    {label:10s}: {result["seconds"]:8.1f} s, {result["peak_mb"]:8.0f} MB peak')
+
+
+if __name__ == '__main__':
+    main()
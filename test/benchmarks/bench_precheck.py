@@ -0,0 +1,43 @@
+'''
+Benchmark of the schema pre-check. Times the native cardinality, datatype and
+range checks of the SchemaValidator against full SHACL validation of the same
+synthetic document of Behaviors and Parameters.
+
+    python test/benchmarks/bench_precheck.py [--objects N]
+'''
+import argparse
+import logging
+import os
+import time
+
+import sbol3
+from sbol_factory import SBOLFactory, ShaclValidator
+from sbol_factory.schema_validator import SchemaValidator
+
+from bench_sharded_validation import TEST_FILES, SHAPES_PATHS, synthetic_document
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--objects', type=int, default=1000, help='Number of TopLevel objects in the document')
+    args = parser.parse_args()
+
+    logging.disable()
+    sbol3.set_namespace('https://example.org/test')
+    uml = SBOLFactory('uml', os.path.join(TEST_FILES, 'test-ontology.ttl'), 'http://bioprotocols.org/uml#')
+    ShaclValidator.preload(SHAPES_PATHS)
+    doc = synthetic_document(uml, args.objects)
+    print(f'{args.objects} TopLevel objects, {len(doc.graph())} triples')
+
+    start = time.perf_counter()
+    native = SchemaValidator().validate(doc)
+    precheck = time.perf_counter() - start
+    start = time.perf_counter()
+    shacl = doc.validate(full=True, precheck=False)
+    full = time.perf_counter() - start
+    print(f'    pre-check: {precheck:8.3f} s  ({sum(len(v) for v in native.values())} violations)')
+    print(f'    SHACL:     {full:8.3f} s  ({len(list(shacl))} violations, {full / precheck:.0f}x)')
+
+
+if __name__ == '__main__':
+    main()
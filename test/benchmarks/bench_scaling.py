@@ -0,0 +1,78 @@
+'''
+Scaling benchmark. Generates synthetic ontologies of increasing numbers of
+classes, and documents of increasing numbers of objects, and reports the
+time to generate their modules, the number of queries that generation makes,
+and the time to read and validate the documents, so that super-linear growth
+shows up as a rising time per class or per object.
+
+    python test/benchmarks/bench_scaling.py [--classes 25 50 100 200] [--objects 100 1000] [--modules N]
+'''
+import argparse
+import collections
+import logging
+import os
+import tempfile
+import time
+
+import sbol3
+from sbol_factory import SBOLFactory, Document
+
+from bench_uml import count_queries
+from synthetic import SyntheticDocument, generate_modules
+
+
+def generate(ontologies, paths):
+    for ontology, path in zip(ontologies, paths):
+        SBOLFactory(ontology.prefix, path, ontology.namespace)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--classes', type=int, nargs='+', default=[25, 50, 100, 200], help='Classes per ontology')
+    parser.add_argument('--objects', type=int, nargs='+', default=[100, 1000], help='TopLevel objects per document')
+    parser.add_argument('--modules', type=int, default=1, help='Number of ontologies, each extending the last')
+    parser.add_argument('--depth', type=int, default=4, help='Depth of the inheritance hierarchy')
+    parser.add_argument('--violations', type=float, default=0.1,
+                        help='Fraction of objects that omit a required value')
+    args = parser.parse_args()
+
+    logging.disable()
+    os.environ.pop('SBOL_FACTORY_CACHE', None)
+    sbol3.set_namespace('https://example.org/synthetic')
+    with tempfile.TemporaryDirectory() as tmp:
+        print('generation:')
+        for n_classes in args.classes:
+            ontologies = generate_modules(args.modules, n_classes=n_classes, depth=args.depth)
+            paths = [ontology.write(os.path.join(tmp, f'{ontology.prefix}-{n_classes}.ttl'))
+                     for ontology in ontologies]
+            SBOLFactory.clear()
+            counts = collections.Counter()
+            with count_queries(counts):
+                start = time.perf_counter()
+                generate(ontologies, paths)
+                seconds = time.perf_counter() - start
+            n_total = n_classes * args.modules
+            print(f'    {n_total:6d} classes: {seconds:8.2f} s, {seconds / n_total * 1000:8.2f} ms/class, '
+                  f'{sum(counts.values()):8d} queries')
+
+        print(f'documents ({args.classes[-1]} classes per ontology):')
+        for n_objects in args.objects:
+            document = SyntheticDocument(ontologies[-1], n_objects, violations=args.violations)
+            path = document.write(os.path.join(tmp, f'document-{n_objects}.nt'))
+            start = time.perf_counter()
+            doc = Document()
+            doc.read(path, sbol3.NTRIPLES)
+            read = time.perf_counter() - start
+            start = time.perf_counter()
+            doc.validate(full=True, cache=False)
+            precheck = time.perf_counter() - start
+            start = time.perf_counter()
+            doc.validate(full=True, precheck=False, cache=False)
+            shacl = time.perf_counter() - start
+            print(f'    {n_objects:6d} objects: read {read:8.2f} s, validate {precheck:8.2f} s, '
+                  f'SHACL {shacl:8.2f} s, {shacl / n_objects * 1000:8.2f} ms/object')
+    SBOLFactory.clear()
+
+
+if __name__ == '__main__':
+    main()
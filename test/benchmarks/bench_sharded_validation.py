@@ -0,0 +1,66 @@
+'''
+Benchmark of sharded validation. Validates a synthetic document of Behaviors,
+each with a few Parameters, with an increasing number of worker processes,
+and reports the speedup over validating it in this process.
+
+    python test/benchmarks/bench_sharded_validation.py [--objects N] [--processes 1 2 4]
+'''
+import argparse
+import logging
+import os
+import time
+
+import sbol3
+from sbol_factory import SBOLFactory, Document, ShaclValidator
+
+
+TEST_FILES = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), 'test_files')
+SHAPES_PATHS = [os.path.join(TEST_FILES, 'test-ontology.ttl'), os.path.join(TEST_FILES, 'test-shapes.ttl')]
+
+
+def synthetic_document(uml, n_objects):
+    doc = Document()
+    for i in range(n_objects):
+        b = doc.add(uml.Behavior(f'Behavior{i}'))
+        for j in range(3):
+            # Every tenth Behavior has an invalid Parameter
+            if i % 10 == 0 and j == 0:
+                b.parameters.append(uml.Parameter(name=f'p{j}'))
+            else:
+                b.parameters.append(uml.Parameter(name=f'p{j}', direction='http://bioprotocols.org/uml#in',
+                                                  is_ordered=True, is_unique=True))
+    return doc
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--objects', type=int, default=2000, help='Number of TopLevel objects in the document')
+    parser.add_argument('--processes', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}), help='Numbers of worker processes')
+    args = parser.parse_args()
+
+    logging.disable()
+    sbol3.set_namespace('https://example.org/test')
+    uml = SBOLFactory('uml', os.path.join(TEST_FILES, 'test-ontology.ttl'), 'http://bioprotocols.org/uml#')
+    ShaclValidator.preload(SHAPES_PATHS)
+    doc = synthetic_document(uml, args.objects)
+    print(f'{args.objects} TopLevel objects, {len(doc.graph())} triples, {os.cpu_count()} cores')
+
+    start = time.perf_counter()
+    expected = set(doc.validate(full=True, precheck=False))
+    serial = time.perf_counter() - start
+    print(f'    in process:   {serial:8.2f} s')
+    for processes in args.processes:
+        if processes < 2:
+            continue
+        # Start the workers before timing
+        doc.validate(full=True, processes=processes, precheck=False)
+        start = time.perf_counter()
+        actual = set(doc.validate(full=True, processes=processes, precheck=False))
+        seconds = time.perf_counter() - start
+        assert actual == expected
+        print(f'    {processes:2d} processes: {seconds:8.2f} s  ({serial / seconds:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+'''
+Benchmark suite. Measures, offline and with the test ontologies:
+
+    generate/<ontology>         time to generate the modules of each test ontology
+    construct/builders          objects per second built by the Document builders
+    construct/kwargs            objects per second constructed with keyword arguments
+    roundtrip/<n>/read, write   time to read and write a document of n copies of mini_library.nt
+    validate/<n>/shacl, ...     latency of validating a document of n Behaviors
+    uml/generate                time of UMLFactory.generate, with dot stood in for
+
+Each measurement is the best of --repeat runs. The results are printed, and
+written as JSON with --output. With --compare, the results are compared with
+those of an earlier run, and the script exits with status 1 if any is worse
+by more than --threshold.
+
+    python test/benchmarks/bench_suite.py [--output results.json] [--compare baseline.json] [--only PREFIX]
+'''
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import unittest.mock
+
+import sbol3
+from sbol_factory import SBOLFactory, Document, ShaclValidator, UMLFactory
+from sbol_factory import uml_factory
+
+from bench_sharded_validation import TEST_FILES, SHAPES_PATHS, synthetic_document
+from bench_uml import stand_in_for_dot
+
+
+UML = 'http://bioprotocols.org/uml#'
+PAML = 'http://bioprotocols.org/paml#'
+
+# The modules generated from each test ontology, in the order they are generated
+ONTOLOGIES = {
+    'test-ontology.ttl': [('uml', UML)],
+    'test-modules.ttl': [('uml', UML), ('paml', PAML)],
+    'test-datetime.ttl': [('paml', PAML)],
+    'test-provo.ttl': [('paml', PAML)],
+    'test-required-args.ttl': [('uml', UML)],
+}
+
+
+def best_of(repeat, f, setup=None):
+    '''
+    Returns the shortest time, in seconds, of repeat calls of f, each after a call of setup
+    '''
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def seconds(value):
+    return {'value': value, 'unit': 's', 'better': 'lower'}
+
+
+def per_second(value):
+    return {'value': value, 'unit': 'objects/s', 'better': 'higher'}
+
+
+def bench_generate(args):
+    results = {}
+    for fname, modules in ONTOLOGIES.items():
+        def generate():
+            for module_name, namespace in modules:
+                SBOLFactory(module_name, os.path.join(TEST_FILES, fname), namespace)
+        results[f'generate/{fname}'] = seconds(best_of(args.repeat, generate, SBOLFactory.clear))
+    SBOLFactory.clear()
+    return results
+
+
+def bench_construct(args):
+    SBOLFactory.clear()
+    uml = SBOLFactory('uml', os.path.join(TEST_FILES, 'test-ontology.ttl'), UML)
+    classes = [name for name, obj in uml.__dict__.items() if isinstance(obj, type)]
+    n = max(1, args.objects // len(classes))
+
+    def build():
+        for _ in range(n):
+            for name in classes:
+                sbol3.Document._uri_type_map[UML + name](identity=f'https://example.org/test/{name}',
+                                                         type_uri=UML + name)
+
+    def construct():
+        for _ in range(n):
+            uml.Parameter(name='x', direction=UML + 'in', is_ordered=True, is_unique=True)
+            uml.LiteralInteger(value=1)
+            uml.Behavior('https://example.org/test/b', name='b', description='a behavior')
+
+    results = {
+        'construct/builders': per_second(n * len(classes) / best_of(args.repeat, build)),
+        'construct/kwargs': per_second(n * 3 / best_of(args.repeat, construct)),
+    }
+    SBOLFactory.clear()
+    return results
+
+
+def scaled_library(copies):
+    '''
+    Returns the N-Triples of mini_library.nt, copied into copies namespaces
+    '''
+    with open(os.path.join(TEST_FILES, 'mini_library.nt')) as f:
+        triples = f.read()
+    return ''.join(triples.replace('<https://example.org/test/', f'<https://example.org/test/copy{i}/')
+                   for i in range(copies))
+
+
+def bench_roundtrip(args):
+    SBOLFactory.clear()
+    SBOLFactory('uml', os.path.join(TEST_FILES, 'test-ontology.ttl'), UML)
+    results = {}
+    for copies in args.copies:
+        data = scaled_library(copies)
+        doc = Document()
+
+        def read():
+            nonlocal doc
+            doc = Document()
+            doc.read_string(data, sbol3.NTRIPLES)
+        results[f'roundtrip/{copies}/read'] = seconds(best_of(args.repeat, read))
+        results[f'roundtrip/{copies}/write'] = seconds(best_of(args.repeat,
+                                                               lambda: doc.write_string(sbol3.SORTED_NTRIPLES)))
+    SBOLFactory.clear()
+    return results
+
+
+def bench_validate(args):
+    SBOLFactory.clear()
+    uml = SBOLFactory('uml', os.path.join(TEST_FILES, 'test-ontology.ttl'), UML)
+    ShaclValidator.preload(SHAPES_PATHS)
+    results = {}
+    for n_objects in args.behaviors:
+        doc = synthetic_document(uml, n_objects)
+        results[f'validate/{n_objects}/shacl'] = seconds(best_of(
+            args.repeat, lambda: doc.validate(full=True, precheck=False, cache=False)))
+        results[f'validate/{n_objects}/precheck'] = seconds(best_of(
+            args.repeat, lambda: doc.validate(full=True, cache=False)))
+        results[f'validate/{n_objects}/first_violation'] = seconds(best_of(
+            args.repeat, lambda: doc.validate(full=True, precheck=False, max_violations=1, cache=False)))
+    ShaclValidator.clear()
+    SBOLFactory.clear()
+    return results
+
+
+def bench_uml(args):
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            with unittest.mock.patch.object(uml_factory.subprocess, 'run', stand_in_for_dot), \
+                    contextlib.redirect_stdout(io.StringIO()):
+                factory = UMLFactory(os.path.join(TEST_FILES, 'test-ontology.ttl'), UML)
+                # Each run starts from an empty output directory
+                runs = iter(range(args.repeat))
+                result = best_of(args.repeat, lambda: factory.generate(f'figures{next(runs)}'))
+        finally:
+            os.chdir(cwd)
+    return {'uml/generate': seconds(result)}
+
+
+BENCHMARKS = {
+    'generate': bench_generate,
+    'construct': bench_construct,
+    'roundtrip': bench_roundtrip,
+    'validate': bench_validate,
+    'uml': bench_uml,
+}
+
+
+def compare(results, baseline, threshold):
+    '''
+    Returns a line for each result that is worse than in the baseline by
+    more than the threshold, as a fraction of the baseline
+    '''
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]['value']
+        new = result['value']
+        change = (new - old) / old if result['better'] == 'lower' else (old - new) / old
+        if change > threshold:
+            regressions.append(f'{name}: {old:.4g} -> {new:.4g} {result["unit"]} ({change:+.0%} worse)')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Compare the results with those in this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Fraction by which a result may be worse than the baseline')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='Benchmarks to run')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--objects', type=int, default=2000, help='Objects constructed per measurement')
+    parser.add_argument('--copies', type=int, nargs='+', default=[1, 10, 100],
+                        help='Sizes of the round-tripped documents, in copies of mini_library.nt')
+    parser.add_argument('--behaviors', type=int, nargs='+', default=[10, 100],
+                        help='Sizes of the validated documents, in Behaviors')
+    args = parser.parse_args()
+
+    logging.disable()
+    sbol3.set_namespace('https://example.org/test')
+    # Generation is always timed from the ontologies, not from a schema cache
+    os.environ.pop('SBOL_FACTORY_CACHE', None)
+
+    results = {}
+    for name, benchmark in BENCHMARKS.items():
+        if args.only and name not in args.only:
+            continue
+        for result_name, result in benchmark(args).items():
+            print(f'    {result_name:40s} {result["value"]:12.4g} {result["unit"]}')
+            results[result_name] = result
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                       'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'results': results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+        print(f'No regressions against {args.compare}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+'''
+Benchmark of UML documentation generation. Times UMLFactory.generate end to
+end, from a cold and a warm output directory, and counts the ontology
+queries that it makes. Where dot is not installed, or with --no-render, a
+stand-in that writes empty figures replaces it, so that only the Python side
+is timed.
+
+    python test/benchmarks/bench_uml.py [--ontology PATH --namespace URI] [--no-render]
+'''
+import argparse
+import collections
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+import unittest.mock
+
+from sbol_factory import UMLFactory
+from sbol_factory import uml_factory
+from sbol_factory.query import Query
+
+
+TEST_FILES = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), 'test_files')
+
+
+def stand_in_for_dot(cmd, *args, **kwargs):
+    # dot -Tpdf -o outfile.pdf -Tplain -o outfile.plain outfile
+    with open(cmd[3], 'wb') as f:
+        f.write(b'%PDF-1.5\n')
+    with open(cmd[6], 'w') as f:
+        f.write('graph 1 4 3\nstop\n')
+
+
+def count_queries(counts):
+    '''
+    Patches every query method of Query to count its calls
+    '''
+    stack = contextlib.ExitStack()
+    for name in dir(Query):
+        if name.startswith('query_'):
+            method = getattr(Query, name)
+
+            def counted(self, *args, name=name, method=method, **kwargs):
+                counts[name] += 1
+                return method(self, *args, **kwargs)
+            stack.enter_context(unittest.mock.patch.object(Query, name, counted))
+    return stack
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ontology', default=os.path.join(TEST_FILES, 'test-ontology.ttl'))
+    parser.add_argument('--namespace', default='http://bioprotocols.org/uml#')
+    parser.add_argument('--no-render', action='store_true', help='Replace dot with a stand-in')
+    args = parser.parse_args()
+
+    render = not args.no_render and shutil.which('dot') is not None
+    print(f'{os.path.basename(args.ontology)}, {"rendered with dot" if render else "dot replaced by a stand-in"}')
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            with contextlib.ExitStack() as stack:
+                if not render:
+                    stack.enter_context(unittest.mock.patch.object(uml_factory.subprocess, 'run', stand_in_for_dot))
+                for label in ('cold', 'warm'):
+                    counts = collections.Counter()
+                    with count_queries(counts), contextlib.redirect_stdout(io.StringIO()):
+                        factory = UMLFactory(args.ontology, args.namespace)
+                        start = time.perf_counter()
+                        factory.generate('figures')
+                        seconds = time.perf_counter() - start
+                    print(f'    generate ({label}): {seconds * 1000:10.1f} ms, {sum(counts.values()):6d} queries')
+        finally:
+            os.chdir(cwd)
+    print('queries by method (warm):')
+    for name, count in counts.most_common():
+        print(f'    {count:6d}  {name}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,322 @@
+'''
+Generator of synthetic ontologies, in the style that the SBOLFactory
+consumes, and of documents of their classes, for measuring how generation,
+queries and validation scale. The output depends only on the parameters and
+the seed.
+
+    python test/benchmarks/synthetic.py -o OUTPUT [--classes N] [--depth N] [--objects N] ...
+
+writes OUTPUT/<prefix>.ttl and OUTPUT/<prefix>-document.nt, and with
+--modules N, N ontologies whose classes extend those of the one before.
+'''
+import argparse
+import math
+import os
+import random
+
+
+SBOL = 'http://sbols.org/v3#'
+RDF_TYPE = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#type'
+XSD = 'http://www.w3.org/2001/XMLSchema#'
+SBOL_TOP_LEVEL = SBOL + 'TopLevel'
+SBOL_IDENTIFIED = SBOL + 'Identified'
+# The datatypes that the SBOLFactory maps to sbol3 properties
+DATATYPES = ['string', 'integer', 'boolean', 'anyURI', 'dateTime']
+
+
+class SyntheticOntology():
+    '''
+    An ontology of n_classes classes in the given namespace. Classes form
+    trees of the given depth under sbol:TopLevel and sbol:Identified or,
+    with a base ontology, under its classes with probability cross_module.
+    Each class has its own datatype, compositional and associative
+    properties, each with a cardinality restriction; with probability
+    required, a datatype property has a minimum cardinality of 1, and with
+    probability union, its domain is the owl:unionOf its class and an
+    unrelated one.
+    '''
+
+    def __init__(self, prefix='synth', namespace=None, n_classes=100, depth=4, n_datatype=3, n_compositional=1,
+                 n_associative=1, required=0.2, union=0.1, cross_module=0.5, base=None, seed=0):
+        self.prefix = prefix
+        self.namespace = namespace or f'http://example.org/{prefix}#'
+        self.base = base
+        rng = random.Random(seed)
+
+        # Class i is at level i % depth, under a class of the level above
+        self.classes = {}
+        levels = [[] for _ in range(depth)]
+        for i in range(n_classes):
+            # Generated classes are registered by name, so names are unique across modules
+            uri = f'{self.namespace}{prefix.capitalize()}Class{i}'
+            level = i % depth
+            if level > 0:
+                superclass_uri = rng.choice(levels[level - 1])
+            elif base is not None and i > 0 and rng.random() < cross_module:
+                superclass_uri = rng.choice(sorted(base.classes))
+            else:
+                superclass_uri = SBOL_TOP_LEVEL if i % (2 * depth) == 0 else SBOL_IDENTIFIED
+            levels[level].append(uri)
+            self.classes[uri] = {'uri': uri, 'superclass': superclass_uri, 'properties': []}
+        top_levels = [uri for uri in self.classes if self.is_top_level(uri)]
+        children = [uri for uri in self.classes if not self.is_top_level(uri)]
+
+        self.properties = {}
+        for i, class_uri in enumerate(self.classes):
+            for kind, n in (('datatype', n_datatype), ('compositional', n_compositional),
+                            ('associative', n_associative)):
+                for j in range(n):
+                    domains = [class_uri]
+                    if kind == 'datatype':
+                        range_uri = XSD + DATATYPES[(i + j) % len(DATATYPES)]
+                        lower = 1 if rng.random() < required else 0
+                        if rng.random() < union:
+                            unrelated = [uri for uri in self.classes if not self.are_related(uri, class_uri)]
+                            if unrelated:
+                                domains.append(rng.choice(unrelated))
+                    else:
+                        # Compositional properties are optional, so that objects are finite
+                        candidates = children if kind == 'compositional' else top_levels
+                        if not candidates:
+                            continue
+                        range_uri = rng.choice(candidates)
+                        lower = 0
+                    # sbol3 has no DateTimeProperty with an upper bound above 1
+                    upper = rng.choice([1, math.inf]) if lower == 0 and not range_uri.endswith('dateTime') else 1
+                    uri = f'{self.namespace}c{i}{kind.capitalize()}{j}'
+                    self.properties[uri] = {'uri': uri, 'label': f'{prefix}_c{i}_{kind}_{j}', 'kind': kind,
+                                            'range': range_uri, 'lower': lower, 'upper': upper,
+                                            'domains': domains}
+                    for domain in domains:
+                        self.classes[domain]['properties'].append(uri)
+
+    def lookup(self, class_uri):
+        if class_uri in self.classes:
+            return self, self.classes[class_uri]
+        if self.base is not None:
+            return self.base.lookup(class_uri)
+        return None, None
+
+    def ancestors(self, class_uri):
+        '''
+        Returns the class and its superclasses in the synthetic ontologies, most specific first
+        '''
+        ancestors = []
+        while class_uri not in (SBOL_TOP_LEVEL, SBOL_IDENTIFIED):
+            ancestors.append(class_uri)
+            class_uri = self.lookup(class_uri)[1]['superclass']
+        return ancestors
+
+    def is_top_level(self, class_uri):
+        while class_uri not in (SBOL_TOP_LEVEL, SBOL_IDENTIFIED):
+            class_uri = self.lookup(class_uri)[1]['superclass']
+        return class_uri == SBOL_TOP_LEVEL
+
+    def are_related(self, a, b):
+        return a in self.ancestors(b) or b in self.ancestors(a) or \
+            self.is_top_level(a) != self.is_top_level(b)
+
+    def all_properties(self, class_uri):
+        '''
+        Returns the properties of the class, including those it inherits
+        '''
+        properties = []
+        for uri in self.ancestors(class_uri):
+            ontology, definition = self.lookup(uri)
+            properties += [ontology.properties[p] for p in definition['properties']]
+        return properties
+
+    def turtle(self):
+        '''
+        Returns the ontology as Turtle
+        '''
+        prefixes = {self.prefix: self.namespace, 'owl': 'http://www.w3.org/2002/07/owl#',
+                    'rdf': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
+                    'rdfs': 'http://www.w3.org/2000/01/rdf-schema#', 'xsd': XSD, 'sbol': SBOL}
+        imports = ['sbol:']
+        ontology = self.base
+        while ontology is not None:
+            prefixes[ontology.prefix] = ontology.namespace
+            imports.append(f'{ontology.prefix}:')
+            ontology = ontology.base
+        lines = [f'@prefix {prefix}: <{namespace}> .' for prefix, namespace in prefixes.items()]
+        lines += ['', f'<{self.namespace[:-1]}> rdf:type owl:Ontology ;',
+                  f'    owl:imports {", ".join(imports)} .', '']
+
+        def curie(uri):
+            for prefix, namespace in prefixes.items():
+                if uri.startswith(namespace):
+                    return f'{prefix}:{uri[len(namespace):]}'
+            return f'<{uri}>'
+
+        def cardinality(name, value):
+            return f' ; owl:{name}Cardinality "{value}"^^xsd:nonNegativeInteger'
+
+        for class_uri, definition in self.classes.items():
+            restrictions = []
+            for property_uri in definition['properties']:
+                p = self.properties[property_uri]
+                values = 'allValuesFrom' if p['kind'] == 'datatype' else 'onClass'
+                restriction = f'[ rdf:type owl:Restriction ; owl:{values} {curie(p["range"])} ; ' \
+                              f'owl:onProperty {curie(property_uri)}'
+                if p['lower']:
+                    restriction += cardinality('min', p['lower'])
+                if p['upper'] != math.inf:
+                    restriction += cardinality('max', p['upper'])
+                restrictions.append(restriction + ' ]')
+            lines.append(f'{curie(class_uri)} rdf:type owl:Class ;')
+            lines.append('    rdfs:subClassOf ' + ' ,\n    '.join([curie(definition['superclass'])] + restrictions) + ' .')
+            lines.append('')
+
+        for property_uri, p in self.properties.items():
+            kind = 'owl:DatatypeProperty' if p['kind'] == 'datatype' else 'owl:ObjectProperty'
+            lines.append(f'{curie(property_uri)} rdf:type {kind} ;')
+            if p['kind'] == 'compositional':
+                lines.append('    rdfs:subPropertyOf sbol:directlyComprises ;')
+            if len(p['domains']) == 1:
+                lines.append(f'    rdfs:domain {curie(p["domains"][0])} ;')
+            else:
+                lines.append(f'    rdfs:domain [ owl:unionOf ( {" ".join(curie(d) for d in p["domains"])} ) ] ;')
+            lines.append(f'    rdfs:range {curie(p["range"])} ;')
+            lines.append(f'    rdfs:label "{p["label"]}" .')
+            lines.append('')
+        return '\n'.join(lines)
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            f.write(self.turtle())
+        return path
+
+
+class SyntheticDocument():
+    '''
+    A document of n_objects TopLevel objects of the classes of a synthetic
+    ontology, in N-Triples. Each property has between its minimum
+    cardinality and two values; compositional properties are nested to at
+    most nesting levels, and associative properties refer to other objects
+    in the document. With probability violations, an object omits a value
+    of a required property.
+    '''
+
+    def __init__(self, ontology, n_objects=100, namespace='https://example.org/synthetic', nesting=2,
+                 violations=0.0, seed=0):
+        self.ontology = ontology
+        self.namespace = namespace
+        self.nesting = nesting
+        self.violations = violations
+        self.rng = random.Random(seed)
+        ontologies = []
+        while ontology is not None:
+            ontologies.append(ontology)
+            ontology = ontology.base
+        top_levels = sorted(uri for o in ontologies for uri in o.classes if self.ontology.is_top_level(uri))
+        # Objects of the classes of this ontology first, round robin
+        own = [uri for uri in top_levels if uri in self.ontology.classes] or top_levels
+        self.objects = [(f'{namespace}/{own[i % len(own)].split("#")[-1]}_{i}', own[i % len(own)])
+                        for i in range(n_objects)]
+        self.objects_by_class = {}
+        for identity, class_uri in self.objects:
+            for uri in self.ontology.ancestors(class_uri):
+                self.objects_by_class.setdefault(uri, []).append(identity)
+
+    def triples(self):
+        '''
+        Yields the document as lines of N-Triples
+        '''
+        for identity, class_uri in self.objects:
+            yield f'<{identity}> <{SBOL}hasNamespace> <{self.namespace}> .\n'
+            yield from self.object_triples(identity, class_uri, SBOL_TOP_LEVEL, 0)
+
+    def object_triples(self, identity, class_uri, sbol_type, level):
+        display_id = identity.rsplit('/', 1)[-1]
+        yield f'<{identity}> <{RDF_TYPE}> <{class_uri}> .\n'
+        yield f'<{identity}> <{RDF_TYPE}> <{sbol_type}> .\n'
+        yield f'<{identity}> <{SBOL}displayId> "{display_id}" .\n'
+        violate = self.rng.random() < self.violations
+        for p in self.ontology.all_properties(class_uri):
+            upper = min(p['upper'], 2)
+            n = self.rng.randint(p['lower'], upper)
+            if violate and p['lower']:
+                n, violate = 0, False
+            if p['kind'] == 'compositional':
+                if level >= self.nesting:
+                    continue
+                for k in range(n):
+                    child = f'{identity}/{p["label"]}{k}'
+                    yield f'<{identity}> <{p["uri"]}> <{child}> .\n'
+                    yield from self.object_triples(child, p['range'], SBOL_IDENTIFIED, level + 1)
+            elif p['kind'] == 'associative':
+                candidates = self.objects_by_class.get(p['range'])
+                if candidates:
+                    for referent in self.rng.sample(candidates, min(n, len(candidates))):
+                        yield f'<{identity}> <{p["uri"]}> <{referent}> .\n'
+            else:
+                for k in range(n):
+                    yield f'<{identity}> <{p["uri"]}> {self.value(p["range"], identity, k)} .\n'
+
+    def value(self, datatype, identity, k):
+        datatype = datatype[len(XSD):]
+        if datatype == 'string':
+            return f'"{identity.rsplit("/", 1)[-1]} {k}"'
+        if datatype == 'anyURI':
+            return f'<{identity}/value{k}>'
+        literal = {'integer': str(self.rng.randrange(1000)),
+                   'boolean': self.rng.choice(['true', 'false']),
+                   'dateTime': f'2021-01-{1 + self.rng.randrange(28):02d}T00:00:00'}[datatype]
+        return f'"{literal}"^^<{XSD}{datatype}>'
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            f.writelines(self.triples())
+        return path
+
+
+def generate_modules(n_modules, prefix='synth', seed=0, **kwargs):
+    '''
+    Returns n_modules synthetic ontologies, each of which extends the one before
+    '''
+    ontologies = []
+    base = None
+    for m in range(n_modules):
+        base = SyntheticOntology(f'{prefix}{m}' if n_modules > 1 else prefix, base=base, seed=seed + m, **kwargs)
+        ontologies.append(base)
+    return ontologies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-o', '--output', required=True, help='Directory in which to write the files')
+    parser.add_argument('--prefix', default='synth')
+    parser.add_argument('--modules', type=int, default=1, help='Number of ontologies, each extending the last')
+    parser.add_argument('--classes', type=int, default=100, help='Classes per ontology')
+    parser.add_argument('--depth', type=int, default=4, help='Depth of the inheritance hierarchy')
+    parser.add_argument('--datatype', type=int, default=3, help='Datatype properties per class')
+    parser.add_argument('--compositional', type=int, default=1, help='Compositional properties per class')
+    parser.add_argument('--associative', type=int, default=1, help='Associative properties per class')
+    parser.add_argument('--required', type=float, default=0.2, help='Fraction of required datatype properties')
+    parser.add_argument('--union', type=float, default=0.1, help='Fraction of properties with unionOf domains')
+    parser.add_argument('--cross-module', type=float, default=0.5,
+                        help='Fraction of root classes whose superclass is in the ontology before')
+    parser.add_argument('--objects', type=int, default=100, help='TopLevel objects in the document')
+    parser.add_argument('--nesting', type=int, default=2, help='Maximum depth of child objects')
+    parser.add_argument('--violations', type=float, default=0.0,
+                        help='Fraction of objects that omit a required value')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    ontologies = generate_modules(args.modules, args.prefix, args.seed, n_classes=args.classes, depth=args.depth,
+                                  n_datatype=args.datatype, n_compositional=args.compositional,
+                                  n_associative=args.associative, required=args.required, union=args.union,
+                                  cross_module=args.cross_module)
+    for ontology in ontologies:
+        path = ontology.write(os.path.join(args.output, f'{ontology.prefix}.ttl'))
+        print(f'Wrote {path} ({ontology.prefix}, {ontology.namespace})')
+    document = SyntheticDocument(ontologies[-1], args.objects, nesting=args.nesting, violations=args.violations,
+                                 seed=args.seed)
+    path = document.write(os.path.join(args.output, f'{ontologies[-1].prefix}-document.nt'))
+    print(f'Wrote {path}')
+
+
+if __name__ == '__main__':
+    main()
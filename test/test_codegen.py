@@ -0,0 +1,74 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+
+import sbol3
+from sbol_factory import SBOLFactory
+from sbol_factory.codegen import ModuleWriter
+
+
+TEST_FILES = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'test_files')
+
+
+class TestModuleWriter(unittest.TestCase):
+
+    def setUp(self):
+        SBOLFactory.clear()
+
+    def tearDown(self):
+        SBOLFactory.clear()
+
+    def test_verify_bundled_ontologies(self):
+        uml = 'http://bioprotocols.org/uml#'
+        paml = 'http://bioprotocols.org/paml#'
+        for modules in ([('uml', 'test-ontology.ttl', uml)],
+                        [('uml', 'test-modules.ttl', uml), ('paml', 'test-modules.ttl', paml)],
+                        [('paml', 'test-datetime.ttl', paml)],
+                        [('paml', 'test-provo.ttl', paml)],
+                        [('uml', 'test-required-args.ttl', uml)]):
+            modules = [(name, os.path.join(TEST_FILES, fname), namespace) for name, fname, namespace in modules]
+            self.assertEqual(ModuleWriter.verify(modules), [], modules)
+
+    def test_verify_command(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                ModuleWriter.main(['--verify', '-m', 'uml', os.path.join(TEST_FILES, 'test-ontology.ttl'),
+                                   'http://bioprotocols.org/uml#'])
+                # The modules are written to a temporary directory, which is removed
+                self.assertEqual(os.listdir(tmp), [])
+            finally:
+                os.chdir(cwd)
+
+    def test_ontologies_are_added_once(self):
+        ontology_path = os.path.join(TEST_FILES, 'test-ontology.ttl')
+        for _ in range(2):
+            ModuleWriter('uml', ontology_path, 'http://bioprotocols.org/uml#')
+        self.assertEqual(SBOLFactory.ontology_paths, [ontology_path])
+
+    def test_round_trip(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        ModuleWriter('uml', os.path.join(TEST_FILES, 'test-ontology.ttl'), 'http://bioprotocols.org/uml#').write(tmp)
+        SBOLFactory.clear()
+        sys.path.insert(0, tmp)
+        try:
+            import uml
+            self.assertEqual(uml.__file__, os.path.join(tmp, 'uml', '__init__.py'))
+            original_file = os.path.join(TEST_FILES, 'mini_library.nt')
+            doc = sbol3.Document()
+            doc.read(original_file, sbol3.SORTED_NTRIPLES)
+            self.assertIsInstance(doc.find('https://example.org/test/Provision'), uml.Behavior)
+            with open(original_file, 'r') as f:
+                expected = f.read()
+            self.assertEqual(doc.write_string(file_format=sbol3.SORTED_NTRIPLES), expected)
+        finally:
+            sys.path.remove(tmp)
+            sys.modules.pop('uml', None)
+
+
+if __name__ == '__main__':
+    unittest.main()
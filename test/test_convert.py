@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import rdflib
+from rdflib.compare import isomorphic
+
+from sbol_factory.convert import BatchConverter, MANIFEST
+
+
+TEST_FILES = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'test_files')
+
+
+class TestBatchConverter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.tmp.name, 'input')
+        os.makedirs(os.path.join(self.input_dir, 'nested'))
+        shutil.copy(os.path.join(TEST_FILES, 'mini_library.nt'), self.input_dir)
+        shutil.copy(os.path.join(TEST_FILES, 'test-datetime.ttl'), os.path.join(self.input_dir, 'nested'))
+        self.output_dir = os.path.join(self.tmp.name, 'output')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def convert(self, output_format, inputs=None, **kwargs):
+        if inputs is None:
+            inputs = [self.input_dir]
+        lines = []
+        results = BatchConverter(output_format, self.output_dir, processes=2, **kwargs).convert(inputs, lines.append)
+        return results, lines
+
+    def test_formats(self):
+        for output_format, extension, rdflib_format in [('turtle', '.ttl', 'turtle'), ('nt', '.nt', 'nt'),
+                                                        ('sorted-nt', '.nt', 'nt'), ('xml', '.rdf', 'xml'),
+                                                        ('json-ld', '.jsonld', 'json-ld')]:
+            shutil.rmtree(self.output_dir, ignore_errors=True)
+            results, lines = self.convert(output_format)
+            self.assertEqual(len(results), 2)
+            self.assertTrue(lines[-1].startswith('2 converted, 0 up to date, 0 failed'))
+            for input_name, output_name in [('mini_library.nt', 'mini_library'),
+                                            ('nested/test-datetime.ttl', 'nested/test-datetime')]:
+                expected = rdflib.Graph().parse(os.path.join(self.input_dir, input_name))
+                actual = rdflib.Graph().parse(os.path.join(self.output_dir, output_name + extension),
+                                              format=rdflib_format)
+                self.assertTrue(isomorphic(actual, expected), output_format)
+
+    def test_sorted_n_triples(self):
+        self.convert('sorted-nt', buffer_size=5)
+        with open(os.path.join(self.output_dir, 'mini_library.nt')) as f:
+            rows = f.readlines()
+        self.assertEqual(rows, sorted(set(rows)))
+
+    def test_skips_up_to_date_outputs(self):
+        self.convert('json-ld')
+        results, lines = self.convert('json-ld')
+        self.assertEqual(results, [])
+        self.assertEqual(lines, ['0 converted, 2 up to date, 0 failed in 0.00 s'])
+
+        # A touched input is converted again
+        input_path = os.path.join(self.input_dir, 'mini_library.nt')
+        output_path = os.path.join(self.output_dir, 'mini_library.jsonld')
+        os.utime(input_path, (os.path.getmtime(output_path) + 1,) * 2)
+        results, lines = self.convert('json-ld')
+        self.assertEqual([result[0] for result in results], [input_path])
+        results, lines = self.convert('json-ld', force=True)
+        self.assertEqual(len(results), 2)
+
+    def test_outputs_beside_inputs(self):
+        self.output_dir = None
+        for output_format, output_name, nested_name in [('sorted-nt', 'mini_library.sorted-nt.nt', 'test-datetime.nt'),
+                                                        ('json-ld', 'mini_library.jsonld', 'test-datetime.jsonld')]:
+            for _ in range(3):
+                results, lines = self.convert(output_format, force=True)
+                self.assertEqual(len(results), 2)
+            # Outputs of the earlier conversions are not converted again
+            self.assertEqual(sorted(os.listdir(self.input_dir)),
+                             sorted([MANIFEST, 'mini_library.nt', output_name, 'nested']))
+            self.assertEqual(sorted(os.listdir(os.path.join(self.input_dir, 'nested'))),
+                             sorted([MANIFEST, nested_name, 'test-datetime.ttl']))
+            os.remove(os.path.join(self.input_dir, output_name))
+            os.remove(os.path.join(self.input_dir, 'nested', nested_name))
+
+    def test_output_collision(self):
+        shutil.copy(os.path.join(TEST_FILES, 'mini_library.nt'), os.path.join(self.input_dir, 'mini_library.ttl'))
+        with self.assertRaises(ValueError):
+            self.convert('json-ld')
+        self.assertFalse(os.path.exists(self.output_dir))
+
+    def test_input_is_not_overwritten(self):
+        # An N-Triples file that no conversion wrote is an input, rather than an earlier output
+        self.output_dir = None
+        nested_dir = os.path.join(self.input_dir, 'nested')
+        shutil.copy(os.path.join(TEST_FILES, 'mini_library.nt'), os.path.join(nested_dir, 'test-datetime.nt'))
+        with open(os.path.join(nested_dir, 'test-datetime.nt')) as f:
+            expected = f.read()
+        with self.assertRaises(ValueError):
+            self.convert('nt')
+        with open(os.path.join(nested_dir, 'test-datetime.nt')) as f:
+            self.assertEqual(f.read(), expected)
+
+    def test_glob_and_failure(self):
+        broken = os.path.join(self.input_dir, 'broken.ttl')
+        with open(broken, 'w') as f:
+            f.write('this is not turtle')
+        results, lines = self.convert('nt', [os.path.join(self.input_dir, '*.ttl')])
+        self.assertEqual(len(results), 1)
+        self.assertIsNotNone(results[0][3])
+        self.assertTrue(lines[-1].startswith('0 converted, 0 up to date, 1 failed'))
+        # A failed conversion leaves no output behind
+        self.assertEqual(os.listdir(self.output_dir), [])
+        with self.assertRaises(FileNotFoundError):
+            self.convert('nt', [os.path.join(self.input_dir, '*.owl')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import json
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+import rdflib
+from rdflib.compare import isomorphic
+
+from sbol_factory.json_ld_writer import JsonLdWriter, nt_row
+
+
+TEST_FILES = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'test_files')
+
+
+class TestJsonLdWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def convert(self, input_path, **kwargs):
+        output_path = os.path.join(self.tmp.name, f'{len(os.listdir(self.tmp.name))}.jsonld')
+        JsonLdWriter(**kwargs).convert(input_path, output_path)
+        return output_path
+
+    def assertRoundTrips(self, input_path, output_path):
+        expected = rdflib.Graph().parse(input_path)
+        actual = rdflib.Graph().parse(output_path, format='json-ld')
+        self.assertEqual(len(actual), len(expected))
+        self.assertTrue(isomorphic(actual, expected))
+
+    def test_n_triples(self):
+        input_path = os.path.join(TEST_FILES, 'mini_library.nt')
+        self.assertRoundTrips(input_path, self.convert(input_path))
+
+    def test_turtle(self):
+        # Includes blank nodes, language tags and typed literals
+        for name in ('test-ontology.ttl', 'test-shapes.ttl', 'test-datetime.ttl'):
+            input_path = os.path.join(TEST_FILES, name)
+            self.assertRoundTrips(input_path, self.convert(input_path))
+
+    def test_spilled_output_is_identical(self):
+        input_path = os.path.join(TEST_FILES, 'mini_library.nt')
+        with open(self.convert(input_path)) as f:
+            in_memory = f.read()
+        with open(self.convert(input_path, buffer_size=7)) as f:
+            spilled = f.read()
+        self.assertEqual(spilled, in_memory)
+
+    def test_node_objects(self):
+        input_path = os.path.join(self.tmp.name, 'input.ttl')
+        with open(input_path, 'w') as f:
+            f.write('@prefix sbol: <http://sbols.org/v3#> .\n'
+                    '<https://example.org/c> a sbol:Component ;\n'
+                    '    sbol:name "a\\nb" ;\n'
+                    '    sbol:name "a\\nb" ;\n'
+                    '    sbol:role <https://identifiers.org/SO:0000141>, <https://identifiers.org/SO:0000316> .\n')
+        context = JsonLdWriter.context({'http://sbols.org/v3#': 'sbol'})
+        with open(self.convert(input_path, context=context, buffer_size=1)) as f:
+            document = json.load(f)
+        self.assertEqual(document['@context'], {'sbol': 'http://sbols.org/v3#'})
+        self.assertEqual(document['@graph'], [{'@id': 'https://example.org/c',
+                                               '@type': 'sbol:Component',
+                                               'sbol:name': 'a\nb',
+                                               'sbol:role': [{'@id': 'https://identifiers.org/SO:0000141'},
+                                                             {'@id': 'https://identifiers.org/SO:0000316'}]}])
+
+    def test_nt_row(self):
+        s, p = rdflib.URIRef('https://example.org/c'), rdflib.URIRef('http://sbols.org/v3#name')
+        self.assertEqual(nt_row((s, p, rdflib.Literal('a\nb "c"', lang='en'))),
+                         '<https://example.org/c> <http://sbols.org/v3#name> "a\\nb \\"c\\""@en .\n')
+        self.assertEqual(nt_row((s, p, rdflib.Literal(1))),
+                         '<https://example.org/c> <http://sbols.org/v3#name> '
+                         '"1"^^<http://www.w3.org/2001/XMLSchema#integer> .\n')
+        self.assertEqual(nt_row((s, p, rdflib.BNode('b'))), '<https://example.org/c> <http://sbols.org/v3#name> _:b .\n')
+
+    def test_main(self):
+        input_path = os.path.join(TEST_FILES, 'mini_library.nt')
+        output_path = os.path.join(self.tmp.name, 'main.jsonld')
+        writer = JsonLdWriter()
+        with unittest.mock.patch('sys.argv', ['json_ld_writer', '-i', input_path, '-o', output_path,
+                                              '--buffer-size', '7']):
+            writer.main()
+        self.assertRoundTrips(input_path, output_path)
+        # The command converts with a writer of its own
+        self.assertEqual(writer.buffer_size, 1000000)
+
+    def test_context(self):
+        context = JsonLdWriter.context({'http://sbols.org/v3#': 'sbol', 'http://bioprotocols.org/uml#': 'uml',
+                                        'http://example.org/default#': ''})
+        self.assertEqual(context, {'sbol': 'http://sbols.org/v3#', 'uml': 'http://bioprotocols.org/uml#'})
+        # By default, the prefixes of the ontologies loaded by the SBOLFactory
+        import test_files
+        self.assertEqual(JsonLdWriter.context()['uml'], 'http://bioprotocols.org/uml#')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,18 @@
+import gc
 import unittest
 import os
+import subprocess
 import sys
 import tempfile
+import tracemalloc
+
+import rdflib
+import rdflib.compare
+import sbol3
 
 from sbol_factory import SBOLFactory, UMLFactory
+from sbol_factory.query import Query
+from sbol_factory.ontology_store import BUNDLED_ONTOLOGIES, serialized_path
 
 
 class TestOntologyToModule(unittest.TestCase):
@@ -49,5 +58,78 @@ class TestOntologyToModule(unittest.TestCase):
 #        self.assertEqual(dot_source_actual, dot_source_expected) 
 
 
+class TestUnload(unittest.TestCase):
+
+    def setUp(self):
+        SBOLFactory.clear()
+        self.ontology_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'test_files/test-modules.ttl')
+
+    def tearDown(self):
+        SBOLFactory.clear()
+
+    def test_unload(self):
+        SBOLFactory('uml', self.ontology_path, 'http://bioprotocols.org/uml#')
+        n_bundled = len(Query.graph) - len(Query.store.graph.get_context(Query.store.identifier(self.ontology_path)))
+        n_triples = len(Query.graph)
+        SBOLFactory('paml', self.ontology_path, 'http://bioprotocols.org/paml#')
+        # Both modules share a single copy of the ontology
+        self.assertEqual(len(Query.graph), n_triples)
+
+        SBOLFactory.unload('paml')
+        self.assertNotIn('paml', sys.modules)
+        self.assertNotIn('http://bioprotocols.org/paml#BehaviorExecution', sbol3.Document._uri_type_map)
+        self.assertIn('http://bioprotocols.org/uml#Activity', sbol3.Document._uri_type_map)
+        self.assertEqual(len(Query.graph), n_triples)
+
+        SBOLFactory.unload('uml')
+        self.assertNotIn('http://bioprotocols.org/uml#Activity', sbol3.Document._uri_type_map)
+        self.assertEqual(len(Query.graph), n_bundled)
+        self.assertEqual(SBOLFactory.ontology_paths, [])
+        with self.assertRaises(ValueError):
+            SBOLFactory.unload('uml')
+
+    def test_memory_is_flat(self):
+        def cycle():
+            uml = SBOLFactory('uml', self.ontology_path, 'http://bioprotocols.org/uml#')
+            uml.Activity('http://test.org/umlact')
+            del uml
+            SBOLFactory.clear()
+            gc.collect()
+
+        tracemalloc.start()
+        try:
+            # Warm up caches that are allocated once per process
+            cycle()
+            cycle()
+            before = tracemalloc.get_traced_memory()[0]
+            for _ in range(5):
+                cycle()
+            after = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        # Repeatedly generating and clearing a module must not accumulate ontologies or classes
+        self.assertLess(after - before, 100 * 1024)
+
+
+class TestImport(unittest.TestCase):
+
+    def test_serialized_ontologies_match(self):
+        # The pre-serialized ontologies must be regenerated whenever the originals change
+        for path in BUNDLED_ONTOLOGIES:
+            expected = rdflib.Graph().parse(path, format='xml')
+            actual = rdflib.Graph().parse(serialized_path(path), format='nt')
+            self.assertTrue(rdflib.compare.isomorphic(expected, actual), path)
+
+    def test_optional_subsystems_are_deferred(self):
+        script = ('import sys, sbol_factory; '
+                  'print(sorted(m for m in ("sbol_factory.uml_factory", "pylatex", "graphviz") '
+                  'if m in sys.modules))')
+        cwd = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+        output = subprocess.run([sys.executable, '-c', script], cwd=cwd, capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), '[]')
+        import sbol_factory
+        self.assertEqual(sbol_factory.UMLFactory.__name__, 'UMLFactory')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,9 @@
 import tempfile
 import os
+import traceback
+import shutil
 import unittest
+import unittest.mock
 import filecmp
 import sbol3
 import test_files
@@ -139,6 +142,14 @@ class TestConstructors(unittest.TestCase):
         with self.assertRaises(TypeError):
             self.uml.NoRequiredArgs(behavior='foo')
 
+    def test_traceback_shows_source(self):
+        try:
+            self.uml.NoRequiredArgs(behavior='foo')
+        except TypeError as e:
+            frames = traceback.extract_tb(e.__traceback__)
+        frame = [f for f in frames if f.filename == '<http://bioprotocols.org/uml#NoRequiredArgs>'][0]
+        self.assertTrue(frame.line)
+
     def tearDown(self):
         SBOLFactory.clear()
 
@@ -159,5 +170,92 @@ class TestComposition(unittest.TestCase):
                       SBOLFactory.query.query_compositional_properties('http://bioprotocols.org/uml#Behavior'))
 
 
+class TestSchemaCache(unittest.TestCase):
+
+    def setUp(self):
+        SBOLFactory.clear()
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        SBOLFactory.clear()
+        shutil.rmtree(self.cache_dir)
+
+    def test_warm_start(self):
+        ontology_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'test_files/test-ontology.ttl')
+        cold = SBOLFactory('uml', ontology_path, 'http://bioprotocols.org/uml#', cache_dir=self.cache_dir)
+        self.assertTrue(os.path.exists(os.path.join(self.cache_dir, 'uml.json')))
+        expected = {name: [c.__name__ for c in cls.mro()] for name, cls in cold.__dict__.items() if isinstance(cls, type)}
+        SBOLFactory.clear()
+
+        # A warm start must not parse or query the ontologies
+        with unittest.mock.patch.object(SBOLFactory, 'load_ontologies', side_effect=AssertionError):
+            warm = SBOLFactory('uml', ontology_path, 'http://bioprotocols.org/uml#', cache_dir=self.cache_dir)
+        actual = {name: [c.__name__ for c in cls.mro()] for name, cls in warm.__dict__.items() if isinstance(cls, type)}
+        self.assertEqual(expected, actual)
+        sbol3.set_namespace('https://example.org/test')
+        p = warm.Parameter(name='x', direction='http://bioprotocols.org/uml#in', is_ordered=True, is_unique=True)
+        self.assertEqual(p.direction, 'http://bioprotocols.org/uml#in')
+        self.assertEqual(sbol3.Document._uri_type_map['http://bioprotocols.org/uml#Parameter'](identity='http://example.org/p',
+                                                                                                type_uri='http://bioprotocols.org/uml#Parameter').type_uri,
+                         'http://bioprotocols.org/uml#Parameter')
+
+    def test_stale_entry(self):
+        ontology_path = os.path.join(self.cache_dir, 'test-modules.ttl')
+        shutil.copy(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'test_files/test-modules.ttl'), ontology_path)
+        SBOLFactory('uml', ontology_path, 'http://bioprotocols.org/uml#', cache_dir=self.cache_dir)
+        SBOLFactory.clear()
+
+        # Editing the ontology invalidates the cached schema
+        with open(ontology_path, 'a') as f:
+            f.write('\numl:Behavior rdf:type owl:Class ;\n        rdfs:subClassOf sbol:TopLevel .\n')
+        with unittest.mock.patch.object(SBOLFactory, 'load_ontologies', wraps=SBOLFactory.load_ontologies) as load:
+            uml = SBOLFactory('uml', ontology_path, 'http://bioprotocols.org/uml#', cache_dir=self.cache_dir)
+            load.assert_called_once()
+        self.assertTrue('Behavior' in uml.__dict__)
+
+
+class TestLazyModule(unittest.TestCase):
+
+    def setUp(self):
+        SBOLFactory.clear()
+        self.uml = SBOLFactory('uml',
+                               os.path.join(os.path.dirname(os.path.realpath(__file__)), 'test_files/test-ontology.ttl'),
+                               'http://bioprotocols.org/uml#', lazy=True)
+
+    def tearDown(self):
+        SBOLFactory.clear()
+
+    def test_attribute_access(self):
+        self.assertNotIn('Parameter', self.uml.__dict__)
+        self.assertIn('Parameter', dir(self.uml))
+        self.assertIn('Parameter', self.uml.__all__)
+        sbol3.set_namespace('https://example.org/test')
+        p = self.uml.Parameter(name='x', direction='http://bioprotocols.org/uml#in', is_ordered=True, is_unique=True)
+        self.assertIn('Parameter', self.uml.__dict__)
+        self.assertIs(type(p), self.uml.__dict__['Parameter'])
+        # Superclasses in the ontology are generated along with their subclasses
+        for superclass_name in ('LiteralSpecification', 'ValueSpecification'):
+            self.assertNotIn(superclass_name, self.uml.__dict__)
+        literal = self.uml.LiteralInteger(value=1)
+        for superclass_name in ('LiteralSpecification', 'ValueSpecification'):
+            self.assertIn(superclass_name, self.uml.__dict__)
+            self.assertIn(self.uml.__dict__[superclass_name], type(literal).mro())
+        with self.assertRaises(AttributeError):
+            self.uml.NoSuchClass
+
+    def test_import_star(self):
+        namespace = {}
+        exec('from uml import *', namespace)
+        self.assertIn('LiteralInteger', namespace)
+        self.assertIs(namespace['LiteralInteger'], self.uml.LiteralInteger)
+
+    def test_deserialization(self):
+        doc = sbol3.Document()
+        doc.read(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'test_files', 'mini_library.nt'), sbol3.SORTED_NTRIPLES)
+        self.assertIn('Behavior', self.uml.__dict__)
+        self.assertIsInstance(doc.find('https://example.org/test/Provision'), self.uml.Behavior)
+        self.assertNotIn('Activity', self.uml.__dict__)
+
+
 if __name__ == '__main__':
     unittest.main()
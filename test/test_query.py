@@ -0,0 +1,172 @@
+import unittest
+import json
+import os
+import tempfile
+
+from sbol_factory import SBOLFactory, QueryStats
+from sbol_factory.query import Query
+from sbol_factory.schema_index import SparqlSchemaIndex
+from sbol_factory.class_hierarchy import ClassHierarchy
+
+
+TEST_ONTOLOGY = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'test_files/test-ontology.ttl')
+
+
+class TestSchemaIndex(unittest.TestCase):
+
+    def setUp(self):
+        SBOLFactory.clear()
+
+    def tearDown(self):
+        SBOLFactory.clear()
+
+    def assertSameAnswer(self, method, *args):
+        # Compare the SPARQL and indexed answers, including any exception raised
+        answers = []
+        for query in (self.sparql, self.indexed):
+            try:
+                response = getattr(query, method)(*args)
+                if isinstance(response, list):
+                    response = sorted(str(r) for r in response)
+                answers.append(response)
+            except Exception as e:
+                answers.append(('raised', type(e)))
+        self.assertEqual(answers[0], answers[1], f'{method}{args}')
+
+    def test_index_matches_sparql(self):
+        self.sparql = Query(TEST_ONTOLOGY, indexed=False)
+        self.indexed = Query(TEST_ONTOLOGY)
+        self.assertSameAnswers()
+
+    def test_sparql_extraction_matches_sparql(self):
+        self.sparql = Query(TEST_ONTOLOGY, indexed=False)
+        self.indexed = Query(TEST_ONTOLOGY, extraction='sparql')
+        self.assertIsInstance(self.indexed.get_index(), SparqlSchemaIndex)
+        self.assertSameAnswers()
+
+    def test_sparql_extraction_query_count(self):
+        # The index is extracted with the same number of queries, however many classes there are
+        QueryStats.enable()
+        try:
+            query = Query(TEST_ONTOLOGY, extraction='sparql')
+            for class_uri in query.query_classes():
+                # As in SBOLFactory.compile_schema, only the classes of the ontology being generated
+                if 'http://bioprotocols.org/uml#' not in class_uri:
+                    continue
+                query.query_properties(class_uri)
+                query.query_required_properties(class_uri)
+        finally:
+            QueryStats.disable()
+        self.assertEqual(QueryStats.snapshot()['methods']['evaluate']['count'], len(SparqlSchemaIndex.QUERIES))
+        QueryStats.reset()
+        # The index built by one extraction is not reused by the other
+        self.assertNotIsInstance(Query(TEST_ONTOLOGY).get_index(), SparqlSchemaIndex)
+
+    def assertSameAnswers(self):
+        self.assertSameAnswer('query_classes')
+        self.assertSameAnswer('query_base_classes')
+        self.assertSameAnswer('query_subclasses', 'http://sbols.org/v3#TopLevel')
+        for class_uri in self.sparql.query_classes():
+            # Limit the comparison to the test ontology, since the SPARQL path is slow
+            if 'http://bioprotocols.org/uml#' not in class_uri:
+                continue
+            for method in ('query_subclasses', 'query_superclass', 'query_ancestors', 'query_descendants',
+                           'query_object_properties', 'query_compositional_properties',
+                           'query_associative_properties', 'query_datatype_properties', 'query_properties',
+                           'query_comment', 'is_top_level', 'query_required_properties',
+                           'query_inheritance_hierarchy', 'query_base_class'):
+                self.assertSameAnswer(method, class_uri)
+            for superclass_uri in ('http://sbols.org/v3#TopLevel', 'http://bioprotocols.org/uml#Behavior', class_uri):
+                self.assertSameAnswer('is_subclass', class_uri, superclass_uri)
+            for property_uri in self.sparql.query_properties(class_uri):
+                self.assertSameAnswer('query_label', property_uri)
+                self.assertSameAnswer('query_comment', property_uri)
+                self.assertSameAnswer('query_cardinality', property_uri, class_uri)
+                self.assertSameAnswer('query_property_datatype', property_uri, class_uri)
+
+
+class TestClassHierarchy(unittest.TestCase):
+
+    def test_closure(self):
+        # D has two superclasses, and E and F form a cycle
+        hierarchy = ClassHierarchy({'B': ['A'], 'C': ['B'], 'D': ['C', 'R'], 'E': ['F'], 'F': ['E']},
+                                   {'A', 'B', 'C', 'D', 'E', 'F'})
+        self.assertEqual(hierarchy.ancestors('D'), {'A', 'B', 'C', 'D', 'R'})
+        self.assertEqual(hierarchy.descendants('B'), {'B', 'C', 'D'})
+        self.assertEqual(hierarchy.ancestors('A'), {'A'})
+        self.assertEqual(hierarchy.descendants('X'), {'X'})
+        self.assertTrue(hierarchy.is_a('C', 'A'))
+        self.assertFalse(hierarchy.is_a('A', 'C'))
+        self.assertIn('F', hierarchy.ancestors('E'))
+        self.assertEqual(hierarchy.ancestors('E'), hierarchy.ancestors('F'))
+        self.assertEqual(hierarchy.descendants('E'), {'E', 'F'})
+        # R is not a class, so D has one superclass among the classes
+        self.assertEqual(hierarchy.lineage('D'), ['D', 'C', 'B', 'A'])
+        self.assertEqual(hierarchy.lineage('E'), ['E', 'F'])
+
+    def test_cycle_closure(self):
+        # G and H are on a cycle below A, and I inherits from the cycle
+        hierarchy = ClassHierarchy({'G': ['H', 'A'], 'H': ['G'], 'I': ['H']})
+        self.assertEqual(hierarchy.ancestors('G'), {'A', 'G', 'H'})
+        self.assertEqual(hierarchy.ancestors('H'), {'A', 'G', 'H'})
+        self.assertEqual(hierarchy.ancestors('I'), {'A', 'G', 'H', 'I'})
+        self.assertEqual(hierarchy.descendants('A'), {'A', 'G', 'H', 'I'})
+
+    def test_deep_hierarchy(self):
+        superclasses = {f'C{i}': [f'C{i - 1}'] for i in range(1, 2000)}
+        hierarchy = ClassHierarchy(superclasses)
+        self.assertEqual(len(hierarchy.ancestors('C1999')), 2000)
+        self.assertTrue(hierarchy.is_a('C1999', 'C0'))
+
+
+class TestQueryStats(unittest.TestCase):
+
+    def setUp(self):
+        SBOLFactory.clear()
+        QueryStats.reset()
+
+    def tearDown(self):
+        QueryStats.disable()
+        QueryStats.reset()
+        SBOLFactory.clear()
+
+    def test_disabled_by_default(self):
+        SBOLFactory('uml', TEST_ONTOLOGY, 'http://bioprotocols.org/uml#')
+        self.assertEqual(QueryStats.snapshot(), {'methods': {}, 'shapes': {}, 'slow_queries': [], 'modules': {}})
+
+    def test_methods_and_shapes(self):
+        QueryStats.enable(slow_query_threshold=0)
+        query = Query(TEST_ONTOLOGY, indexed=False)
+        for class_uri in ('http://bioprotocols.org/uml#Behavior', 'http://bioprotocols.org/uml#Parameter'):
+            query.query_datatype_properties(class_uri)
+        QueryStats.disable()
+        query.query_datatype_properties('http://bioprotocols.org/uml#Activity')
+
+        snapshot = QueryStats.snapshot()
+        self.assertEqual(snapshot['methods']['query_datatype_properties']['count'], 2)
+        self.assertEqual(snapshot['methods']['evaluate']['count'], 4)
+        # Each query of query_datatype_properties has one shape, whatever the class
+        self.assertEqual(len(snapshot['shapes']), 2)
+        for timings in snapshot['shapes'].values():
+            self.assertEqual(timings['count'], 2)
+            self.assertLessEqual(timings['p50_seconds'], timings['max_seconds'])
+        self.assertEqual(len(snapshot['slow_queries']), 6)
+        self.assertEqual(snapshot['slow_queries'][-1]['args'], ['http://bioprotocols.org/uml#Parameter'])
+
+    def test_phases(self):
+        QueryStats.enable()
+        SBOLFactory('uml', TEST_ONTOLOGY, 'http://bioprotocols.org/uml#')
+        with tempfile.TemporaryDirectory() as tmp:
+            QueryStats.dump(os.path.join(tmp, 'stats.json'))
+            with open(os.path.join(tmp, 'stats.json')) as f:
+                snapshot = json.load(f)
+        module = snapshot['modules']['uml']
+        self.assertEqual(set(module['phases']), {'cache', 'parse', 'enumerate', 'compile', 'generate', 'register',
+                                                 'exec'})
+        self.assertLessEqual(sum(module['phases'].values()), module['total_seconds'])
+        self.assertIn('Behavior', module['classes'])
+        self.assertGreater(snapshot['methods']['query_classes']['total_results'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+import sbol3
+from sbol_factory import SBOLFactory, Document
+from sbol_factory.schema_validator import SchemaValidator
+
+from benchmarks.synthetic import SyntheticDocument, generate_modules
+
+
+class TestSyntheticOntology(unittest.TestCase):
+
+    def setUp(self):
+        SBOLFactory.clear()
+        sbol3.set_namespace('https://example.org/synthetic')
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ontologies = generate_modules(2, n_classes=20, depth=3, required=0.5, union=0.3)
+        self.modules = []
+        for ontology in self.ontologies:
+            path = ontology.write(os.path.join(self.tmp.name, f'{ontology.prefix}.ttl'))
+            self.modules.append(SBOLFactory(ontology.prefix, path, ontology.namespace))
+
+    def tearDown(self):
+        SBOLFactory.clear()
+        self.tmp.cleanup()
+
+    def test_classes(self):
+        for ontology, module in zip(self.ontologies, self.modules):
+            for class_uri, definition in ontology.classes.items():
+                Class = getattr(module, class_uri.split('#')[-1])
+                superclass = ontology.lookup(definition['superclass'])[1]
+                if superclass is not None:
+                    self.assertEqual(Class.__mro__[1].__name__, superclass['uri'].split('#')[-1])
+                obj = sbol3.Document._uri_type_map[class_uri](identity='https://example.org/synthetic/x',
+                                                              type_uri=class_uri)
+                self.assertEqual(isinstance(obj, sbol3.TopLevel), ontology.is_top_level(class_uri))
+                names = {p.property_uri: name for name, p in obj.__dict__.items() if isinstance(p, sbol3.Property)}
+                for p in ontology.all_properties(class_uri):
+                    self.assertEqual(names[p['uri']], p['label'])
+
+    def test_documents(self):
+        for violations in (0.0, 1.0):
+            path = os.path.join(self.tmp.name, f'document-{violations}.nt')
+            SyntheticDocument(self.ontologies[-1], 50, violations=violations).write(path)
+            doc = Document()
+            doc.read(path, sbol3.NTRIPLES)
+            self.assertEqual(len(doc.objects), 50)
+            results = [r for rs in SchemaValidator().validate(doc).values() for r in rs]
+            if violations:
+                self.assertTrue(results)
+            else:
+                self.assertEqual(results, [])
+
+    def test_reproducible(self):
+        again = generate_modules(2, n_classes=20, depth=3, required=0.5, union=0.3)
+        self.assertEqual(again[-1].turtle(), self.ontologies[-1].turtle())
+        self.assertEqual(list(SyntheticDocument(again[-1], 10).triples()),
+                         list(SyntheticDocument(self.ontologies[-1], 10).triples()))
+
+
+if __name__ == '__main__':
+    unittest.main()
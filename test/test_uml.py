@@ -0,0 +1,207 @@
+import importlib.util
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import unittest.mock
+
+from sbol_factory import UMLFactory
+from sbol_factory import uml_factory
+from sbol_factory.query import Query
+from sbol_factory.ontology_store import OntologyStore
+
+
+ONTOLOGY = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'test_files', 'test-ontology.ttl')
+
+
+def release(ontology_path):
+    # Each UMLFactory keeps its ontology loaded in the shared store
+    while Query.store is not None and OntologyStore.identifier(ontology_path) in Query.store.refcounts:
+        Query.store.release(ontology_path)
+
+
+class FakeRenderer():
+    '''
+    Stands in for dot, laying out each diagram as wide as its DOT source is
+    long, and records how many diagrams were rendered at once
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.rendered = []
+
+    def run(self, cmd, *args, **kwargs):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.05)
+        # dot -Tpdf -o outfile.pdf -Tplain -o outfile.plain outfile
+        pdf_file, layout_file, dot_file = cmd[3], cmd[6], cmd[7]
+        with open(dot_file) as f:
+            width = len(f.read()) / 72
+        with open(pdf_file, 'wb') as f:
+            f.write(b'%PDF-1.5\n')
+        with open(layout_file, 'w') as f:
+            f.write(f'graph 1 {width} 1\nstop\n')
+        with self.lock:
+            self.running -= 1
+            self.rendered.append(os.path.basename(dot_file))
+
+
+class TestUMLFactory(unittest.TestCase):
+
+    def generate(self, workers=None, output_dir=None, ontology_path=ONTOLOGY):
+        '''
+        Generates the documentation into output_dir, or a temporary directory,
+        and returns the renderer and the LaTeX
+        '''
+        renderer = FakeRenderer()
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(output_dir or tmp)
+            try:
+                with unittest.mock.patch.object(uml_factory.subprocess, 'run', renderer.run):
+                    UMLFactory(ontology_path, 'http://bioprotocols.org/uml#').generate('figures', workers=workers)
+                with open('umlDataModel.tex') as f:
+                    tex = f.read()
+            finally:
+                os.chdir(cwd)
+        return renderer, tex
+
+    def test_parallel_rendering(self):
+        serial, serial_tex = self.generate(workers=1)
+        parallel, parallel_tex = self.generate(workers=4)
+        self.assertEqual(serial.max_running, 1)
+        self.assertGreater(parallel.max_running, 1)
+        self.assertEqual(sorted(parallel.rendered), sorted(serial.rendered))
+        # The LaTeX does not depend on the order in which the diagrams were rendered
+        self.assertEqual(parallel_tex, serial_tex)
+        sections = [line for line in parallel_tex.splitlines() if line.startswith('\\subsection')]
+        self.assertEqual(len(sections), 6)
+        self.assertEqual(sections, sorted(sections))
+
+    def test_incremental_generation(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            ontology_path = os.path.join(tmp, 'ontology.ttl')
+            shutil.copy(ONTOLOGY, ontology_path)
+            self.addCleanup(release, ontology_path)
+            tex_path = os.path.join(tmp, 'umlDataModel.tex')
+
+            renderer, tex = self.generate(output_dir=tmp, ontology_path=ontology_path)
+            self.assertEqual(len(renderer.rendered), 6)
+            mtime = os.stat(tex_path).st_mtime_ns
+
+            # Nothing changed, so nothing is rendered or written
+            renderer, unchanged_tex = self.generate(output_dir=tmp, ontology_path=ontology_path)
+            self.assertEqual(renderer.rendered, [])
+            self.assertEqual(unchanged_tex, tex)
+            self.assertEqual(os.stat(tex_path).st_mtime_ns, mtime)
+
+            # A new subclass changes the diagram of its superclass only
+            release(ontology_path)
+            with open(ontology_path, 'a') as f:
+                f.write('uml:SyncNode rdf:type owl:Class ; rdfs:subClassOf uml:ActivityNode .\n')
+            renderer, changed_tex = self.generate(output_dir=tmp, ontology_path=ontology_path)
+            self.assertEqual(renderer.rendered, ['ActivityNode_abstraction_hierarchy'])
+            self.assertIn('SyncNode', changed_tex)
+            self.assertNotIn('SyncNode', tex)
+
+    def test_classes_are_queried_once(self):
+        factory = UMLFactory(ONTOLOGY, 'http://bioprotocols.org/uml#')
+        renderer = FakeRenderer()
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                with unittest.mock.patch.object(uml_factory.subprocess, 'run', renderer.run), \
+                        unittest.mock.patch.object(factory.query, 'query_cardinality',
+                                                   wraps=factory.query.query_cardinality) as query_cardinality:
+                    factory.generate('figures')
+            finally:
+                os.chdir(cwd)
+        calls = [c.args for c in query_cardinality.call_args_list]
+        self.assertGreater(len(calls), 0)
+        self.assertEqual(len(calls), len(set(calls)))
+
+    def test_traversal_terminates_on_cycles(self):
+        factory = UMLFactory(ONTOLOGY, 'http://bioprotocols.org/uml#')
+        a, b, c = (f'http://example.org/test#{name}' for name in 'ABC')
+        plan = {'subclasses': [], 'compositional': []}
+        factory.plans = {a: dict(plan, compositional=[('http://example.org/test#b', 0, 1, b)]),
+                         b: dict(plan, compositional=[('http://example.org/test#a', 0, 1, a)], subclasses=[c]),
+                         c: plan}
+        self.assertEqual(factory.traversal(a), [(a, 0), (b, 0), (a, 0), (c, 1)])
+
+    def test_traversal_matches_recursive_queries(self):
+        # generate adds each class it draws to GLOBALS, which stops the
+        # traversal at the class, so a class outside GLOBALS is traversed here
+        factory = UMLFactory(ONTOLOGY, 'http://bioprotocols.org/uml#')
+        query = factory.query
+        behavior = 'http://bioprotocols.org/uml#Behavior'
+        expected = []
+        completed = set()
+
+        def visit(uri, level):
+            expected.append((uri, level))
+            if uri in completed or 'sbol' in uri:
+                return
+            completed.add(uri)
+            for property_uri in sorted(query.query_compositional_properties(uri)):
+                visit(query.query_property_datatype(property_uri, uri)[0], level)
+            for i, subclass_uri in enumerate(sorted(query.query_subclasses(uri))):
+                visit(subclass_uri, level + i + 1)
+
+        with unittest.mock.patch.object(uml_factory, 'GLOBALS', set()):
+            visit(behavior, 0)
+            order = factory.traversal(behavior)
+            dot = uml_factory.graphviz.Digraph('Behavior')
+            factory._generate(behavior, factory.draw_class_definition, 0, 'Behavior', dot)
+        self.assertEqual(order, expected)
+        order = [(str(uri), level) for uri, level in order]
+        # Behavior is composed of Constraints twice, and the second is not expanded again
+        constraint = 'http://bioprotocols.org/uml#Constraint'
+        self.assertEqual([uri for uri, _ in order].count(constraint), 2)
+        self.assertIn(('http://bioprotocols.org/uml#ValueSpecification', 0), order)
+        self.assertIn(('http://bioprotocols.org/uml#Activity', 1), order)
+        # A drawing pass draws every class in the traversal
+        for class_name in ('Constraint', 'Parameter', 'ValueSpecification', 'LiteralReal', 'Activity'):
+            self.assertIn(f'uml_{class_name} [label=', dot.source)
+
+    @unittest.skipIf(shutil.which('dot') is None, 'requires the dot executable from graphviz')
+    @unittest.skipIf(importlib.util.find_spec('PyPDF2') is None, 'requires PyPDF2')
+    def test_widths_match_rendered_pdfs(self):
+        import PyPDF2
+        with tempfile.TemporaryDirectory() as tmp:
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                UMLFactory(ONTOLOGY, 'http://bioprotocols.org/uml#').generate('figures')
+            finally:
+                os.chdir(cwd)
+            widths = uml_factory.load_manifest(os.path.join(tmp, 'figures'))
+            self.assertEqual(len(widths), 6)
+            for class_name, entry in widths.items():
+                with open(os.path.join(tmp, 'figures', f'{class_name}_abstraction_hierarchy.pdf'), 'rb') as pdf:
+                    pdf_width = float(PyPDF2.PdfReader(pdf).pages[0].mediabox[2])
+                self.assertAlmostEqual(entry['width'], pdf_width, delta=1)
+
+    def test_render_error_includes_stderr(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with unittest.mock.patch.object(uml_factory.subprocess, 'run',
+                                            side_effect=uml_factory.subprocess.CalledProcessError(
+                                                1, ['dot'], output=b'', stderr=b'Error: syntax error in line 1')):
+                with self.assertRaises(uml_factory.subprocess.CalledProcessError) as raised:
+                    uml_factory.render_diagram('digraph { a -> b }', os.path.join(tmp, 'diagram'))
+        self.assertIn('syntax error in line 1', str(raised.exception))
+
+    def test_layout_width(self):
+        self.assertEqual(uml_factory.layout_width('graph 1 4.5 2.25\n'), 4.5 * 72 + 80)
+        self.assertEqual(uml_factory.layout_width('graph 0.5 4.5 2.25'), 4.5 * 36 + 80)
+
+
+if __name__ == '__main__':
+    unittest.main()
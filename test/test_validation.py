@@ -1,8 +1,20 @@
+import os
+import tempfile
 import unittest
+import unittest.mock
+import pyshacl
+import rdflib
 import sbol3
 import test_files
 import logging
 logging.disable()
+from sbol_factory import SBOLFactory, Document, ShaclValidator, ValidationReport
+from sbol_factory.schema_validator import SchemaValidator
+from sbol_factory.validation_cache import ValidationCache
+
+
+TEST_FILES = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'test_files')
+SHAPES_PATHS = [os.path.join(TEST_FILES, 'test-ontology.ttl'), os.path.join(TEST_FILES, 'test-shapes.ttl')]
 
 
 class TestValidation(unittest.TestCase):
@@ -53,6 +65,379 @@ class TestValidation(unittest.TestCase):
         assert not v.warnings, "".join(str(e) for e in doc.validate().warnings)
 
 
+class TestSharedValidator(unittest.TestCase):
+
+    def setUp(self):
+        ShaclValidator.clear()
+        sbol3.set_namespace('https://example.org/test')
+
+    def tearDown(self):
+        ShaclValidator.clear()
+
+    def test_shapes_loaded_on_first_validation(self):
+        with unittest.mock.patch.object(ShaclValidator, 'shapes_paths', SHAPES_PATHS):
+            docs = [Document() for _ in range(3)]
+            self.assertIsNone(ShaclValidator._shared)
+            docs[0].add(test_files.Behavior('Provision'))
+            self.assertTrue(docs[0].validate().is_valid)
+            validator = ShaclValidator._shared
+            self.assertIsNotNone(validator)
+            docs[1].add(test_files.Behavior('Transfer')).parameters.append(test_files.Parameter(name='spec'))
+            self.assertFalse(docs[1].validate().is_valid)
+            self.assertIs(ShaclValidator._shared, validator)
+
+    def test_preload(self):
+        validator = ShaclValidator.preload(SHAPES_PATHS)
+        with unittest.mock.patch.object(ShaclValidator, '__init__', side_effect=AssertionError):
+            doc = Document()
+            doc.add(test_files.Behavior('Provision'))
+            self.assertTrue(doc.validate().is_valid)
+        self.assertIs(ShaclValidator.shared(), validator)
+
+
+class TestInference(unittest.TestCase):
+
+    def setUp(self):
+        sbol3.set_namespace('https://example.org/test')
+        self.validator = ShaclValidator(SHAPES_PATHS)
+
+    @staticmethod
+    def results(results_graph):
+        sh = rdflib.Namespace('http://www.w3.org/ns/shacl#')
+        return {(results_graph.value(r, sh.focusNode), results_graph.value(r, sh.resultPath),
+                 results_graph.value(r, sh.sourceConstraintComponent))
+                for r in results_graph.subjects(rdflib.RDF.type, sh.ValidationResult)}
+
+    def assertSameResults(self, doc):
+        # Compare against RDFS inference over a copy of the whole union, as pyshacl does it
+        g = doc.graph()
+        for path in SHAPES_PATHS:
+            g.parse(path, format='ttl')
+        expected_conforms, expected, _ = pyshacl.validate(g, inference='rdfs', advanced=True)
+        actual_conforms, actual, _ = self.validator.validate(doc.graph())
+        self.assertEqual(expected_conforms, actual_conforms)
+        self.assertEqual(self.results(expected), self.results(actual))
+        return actual_conforms
+
+    def test_inference_matches_pyshacl(self):
+        doc = Document()
+        b = doc.add(test_files.Behavior('Provision'))
+        doc.add(sbol3.Sequence('genome'))
+        self.assertTrue(self.assertSameResults(doc))
+
+        # The shape on TopLevel applies to the Behavior by inference
+        b.description = 'x' * 100
+        self.assertFalse(self.assertSameResults(doc))
+
+        b.description = 'A behavior'
+        b.parameters.append(test_files.Parameter(name='spec'))
+        b.parameters.append(test_files.Parameter(direction='http://bioprotocols.org/uml#in',
+                                                 is_ordered=True, is_unique=True))
+        self.assertFalse(self.assertSameResults(doc))
+
+    def test_no_literal_subjects(self):
+        doc = Document()
+        doc.add(test_files.Behavior('Provision', description='A behavior'))
+        inferred = self.validator.infer(doc.graph())
+        self.assertGreater(len(inferred), 0)
+        self.assertFalse(any(isinstance(s, rdflib.Literal) for s in inferred.subjects()))
+
+    def test_union_is_not_copied(self):
+        doc = Document()
+        doc.add(test_files.Behavior('Provision'))
+        with unittest.mock.patch.object(rdflib.Graph, '__add__', side_effect=AssertionError):
+            self.assertTrue(self.validator.validate(doc.graph())[0])
+
+
+class TestIncrementalValidation(unittest.TestCase):
+
+    def setUp(self):
+        sbol3.set_namespace('https://example.org/test')
+        ShaclValidator.preload(SHAPES_PATHS)
+        ValidationCache.clear()
+
+    def tearDown(self):
+        ShaclValidator.clear()
+        ValidationCache.clear()
+
+    def assertSameAsFull(self, doc):
+        incremental = doc.validate(precheck=False)
+        full = doc.validate(full=True, precheck=False)
+        self.assertEqual(incremental.is_valid, full.is_valid)
+        self.assertEqual(set(incremental), set(full))
+        return incremental
+
+    def test_incremental_matches_full(self):
+        doc = Document()
+        behaviors = [doc.add(test_files.Behavior(f'Behavior{i}')) for i in range(5)]
+        sequence = doc.add(sbol3.Sequence('genome'))
+        component = doc.add(sbol3.Component('water', sbol3.SBO_SIMPLE_CHEMICAL))
+        component.sequences = [sequence]
+        self.assertTrue(self.assertSameAsFull(doc).is_valid)
+
+        # Mutate a property
+        behaviors[0].description = 'x' * 100
+        report = self.assertSameAsFull(doc)
+        self.assertEqual({str(r.focus_node) for r in report}, {behaviors[0].identity})
+
+        # Add an invalid owned object
+        behaviors[1].parameters.append(test_files.Parameter(name='spec'))
+        self.assertEqual(len(list(self.assertSameAsFull(doc))), 4)
+
+        # Fix the first
+        behaviors[0].description = 'A behavior'
+        self.assertEqual(len(list(self.assertSameAsFull(doc))), 3)
+
+        # Removing a referenced object invalidates the object that refers to it
+        doc.remove_object(sequence)
+        other = doc.add(test_files.Behavior('genome_placeholder'))
+        component.sequences = [other]
+        self.assertEqual(len(list(self.assertSameAsFull(doc))), 4)
+
+        # Remove the invalid objects
+        doc.remove_object(behaviors[1])
+        doc.remove_object(component)
+        self.assertTrue(self.assertSameAsFull(doc).is_valid)
+
+    def test_only_changed_objects_are_validated(self):
+        doc = Document()
+        behaviors = [doc.add(test_files.Behavior(f'Behavior{i}')) for i in range(10)]
+        self.assertTrue(doc.validate(precheck=False).is_valid)
+        behaviors[3].description = 'x' * 100
+        validator = ShaclValidator.shared()
+        with unittest.mock.patch.object(validator, 'validate', wraps=validator.validate) as validate:
+            report = doc.validate(precheck=False)
+        graph = validate.call_args[0][0]
+        self.assertEqual(set(graph.subjects()), {rdflib.URIRef(behaviors[3].identity)})
+        self.assertFalse(report.is_valid)
+        self.assertEqual([str(r.focus_node) for r in report], [behaviors[3].identity])
+
+
+class TestShardedValidation(unittest.TestCase):
+
+    def setUp(self):
+        sbol3.set_namespace('https://example.org/test')
+        ShaclValidator.preload(SHAPES_PATHS)
+        ValidationCache.clear()
+
+    def tearDown(self):
+        ShaclValidator.clear()
+        ValidationCache.clear()
+
+    def test_sharded_matches_serial(self):
+        doc = Document()
+        for i in range(8):
+            b = doc.add(test_files.Behavior(f'Behavior{i}'))
+            if i % 3 == 0:
+                b.parameters.append(test_files.Parameter(name='spec'))
+        # References across shards
+        for i in range(4):
+            sequence = doc.add(sbol3.Sequence(f'seq{i}'))
+            component = doc.add(sbol3.Component(f'component{i}', sbol3.SBO_DNA))
+            component.sequences = [sequence if i % 2 else f'https://example.org/test/Behavior{i}']
+        serial = set(doc.validate(full=True, precheck=False))
+        self.assertEqual(len(serial), 3 * 3 + 2)
+        sharded = doc.validate(full=True, processes=3, precheck=False)
+        self.assertEqual(set(sharded), serial)
+
+        # Incremental validation is sharded as well
+        doc.find('https://example.org/test/Behavior1').description = 'x' * 100
+        self.assertEqual(set(doc.validate(processes=2, precheck=False)),
+                         set(doc.validate(full=True, precheck=False)))
+
+
+class TestEarlyExit(unittest.TestCase):
+
+    def setUp(self):
+        sbol3.set_namespace('https://example.org/test')
+        ShaclValidator.preload(SHAPES_PATHS)
+        ValidationCache.clear()
+
+    def tearDown(self):
+        ShaclValidator.clear()
+        ValidationCache.clear()
+
+    def test_max_violations(self):
+        doc = Document()
+        for i in range(40):
+            doc.add(test_files.Behavior(f'Behavior{i}', description='x' * 100 if i % 2 else None))
+        validator = ShaclValidator.shared()
+        with unittest.mock.patch.object(Document, 'FAIL_FAST_SHARD_SIZE', 10), \
+                unittest.mock.patch.object(validator, 'validate', wraps=validator.validate) as validate:
+            report = doc.validate(max_violations=3, precheck=False)
+        # Validation stopped after the first of four shards
+        self.assertEqual(validate.call_count, 1)
+        self.assertFalse(report.is_valid)
+        self.assertTrue(report.truncated)
+        self.assertEqual(len(list(report)), 3)
+
+        # The truncated validation is not remembered
+        report = doc.validate(precheck=False)
+        self.assertFalse(report.truncated)
+        self.assertEqual(len(list(report)), 20)
+        self.assertEqual(set(report), set(doc.validate(full=True, precheck=False)))
+        self.assertEqual(list(doc.validate(max_violations=5, precheck=False)), list(report)[:5])
+
+    def test_exactly_max_violations(self):
+        doc = Document()
+        for i in range(4):
+            doc.add(test_files.Behavior(f'Behavior{i}', description='x' * 100 if i % 2 else None))
+        # Every object was validated, and every violation is reported
+        report = doc.validate(max_violations=2, precheck=False)
+        self.assertEqual(len(list(report)), 2)
+        self.assertFalse(report.truncated)
+        self.assertTrue(doc.validate(max_violations=1, precheck=False).truncated)
+
+    def test_report_from_text(self):
+        report = ValidationReport.from_text(False, 'Validation Report\nConforms: False\nMessage: Too long\n')
+        self.assertFalse(report.is_valid)
+        self.assertFalse(report.truncated)
+        self.assertEqual(report.message, 'Too long\n')
+        self.assertEqual(report.results, 'Validation Report\nConforms: False\nMessage: Too long\n')
+        self.assertEqual(ValidationReport.from_text(True, 'Conforms: True').message, '')
+
+    def test_text_is_rendered_on_demand(self):
+        doc = Document()
+        doc.add(test_files.Behavior('Behavior0', description='x' * 100))
+        report = doc.validate(precheck=False)
+        self.assertIsNone(report._results_txt)
+        self.assertEqual([r.constraint_component for r in report], [rdflib.SH.MaxLengthConstraintComponent])
+        self.assertIn('Results (1):', report.results)
+        self.assertIn('MaxLengthConstraintComponent', report.results)
+
+
+class TestValidationCache(unittest.TestCase):
+
+    def setUp(self):
+        sbol3.set_namespace('https://example.org/test')
+        self.validator = ShaclValidator.preload(SHAPES_PATHS)
+
+    def tearDown(self):
+        ShaclValidator.clear()
+
+    def document(self):
+        doc = Document()
+        for i in range(3):
+            doc.add(test_files.Behavior(f'Behavior{i}', description='x' * 100 if i == 1 else None))
+        sequence = doc.add(sbol3.Sequence('seq'))
+        doc.add(sbol3.Component('component', sbol3.SBO_DNA, sequences=[sequence]))
+        return doc
+
+    def test_validated_content_is_not_validated_again(self):
+        cache = ValidationCache()
+        expected = self.document().validate(precheck=False, cache=cache)
+        # An entry for each of the TopLevel objects
+        self.assertEqual(len(cache.entries), 5)
+        doc = self.document()
+        subgraphs = doc.subgraphs()
+        self.assertEqual(set(doc.cache_keys(self.validator, set(subgraphs), subgraphs)), set(subgraphs) - {None})
+        self.assertFalse(expected.is_valid)
+        with unittest.mock.patch.object(self.validator, 'validate', side_effect=AssertionError):
+            self.assertEqual(list(self.document().validate(precheck=False, cache=cache)), list(expected))
+
+        # Only the objects whose content, or the content of what they refer to, changed are validated
+        doc = self.document()
+        doc.find('https://example.org/test/seq').elements = 'acgt'
+        with unittest.mock.patch.object(self.validator, 'validate', wraps=self.validator.validate) as validate:
+            self.assertEqual(list(doc.validate(precheck=False, cache=cache)), list(expected))
+        graph = validate.call_args[0][0]
+        self.assertEqual({str(s) for s in graph.subjects()},
+                         {'https://example.org/test/seq', 'https://example.org/test/component'})
+
+        # Entries are invalidated when the shapes change
+        ShaclValidator.preload(SHAPES_PATHS[:1])
+        self.assertTrue(self.document().validate(precheck=False, cache=cache).is_valid)
+
+    def test_sqlite_backing(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'validation.db')
+            expected = self.document().validate(precheck=False, cache=ValidationCache(path=path))
+            cache = ValidationCache(capacity=1, path=path)
+            with unittest.mock.patch.object(self.validator, 'validate', side_effect=AssertionError):
+                actual = self.document().validate(precheck=False, cache=cache)
+            self.assertEqual([r.key() for r in actual], [r.key() for r in expected])
+            self.assertEqual(len(cache.entries), 1)
+            cache.db.close()
+
+    def test_hash_is_stable_under_blank_node_renaming(self):
+        def triples(node):
+            return {(node, rdflib.RDF.type, rdflib.URIRef('http://example.org/A')),
+                    (rdflib.URIRef('http://example.org/a'), rdflib.URIRef('http://example.org/p'), node)}
+        self.assertEqual(ValidationCache.content_hash(triples(rdflib.BNode('x'))),
+                         ValidationCache.content_hash(triples(rdflib.BNode('y'))))
+        self.assertNotEqual(ValidationCache.content_hash(triples(rdflib.BNode('x'))),
+                            ValidationCache.content_hash(triples(rdflib.URIRef('http://example.org/x'))))
+
+
+class TestSchemaValidator(unittest.TestCase):
+
+    def setUp(self):
+        SBOLFactory.clear()
+        sbol3.set_namespace('https://example.org/test')
+        self.uml = SBOLFactory('uml_schema', os.path.join(TEST_FILES, 'test-ontology.ttl'),
+                               'http://bioprotocols.org/uml#')
+        ShaclValidator.preload(SHAPES_PATHS)
+
+    def tearDown(self):
+        ShaclValidator.clear()
+        SBOLFactory.clear()
+
+    def test_violations_match_shacl(self):
+        doc = Document()
+        b = doc.add(self.uml.Behavior('Behavior0'))
+        b.parameters.append(self.uml.Parameter(name='spec'))
+        b.parameters.append(self.uml.Parameter(name='ok', direction='http://bioprotocols.org/uml#in',
+                                               is_ordered=True, is_unique=True))
+        native = SchemaValidator().validate(doc)
+        shacl = doc.validate(precheck=False)
+        self.assertEqual({(r.focus_node, r.result_path, r.constraint_component) for r in native[rdflib.URIRef(b.identity)]},
+                         {(r.focus_node, r.result_path, r.constraint_component) for r in shacl})
+
+    def test_precheck_skips_shacl(self):
+        doc = Document()
+        b = doc.add(self.uml.Behavior('Behavior0'))
+        b.parameters.append(self.uml.Parameter(name='spec'))
+        with unittest.mock.patch.object(ShaclValidator, 'validate', side_effect=AssertionError):
+            report = doc.validate()
+        self.assertFalse(report.is_valid)
+        self.assertEqual(len(list(report)), 3)
+        self.assertIn('MinCountConstraintComponent', report.results)
+        report = doc.validate(max_violations=1)
+        self.assertTrue(report.truncated)
+        self.assertEqual(len(list(report)), 1)
+
+        # A document that passes the pre-check is validated with SHACL
+        b.parameters[0].direction = 'http://bioprotocols.org/uml#in'
+        b.parameters[0].is_ordered = True
+        b.parameters[0].is_unique = True
+        b.description = 'x' * 100
+        report = doc.validate()
+        self.assertEqual([r.constraint_component for r in report], [rdflib.SH.MaxLengthConstraintComponent])
+
+    def test_precheck_affected_objects(self):
+        doc = Document()
+        doc.add(self.uml.Behavior('Behavior0', description='x' * 100))
+        b = doc.add(self.uml.Behavior('Behavior1'))
+        self.assertFalse(doc.validate(cache=False).is_valid)
+
+        # Only the changed object is pre-checked, and its violations are merged with the last report
+        b.parameters.append(self.uml.Parameter(name='spec'))
+        with unittest.mock.patch.object(SchemaValidator, 'validate', autospec=True,
+                                        side_effect=SchemaValidator.validate) as validate:
+            report = doc.validate(cache=False)
+        self.assertEqual(validate.call_args.args[3], {rdflib.URIRef(b.identity)})
+        self.assertEqual(set(report.results_by_object), {rdflib.URIRef('https://example.org/test/Behavior0'),
+                                                         rdflib.URIRef(b.identity)})
+        self.assertIn('MinCountConstraintComponent', report.results)
+        self.assertIn('MaxLengthConstraintComponent', report.results)
+
+    def test_shared_validator(self):
+        validator = SchemaValidator.shared()
+        self.assertIs(SchemaValidator.shared(), validator)
+        # The validator is built again once the schemas change
+        SBOLFactory('uml_schema2', os.path.join(TEST_FILES, 'test-ontology.ttl'), 'http://bioprotocols.org/uml#')
+        self.assertIsNot(SchemaValidator.shared(), validator)
+
 
 if __name__ == '__main__':
     unittest.main()